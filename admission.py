@@ -0,0 +1,204 @@
+# admission.py
+# Admission control for one API worker: bounded in-flight work, bounded queues, load shedding.
+#
+# Every model-bound request takes a slot before it runs. When all slots are busy it waits in
+# its lane's queue; when that queue is full, or the wait outlives the queue timeout, it is shed
+# right away (503 + Retry-After) instead of piling up behind work it cannot overtake.
+#
+#   lane          who                                   gets a free slot
+#   interactive   /predict, /explain (dashboard, tools)  first
+#   bulk          /predict_batch (batch clients)         only if nothing interactive is waiting,
+#                                                        and never more than max_bulk_in_flight
+#
+# so a batch flood can fill its own queue but never the slots kept back for interactive callers.
+#
+# Deadlines: a request may carry an absolute perf_counter() deadline. It never waits past it in
+# the queue, and check_deadline() lets the caller drop it just before the model runs.
+#
+# Usage:
+#   admission = AdmissionController(max_in_flight=8, max_bulk_in_flight=6, max_queue={"interactive": 32, "bulk": 8})
+#   ticket = admission.acquire("bulk", deadline=time.perf_counter() + 0.5)   # raises Shed
+#   try:
+#       ...
+#   finally:
+#       admission.release(ticket)
+import math
+import threading
+import time
+from collections import deque
+
+import fork_hooks
+
+LANES = ("interactive", "bulk")
+
+
+class Shed(Exception):
+    """The request was not admitted. reason: queue_full | queue_timeout | deadline."""
+
+    def __init__(self, lane, reason, retry_after):
+        self.lane = lane
+        self.reason = reason
+        self.retry_after = retry_after  # Whole seconds, for the Retry-After header
+        super().__init__(f"Server saturated ({lane} lane: {reason.replace('_', ' ')})")
+
+
+class DeadlineExceeded(Shed):
+    def __init__(self, lane):
+        super().__init__(lane, "deadline", retry_after=0)
+        self.args = (f"Request deadline exceeded before the model ran ({lane} lane)",)
+
+
+class _Waiter:
+    __slots__ = ("lane", "event", "granted", "enqueued")
+
+    def __init__(self, lane):
+        self.lane = lane
+        self.event = threading.Event()
+        self.granted = False
+        self.enqueued = time.perf_counter()
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight=8, max_bulk_in_flight=None, max_queue=None, queue_timeout_ms=2000.0,
+                 on_wait=None):
+        """
+        max_in_flight:      Requests allowed to run at once (all lanes). 0 disables admission control.
+        max_bulk_in_flight: Of those, how many may be bulk (default: all but one).
+        max_queue:          {lane: queued requests allowed}; more are shed with queue_full.
+        queue_timeout_ms:   Longest a request waits for a slot before it is shed with queue_timeout.
+        on_wait:            Optional callable(lane, seconds) for every admitted request's queue wait.
+        """
+        self.max_in_flight = max_in_flight
+        self.enabled = max_in_flight > 0
+        if max_bulk_in_flight is None:
+            max_bulk_in_flight = max(1, max_in_flight - 1)
+        self.max_bulk_in_flight = min(max_bulk_in_flight, max_in_flight)
+        self.max_queue = {"interactive": 32, "bulk": 8, **(max_queue or {})}
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self.on_wait = on_wait
+
+        self._reset()
+        # Locks and waiters are per process: pre-forked workers (serve.py) each get a fresh controller
+        fork_hooks.register(self, "_reset")
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._queues = {lane: deque() for lane in LANES}
+        self._in_flight = {lane: 0 for lane in LANES}
+        self._admitted = {lane: 0 for lane in LANES}
+        self._shed = {lane: {"queue_full": 0, "queue_timeout": 0, "deadline": 0} for lane in LANES}
+        # Exponentially weighted mean service time per lane, for Retry-After
+        self._service_time = {lane: 0.05 for lane in LANES}
+
+    # --- A. Slots ---
+    def _can_run(self, lane):
+        total = sum(self._in_flight.values())
+        if total >= self.max_in_flight:
+            return False
+        return lane == "interactive" or self._in_flight["bulk"] < self.max_bulk_in_flight
+
+    def _dispatch(self):
+        # Called with the lock held whenever a slot frees: interactive waiters first
+        for lane in LANES:
+            queue = self._queues[lane]
+            while queue and self._can_run(lane):
+                waiter = queue.popleft()
+                waiter.granted = True
+                self._in_flight[lane] += 1
+                waiter.event.set()
+
+    def _retry_after(self, lane):
+        # Time for everything ahead of a new arrival to drain through the slots it may use
+        slots = self.max_in_flight if lane == "interactive" else self.max_bulk_in_flight
+        ahead = sum(self._in_flight.values()) + len(self._queues["interactive"])
+        if lane == "bulk":
+            ahead += len(self._queues["bulk"])
+        return max(1, math.ceil(ahead * self._service_time[lane] / max(slots, 1)))
+
+    def acquire(self, lane, deadline=None):
+        """Wait for a slot in `lane`. Returns a ticket for release(); raises Shed if not admitted."""
+        if not self.enabled:
+            return None
+        if deadline is not None and time.perf_counter() >= deadline:
+            with self._lock:
+                self._shed[lane]["deadline"] += 1
+            raise DeadlineExceeded(lane)
+
+        with self._lock:
+            # Nobody of equal or higher priority waiting and a slot is free: run now
+            ahead = self._queues["interactive"] or (lane == "bulk" and self._queues["bulk"])
+            if not ahead and self._can_run(lane):
+                self._in_flight[lane] += 1
+                self._admitted[lane] += 1
+                self._report_wait(lane, 0.0)
+                return (lane, time.perf_counter())
+            if len(self._queues[lane]) >= self.max_queue[lane]:
+                self._shed[lane]["queue_full"] += 1
+                raise Shed(lane, "queue_full", self._retry_after(lane))
+            waiter = _Waiter(lane)
+            self._queues[lane].append(waiter)
+
+        timeout = self.queue_timeout
+        reason = "queue_timeout"
+        if deadline is not None and deadline - waiter.enqueued < timeout:
+            timeout, reason = max(0.0, deadline - waiter.enqueued), "deadline"
+        waiter.event.wait(timeout)
+
+        with self._lock:
+            if not waiter.granted:
+                self._queues[lane].remove(waiter)
+                self._shed[lane][reason] += 1
+                if reason == "deadline":
+                    raise DeadlineExceeded(lane)
+                raise Shed(lane, reason, self._retry_after(lane))
+            self._admitted[lane] += 1
+        self._report_wait(lane, time.perf_counter() - waiter.enqueued)
+        return (lane, time.perf_counter())
+
+    def _report_wait(self, lane, seconds):
+        if self.on_wait is not None:
+            self.on_wait(lane, seconds)
+
+    def release(self, ticket):
+        if ticket is None:
+            return
+        lane, started = ticket
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._in_flight[lane] -= 1
+            self._service_time[lane] += 0.1 * (elapsed - self._service_time[lane])
+            self._dispatch()
+
+    def check_deadline(self, lane, deadline):
+        """Raise DeadlineExceeded if `deadline` has passed (call right before the model runs)."""
+        if deadline is not None and time.perf_counter() >= deadline:
+            with self._lock:
+                self._shed[lane]["deadline"] += 1
+            raise DeadlineExceeded(lane)
+
+    # --- B. Metrics ---
+    def stats(self):
+        with self._lock:
+            in_flight = sum(self._in_flight.values())
+            queued = sum(len(queue) for queue in self._queues.values())
+            return {
+                "enabled": self.enabled,
+                "max_in_flight": self.max_in_flight,
+                "max_bulk_in_flight": self.max_bulk_in_flight,
+                "queue_timeout_ms": self.queue_timeout * 1000.0,
+                "in_flight": in_flight,
+                "queued": queued,
+                # > 1.0 means requests are queueing: the signal to scale out on
+                "saturation": (in_flight + queued) / self.max_in_flight if self.enabled else 0.0,
+                "lanes": {
+                    lane: {
+                        "in_flight": self._in_flight[lane],
+                        "queued": len(self._queues[lane]),
+                        "max_queue": self.max_queue[lane],
+                        "admitted": self._admitted[lane],
+                        "shed": dict(self._shed[lane]),
+                        "mean_service_ms": self._service_time[lane] * 1000.0,
+                    }
+                    for lane in LANES
+                },
+            }
@@ -1,10 +1,29 @@
+import os
+import hmac
 import joblib
 import pandas as pd
 import numpy as np
-from flask import Flask, request, jsonify
+import time
+import json
+from flask import Flask, request, jsonify, g, Response, has_request_context
 from pathlib import Path 
-from typing import Optional # <--- Fixed: This is now included
-from pydantic import BaseModel, Field, ValidationError, ConfigDict # <--- Fixed: Added ConfigDict
+from pydantic import ValidationError
+from schemas import HouseData
+from bulk_validation import validate_frame, validate_records
+from prediction_cache import PredictionCache, make_row_key
+from micro_batcher import MicroBatcher
+from row_template import RowTemplate
+import fork_hooks
+import wire_formats
+from wire_formats import UnsupportedFormat
+from member_pool import MemberPool, apply_thread_budget, parse_threads, pipeline_members
+from model_bundle import BUNDLE_DIR, load_bundle
+from compiled_model import CompiledPredictor
+from explain import Explainer
+from admission import AdmissionController, DeadlineExceeded, LANES, Shed
+from hot_reload import HotReloader, content_version, install_reload_signal
+from metrics import Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE
+from profiler import MIN_INTERVAL_MS, ProfilerBusy, install_signal_handler, profile_for
 
 # ==================================================
 # 1. INITIALIZE APP & PATHS
@@ -15,6 +34,63 @@ app = Flask(__name__)
 BASE_DIR = Path(__file__).parent
 MODELS_DIR = BASE_DIR / "models"
 
+# Largest number of houses accepted by /predict_batch in a single request
+MAX_BATCH_SIZE = int(os.environ.get("AMES_MAX_BATCH_SIZE", 1000))
+
+# "pipeline" = the sklearn Pipeline, "compiled" = the flat predictor from compiled_model.py,
+# "bundle" = the pickle-free models/ames_bundle/ directory from model_bundle.py,
+# "onnx" = the whole Pipeline as one ONNX graph on onnxruntime (onnx_model.py)
+INFERENCE_BACKEND = os.environ.get("AMES_INFERENCE_BACKEND", "pipeline")
+ONNX_THREADS = int(os.environ.get("AMES_ONNX_THREADS", 1))  # onnxruntime intra-op threads (0 = all cores)
+
+# Prediction cache: max cached rows (0 = off) and optional time-to-live in seconds (0 = no expiry)
+CACHE_SIZE = int(os.environ.get("AMES_CACHE_SIZE", 10000))
+CACHE_TTL = float(os.environ.get("AMES_CACHE_TTL", 0))
+EXPLAIN_CACHE_SIZE = int(os.environ.get("AMES_EXPLAIN_CACHE_SIZE", 1000))  # Explanations are ~80x bigger than a price
+
+# "direct" = each /predict calls the model, "microbatch" = concurrent /predict calls share one model call
+SERVING_MODE = os.environ.get("AMES_SERVING_MODE", "direct")
+MICROBATCH_MAX_SIZE = int(os.environ.get("AMES_MICROBATCH_MAX_SIZE", 32))
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get("AMES_MICROBATCH_MAX_WAIT_MS", 5))
+
+# "sequential" = members predict one after another, "threads" = Lasso / XGBoost / CatBoost run
+# side by side for batches of at least MEMBER_POOL_MIN_ROWS, each with its own thread budget
+MEMBER_CONCURRENCY = os.environ.get("AMES_MEMBER_CONCURRENCY", "sequential")
+MEMBER_THREADS = parse_threads(os.environ.get("AMES_MEMBER_THREADS"))
+MEMBER_POOL_MIN_ROWS = int(os.environ.get("AMES_MEMBER_POOL_MIN_ROWS", 256))
+
+# Admission control per worker process: at most MAX_IN_FLIGHT model-bound requests run at once
+# (0 = off), at most MAX_BULK_IN_FLIGHT of them from the bulk lane; the rest queue per lane up to
+# MAX_QUEUE / MAX_BULK_QUEUE and QUEUE_TIMEOUT_MS, then get 503 + Retry-After (see admission.py)
+MAX_IN_FLIGHT = int(os.environ.get("AMES_MAX_IN_FLIGHT", 8))
+MAX_BULK_IN_FLIGHT = int(os.environ.get("AMES_MAX_BULK_IN_FLIGHT", max(1, MAX_IN_FLIGHT - 1)))
+MAX_QUEUE = int(os.environ.get("AMES_MAX_QUEUE", 32))
+MAX_BULK_QUEUE = int(os.environ.get("AMES_MAX_BULK_QUEUE", 8))
+QUEUE_TIMEOUT_MS = float(os.environ.get("AMES_QUEUE_TIMEOUT_MS", 2000))
+# Default lane per endpoint; a client can override it with X-Priority: interactive|bulk
+ENDPOINT_LANES = {"/predict": "interactive", "/explain": "interactive", "/predict_batch": "bulk"}
+
+# ?mode=full (the 3-model ensemble) or ?mode=fast (the distilled single XGBoost from distill.py)
+DEFAULT_MODE = os.environ.get("AMES_DEFAULT_MODE", "full")
+STUDENT_PATH = Path(os.environ.get("AMES_STUDENT_PATH", MODELS_DIR / 'ames_student_fast.pkl'))
+MODES = ("full", "fast")
+# A candidate is rejected if any smoke-set fast price differs from its full price by more than this
+# fraction: a student distilled from an older pipeline no longer tracks the ensemble
+STUDENT_MAX_GAP = float(os.environ.get("AMES_STUDENT_MAX_GAP", 0.2))
+
+# Hot reload: poll the artifact files every RELOAD_WATCH_SECONDS (0 = only on POST /admin/reload
+# or `kill -HUP`). A candidate is rejected if any smoke-set price moves by more than
+# RELOAD_MAX_SHIFT (fraction) vs the version serving now; AMES_SMOKE_SET = JSON list of houses
+RELOAD_WATCH_SECONDS = float(os.environ.get("AMES_RELOAD_WATCH_SECONDS", 10))
+RELOAD_MAX_SHIFT = float(os.environ.get("AMES_RELOAD_MAX_SHIFT", 0.5))
+SMOKE_SET_PATH = os.environ.get("AMES_SMOKE_SET")
+PRICE_RANGE = (10_000, 5_000_000)  # Anything outside is a broken artifact, not a house
+
+# Admin endpoints are disabled unless a token is set; profiles land in PROFILE_DIR
+ADMIN_TOKEN = os.environ.get("AMES_ADMIN_TOKEN")
+PROFILE_DIR = Path(os.environ.get("AMES_PROFILE_DIR", BASE_DIR / "profiles"))
+MAX_PROFILE_SECONDS = 60
+
 # ==================================================
 # 2. CRITICAL: DEFINE CUSTOM FUNCTIONS
 # ==================================================
@@ -22,94 +98,476 @@ def cast_to_str(x):
     return x.astype(str)
 
 # ==================================================
-# 3. LOAD ASSETS
+# 3. LOAD ASSETS (hot-reloadable: see hot_reload.py and POST /admin/reload)
 # ==================================================
-print(f"Loading Production Pipeline, Columns and Defaults from: {MODELS_DIR} ...")
+class LoadedModels:
+    """One artifact version: everything a request needs, swapped as a whole on reload."""
 
-try:
-    model_path = MODELS_DIR / 'ames_housing_super_model_production.pkl'
-    columns_path = MODELS_DIR / 'ames_model_columns.pkl'
-    defaults_path = MODELS_DIR / 'ames_model_defaults.pkl' 
+    def __init__(self):
+        self.model = None          # The sklearn Pipeline (not loaded for the bundle backend)
+        self.student = None        # Distilled fast-mode model, if models/ames_student_fast.pkl exists
+        self.student_shares_transform = False  # Student may reuse predictor.transform (same fitted numbers)
+        self.micro_batcher = None  # Per version: its queued rows have this version's columns
+        self.blas_limits = None
+
+    def close(self):
+        # The last request using this version has finished: nothing may keep it alive after this
+        # (forked workers would otherwise also rebuild its ONNX session / micro-batch worker)
+        if self.micro_batcher is not None:
+            self.micro_batcher.close()
+        fork_hooks.unregister(self.micro_batcher)
+        fork_hooks.unregister(getattr(self, "predictor", None))
+
+def load_models():
+    print(f"Loading Production Pipeline, Columns and Defaults from: {MODELS_DIR} ...")
+    m = LoadedModels()
+    if INFERENCE_BACKEND == "bundle":
+        # One directory, no pickles: predictor + columns + defaults together
+        bundle = load_bundle(BUNDLE_DIR)
+        m.predictor = bundle.predictor
+        m.expected_columns = bundle.columns
+        m.model_defaults = bundle.defaults
+        categorical_columns = set(m.predictor.cat_cols)
+        m.artifact_paths = [BUNDLE_DIR / 'manifest.json']
+        print(f"📦 Serving from model bundle {bundle.version} (model_bundle.py)")
+
+    else:
+        model_path = MODELS_DIR / 'ames_housing_super_model_production.pkl'
+        columns_path = MODELS_DIR / 'ames_model_columns.pkl'
+        defaults_path = MODELS_DIR / 'ames_model_defaults.pkl' 
+
+        m.model = joblib.load(model_path)
+        m.expected_columns = joblib.load(columns_path)
+        m.model_defaults = joblib.load(defaults_path)
+
+        # Whatever serves the predictions: both expose .predict(aligned_df)
+        m.predictor = m.model
+        m.artifact_paths = [model_path, columns_path, defaults_path]
+        if INFERENCE_BACKEND == "compiled":
+            compiled_path = MODELS_DIR / 'ames_compiled_predictor.pkl'
+            m.predictor = joblib.load(compiled_path)
+            m.artifact_paths.append(compiled_path)
+            print("⚡ Serving from the compiled predictor (compiled_model.py)")
+        elif INFERENCE_BACKEND == "onnx":
+            from onnx_model import ONNX_PATH, OnnxPredictor  # onnxruntime is only needed here
+            m.predictor = OnnxPredictor(ONNX_PATH, threads=ONNX_THREADS)
+            m.artifact_paths.append(ONNX_PATH)
+            print(f"🧮 Serving from onnxruntime ({ONNX_PATH.name}, {ONNX_THREADS} intra-op thread(s))")
+
+        # Which aligned columns go through the categorical (cast_to_str) branch
+        categorical_columns = set(m.model.named_steps['preprocessor'].transformers_[0][2])
+
+    m.categorical_columns = categorical_columns
+    m.categorical_mask = [col in categorical_columns for col in m.expected_columns]
+
+    # Exact per-field contributions for /explain (needs the fitted numbers, not an ONNX graph)
+    m.explainer = Explainer(m.predictor if isinstance(m.predictor, CompiledPredictor) else m.model)
+
+    # Defaults-filled template row for /predict (copy + patch instead of DataFrame/reindex/fillna)
+    # Dropped fields go straight into the process-wide counter, so none are lost when a version retires
+    m.row_template = RowTemplate(m.expected_columns, m.model_defaults, on_dropped=DROPPED_FIELDS.inc)
+
+    # Optional second artifact for ?mode=fast (python distill.py); full mode works without it
+    if STUDENT_PATH.exists():
+        m.student = joblib.load(STUDENT_PATH)
+        m.artifact_paths.append(STUDENT_PATH)
+        # The student carries the preprocessor of the pipeline it was distilled from. A newer train.py /
+        # incremental.py pipeline may have shifted or appended category codes, so the flat transform
+        # is only reused when its categories and medians are exactly the student's
+        m.student_shares_transform = (isinstance(m.predictor, CompiledPredictor)
+                                      and m.predictor.matches_preprocessor(m.student.named_steps['preprocessor']))
+        print(f"🏎️  Fast mode available (student: {STUDENT_PATH.name})")
+
+    if member_pool is not None:
+        m.blas_limits = apply_thread_budget(m.predictor, MEMBER_THREADS)  # Process-wide BLAS cap
+
+    if SERVING_MODE == "microbatch":
+        m.micro_batcher = MicroBatcher(
+            lambda batch_df: timed_predict(batch_df, m),
+            columns=m.expected_columns,
+            max_batch_size=MICROBATCH_MAX_SIZE,
+            max_wait_ms=MICROBATCH_MAX_WAIT_MS
+        )
+
+    # Content-derived: what every response reports as "version"
+    m.version = content_version(m.artifact_paths)
+    return m
+
+def watched_paths():
+    # A student that appears later (python distill.py) is a new version too
+    paths = list(reloader.current.artifact_paths) if reloader.current is not None else []
+    return paths if STUDENT_PATH in paths else paths + [STUDENT_PATH]
+
+prediction_cache = PredictionCache(max_size=CACHE_SIZE, ttl_seconds=CACHE_TTL)
+# Fast-mode prices differ from full-mode prices for the same row, so they get their own cache
+fast_cache = PredictionCache(max_size=CACHE_SIZE, ttl_seconds=CACHE_TTL)
+# /explain results, keyed like the prices (the price itself goes through prediction_cache)
+explain_cache = PredictionCache(max_size=EXPLAIN_CACHE_SIZE, ttl_seconds=CACHE_TTL)
+
+if SERVING_MODE == "microbatch":
+    print(f"📦 Micro-batching /predict (max {MICROBATCH_MAX_SIZE} rows / {MICROBATCH_MAX_WAIT_MS} ms)")
+
+admission = AdmissionController(
+    max_in_flight=MAX_IN_FLIGHT,
+    max_bulk_in_flight=MAX_BULK_IN_FLIGHT,
+    max_queue={"interactive": MAX_QUEUE, "bulk": MAX_BULK_QUEUE},
+    queue_timeout_ms=QUEUE_TIMEOUT_MS,
+    on_wait=lambda lane, seconds: ADMISSION_WAIT.labels(lane=lane).observe(seconds)
+)
+if admission.enabled:
+    print(f"🚦 Admission control: {MAX_IN_FLIGHT} in flight ({MAX_BULK_IN_FLIGHT} bulk), "
+          f"queues {MAX_QUEUE} interactive / {MAX_BULK_QUEUE} bulk, {QUEUE_TIMEOUT_MS:.0f} ms queue timeout")
+
+member_pool = None
+# (the ONNX graph runs all three members inside one session.run: onnxruntime schedules them itself)
+if MEMBER_CONCURRENCY == "threads" and INFERENCE_BACKEND != "onnx":
+    member_pool = MemberPool(min_rows=MEMBER_POOL_MIN_ROWS)
+    print(f"🧵 Concurrent members for batches >= {MEMBER_POOL_MIN_ROWS} rows (threads: {MEMBER_THREADS})")
+
+# --- Latency instrumentation (see GET /metrics) ---
+REQUESTS = Counter("ames_requests_total", "HTTP requests served", ["endpoint", "status"])
+REQUEST_ERRORS = Counter("ames_request_errors_total", "HTTP requests answered with 4xx/5xx", ["endpoint", "status"])
+IN_FLIGHT = Gauge("ames_requests_in_flight", "HTTP requests currently being served", ["endpoint"])
+REQUEST_LATENCY = Histogram("ames_request_latency_seconds", "End-to-end request latency", ["endpoint"])
+STAGE_LATENCY = Histogram("ames_stage_latency_seconds", "Latency of each inference stage", ["stage"])
+MEMBER_LATENCY = Histogram("ames_member_latency_seconds", "Latency of each VotingRegressor member", ["member"])
+CACHE_GAUGE = Gauge("ames_prediction_cache", "Prediction cache counters", ["stat"])
+EXPLAIN_CACHE_GAUGE = Gauge("ames_explain_cache", "Explanation cache counters", ["stat"])
+FAST_CACHE_GAUGE = Gauge("ames_fast_prediction_cache", "Fast-mode prediction cache counters", ["stat"])
+MICROBATCH_GAUGE = Gauge("ames_microbatch", "Micro-batcher counters", ["stat"])
+MEMBER_POOL_GAUGE = Gauge("ames_member_pool", "Concurrent member evaluation counters", ["stat"])
+ADMISSION_GAUGE = Gauge("ames_admission", "Admission control counters per lane", ["lane", "stat"])
+ADMISSION_WAIT = Histogram("ames_admission_wait_seconds", "Time spent queued for an in-flight slot", ["lane"])
+SATURATION = Gauge("ames_saturation", "(in-flight + queued) / max in-flight for this worker; > 1 means queueing")
+DROPPED_FIELDS = Counter("ames_dropped_fields_total", "/predict fields the model does not use (counted, then dropped)")
+
+# Resolve the label children once so each observation is a single bisect + lock
+STAGE = {stage: STAGE_LATENCY.labels(stage=stage) for stage in
+         ["validate", "assemble", "dataframe", "reindex", "fillna", "preprocess", "combine",
+          "onnx", "explain", "decode", "encode"]}
+
+def predict_stages(m):
+    """(preprocess, [(member, predict)], combine) for whichever predictor is serving."""
+    predictor = m.predictor
+    if isinstance(predictor, CompiledPredictor):
+        return predictor.transform, predictor.members(), predictor.combine
+
+    # sklearn Pipeline: ColumnTransformer -> TransformedTargetRegressor(VotingRegressor)
+    ttr = predictor.named_steps['model']
+    voting = ttr.regressor_
+    members = pipeline_members(voting, MEMBER_THREADS["catboost"] if member_pool is not None else -1)
+
+    def combine(member_preds):
+        log_price = np.average(np.column_stack(member_preds), axis=1, weights=voting.weights)
+        return ttr.inverse_func(log_price)
 
-    model = joblib.load(model_path)
-    expected_columns = joblib.load(columns_path)
-    model_defaults = joblib.load(defaults_path)
+    return predictor.named_steps['preprocessor'].transform, members, combine
 
-    print("✅ Model & Columns loaded successfully!")
+def timed_member(name, member_predict):
+    # Timed inside the member's own thread, so concurrent members are measured correctly
+    child = MEMBER_LATENCY.labels(member=name)
+    def predict(X):
+        with child.time():
+            return member_predict(X)
+    return predict
 
+def timed_predict(aligned_df, m):
+    """m.predictor.predict, split into timed stages (same arithmetic, same result)."""
+    if INFERENCE_BACKEND == "onnx":
+        # One graph: only the host-side string cast and the session.run can be timed apart
+        with STAGE["preprocess"].time():
+            feeds = m.predictor.transform(aligned_df)
+        with STAGE["onnx"].time():
+            return m.predictor.run(feeds)[0]
+
+    preprocess, members, combine = predict_stages(m)
+    with STAGE["preprocess"].time():
+        X = preprocess(aligned_df)
+    timed_members = [(name, timed_member(name, member_predict)) for name, member_predict in members]
+    if member_pool is not None:
+        member_preds = member_pool.run(timed_members, X)
+    else:
+        member_preds = [member_predict(X) for _, member_predict in timed_members]
+    with STAGE["combine"].time():
+        return combine(member_preds)
+
+def fast_predict(aligned_df, m):
+    """The distilled student: its own fitted preprocessor, then one XGBoost."""
+    with STAGE["preprocess"].time():
+        if m.student_shares_transform:
+            X = m.predictor.transform(aligned_df)  # Flat preprocessing, identical output (checked at load)
+        else:
+            X = m.student.named_steps['preprocessor'].transform(aligned_df)
+    with MEMBER_LATENCY.labels(member="student").time():
+        return m.student.named_steps['model'].predict(X)
+
+def requested_mode(m):
+    """?mode=full|fast (default AMES_DEFAULT_MODE) -> (mode, error response or None)."""
+    if m is None:
+        return None, (jsonify({"error": "Model not loaded (see /readyz)"}), 503)
+    mode = request.args.get('mode', DEFAULT_MODE)
+    if mode not in MODES:
+        return mode, (jsonify({"error": f"Unknown mode '{mode}' (expected one of {list(MODES)})"}), 400)
+    if mode == "fast" and m.student is None:
+        return mode, (jsonify({
+            "error": f"Fast mode unavailable: {STUDENT_PATH.name} not found (run distill.py)"
+        }), 503)
+    return mode, None
+
+def endpoint_label():
+    # The route pattern, not the raw path, so 404 scanners can't explode label cardinality
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    IN_FLIGHT.labels(endpoint=endpoint_label()).inc()
+
+def shed_response(e):
+    """503 + Retry-After when saturated, 504 when the request's own deadline ran out first."""
+    if isinstance(e, DeadlineExceeded):
+        return jsonify({"error": str(e), "lane": e.lane}), 504
+    response = jsonify({"error": str(e), "lane": e.lane, "reason": e.reason, "retry_after": e.retry_after})
+    return response, 503, {"Retry-After": str(e.retry_after)}
+
+@app.before_request
+def admit_request():
+    # Only model-bound endpoints queue; health, metrics and stats always answer
+    g.admission_ticket = None
+    lane = ENDPOINT_LANES.get(endpoint_label())
+    if lane is None or not admission.enabled:
+        return None
+    lane = request.headers.get('X-Priority', lane)
+    if lane not in LANES:
+        return jsonify({"error": f"Unknown X-Priority '{lane}' (expected one of {list(LANES)})"}), 400
+
+    # X-Request-Deadline-Ms: how long the caller will wait, counted from arrival
+    g.deadline = None
+    if 'X-Request-Deadline-Ms' in request.headers:
+        try:
+            budget_ms = float(request.headers['X-Request-Deadline-Ms'])
+        except ValueError:
+            return jsonify({"error": "X-Request-Deadline-Ms must be a number of milliseconds"}), 400
+        g.deadline = g.request_start + budget_ms / 1000.0
+
+    g.lane = lane
+    try:
+        g.admission_ticket = admission.acquire(lane, g.deadline)
+    except Shed as e:
+        return shed_response(e)
+    return None
+
+@app.before_request
+def lease_models():
+    # One artifact version for the whole request, even if a reload swaps it meanwhile
+    g.models = reloader.acquire()
+
+def check_request_deadline():
+    # Drop a request whose caller has already given up, before it spends model time
+    if has_request_context() and g.get('admission_ticket') is not None:
+        admission.check_deadline(g.lane, g.deadline)
+
+@app.after_request
+def record_request_metrics(response):
+    REQUESTS.labels(endpoint=endpoint_label(), status=response.status_code).inc()
+    if response.status_code >= 400:
+        REQUEST_ERRORS.labels(endpoint=endpoint_label(), status=response.status_code).inc()
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    admission.release(g.pop('admission_ticket', None))
+    reloader.release(g.pop('models', None))
+    IN_FLIGHT.labels(endpoint=endpoint_label()).dec()
+    REQUEST_LATENCY.labels(endpoint=endpoint_label()).observe(time.perf_counter() - g.request_start)
+
+def cached_predict(m, aligned, predict_fn=None, cache=None):
+    """
+    Predict every row with artifact version m, serving repeats from the cache. `aligned` is either
+    a defaults-filled frame or a list of RowTemplate rows (only turned into a frame if something misses).
+    """
+    predict_fn = predict_fn or (lambda df: timed_predict(df, m))
+    cache = prediction_cache if cache is None else cache
+    # Requests still finishing on a swapped-out version neither read nor refill the cache
+    use_cache = m is reloader.current
+    if use_cache:
+        cache.sync_artifact_version(m.version)
+
+    is_frame = isinstance(aligned, pd.DataFrame)
+    rows = list(aligned.itertuples(index=False, name=None)) if is_frame else aligned
+    keys = [make_row_key(row, m.categorical_mask) for row in rows]
+    prices = [cache.get(key) if use_cache else None for key in keys]
+
+    # Only the misses go to the model, still as a single predict call
+    misses = [i for i, price in enumerate(prices) if price is None]
+    if misses:
+        check_request_deadline()
+        if is_frame:
+            miss_df = aligned if len(misses) == len(aligned) else aligned.iloc[misses]
+        else:
+            with STAGE["dataframe"].time():
+                miss_df = m.row_template.frame([rows[i] for i in misses])
+        for i, price in zip(misses, predict_fn(miss_df)):
+            prices[i] = float(price)
+            if use_cache:
+                cache.put(keys[i], prices[i])
+    return prices
+
+def cached_explain(m, aligned_df):
+    """One explanation dict per row of a defaults-filled frame, serving repeats from explain_cache."""
+    use_cache = m is reloader.current
+    if use_cache:
+        explain_cache.sync_artifact_version(m.version)
+    keys = [make_row_key(row, m.categorical_mask) for row in aligned_df.itertuples(index=False, name=None)]
+    explanations = [explain_cache.get(key) if use_cache else None for key in keys]
+
+    misses = [i for i, explanation in enumerate(explanations) if explanation is None]
+    if misses:
+        check_request_deadline()
+        miss_df = aligned_df if len(misses) == len(aligned_df) else aligned_df.iloc[misses]
+        # The served price (cached like any /predict), so the contributions add up to it exactly
+        prices = cached_predict(m, miss_df)
+        with STAGE["explain"].time():
+            new = m.explainer.explain(miss_df, prices)
+        for i, price, explanation in zip(misses, prices, new):
+            explanation["predicted_price"] = price
+            explanations[i] = explanation
+            if use_cache:
+                explain_cache.put(keys[i], explanation)
+    return explanations
+
+def format_explanation(explanation, row, top=None):
+    """Largest contributions first, each with the value the model saw (defaults included)."""
+    contributions = [
+        {
+            "feature": feature,
+            "value": None if isinstance(row[feature], float) and row[feature] != row[feature] else row[feature],
+            "contribution": dollars,
+            "log_contribution": explanation["log_contributions"][feature],
+        }
+        for feature, dollars in explanation["contributions"].items()
+    ]
+    contributions.sort(key=lambda item: abs(item["contribution"]), reverse=True)
+    return {
+        "predicted_price": explanation["predicted_price"],
+        "base_price": explanation["base_price"],
+        "contributions": contributions[:top] if top else contributions,
+    }
+
+# --- Smoke-test a candidate version before it serves (also its warm-up: first calls build lazy state) ---
+SMOKE_HOUSES = [
+    {"Neighborhood": "CollgCr", "GrLivArea": 1500, "YearBuilt": 2005, "OverallQual": 7},
+    {"Neighborhood": "NoRidge", "GrLivArea": 2800, "YearBuilt": 1998, "OverallQual": 9, "GarageCars": 3},
+    {"Neighborhood": "OldTown", "GrLivArea": 1100, "YearBuilt": 1920, "OverallQual": 5},
+    {"Neighborhood": "Edwards", "GrLivArea": 900, "YearBuilt": 1955, "OverallQual": 4, "CentralAir": "N"},
+]
+if SMOKE_SET_PATH:
+    with open(SMOKE_SET_PATH) as f:
+        SMOKE_HOUSES = json.load(f)
+
+def validate_models(candidate, current):
+    """Raises (-> old version keeps serving) unless the candidate prices the smoke set sensibly."""
+    missing = [field for field, info in HouseData.model_fields.items()
+               if info.is_required() and field not in candidate.expected_columns]
+    if missing:
+        raise ValueError(f"Columns artifact lacks required fields {missing}")
+
+    validation = validate_records(SMOKE_HOUSES)
+    if validation.n_invalid:
+        raise ValueError(f"Smoke set fails the request schema: {validation.errors}")
+    frame = validation.frame.reindex(columns=candidate.expected_columns).fillna(candidate.model_defaults)
+    # The /predict path (template row) and the /predict_batch path (reindex + fillna) must agree
+    rows = [candidate.row_template.assemble(HouseData(**house).model_dump()) for house in SMOKE_HOUSES]
+    prices = np.asarray(timed_predict(frame, candidate), dtype=float)
+    template_prices = np.asarray(timed_predict(candidate.row_template.frame(rows), candidate), dtype=float)
+    if not np.allclose(prices, template_prices, rtol=1e-6):
+        raise ValueError("Template rows and reindexed rows predict differently")
+    if not np.isfinite(prices).all() or prices.min() < PRICE_RANGE[0] or prices.max() > PRICE_RANGE[1]:
+        raise ValueError(f"Smoke prices out of range {PRICE_RANGE}: {prices.round(0).tolist()}")
+
+    # A derived artifact (compiled / ONNX) left over from an older pipeline would silently disagree
+    if candidate.model is not None and candidate.predictor is not candidate.model:
+        reference = np.asarray(candidate.model.predict(frame), dtype=float)
+        if not np.allclose(prices, reference, rtol=1e-4):
+            raise ValueError(f"{INFERENCE_BACKEND} predictor disagrees with the pipeline: "
+                             "re-export it from this pipeline")
+    if candidate.student is not None:
+        fast_prices = np.asarray(fast_predict(frame, candidate), dtype=float)
+        if not np.isfinite(fast_prices).all():
+            raise ValueError("Student predicts non-finite prices")
+        student_gap = float(np.max(np.abs(fast_prices / prices - 1)))
+        if student_gap > STUDENT_MAX_GAP:
+            raise ValueError(f"Student smoke prices differ from the ensemble by up to {student_gap:.0%} "
+                             f"(limit {STUDENT_MAX_GAP:.0%}, AMES_STUDENT_MAX_GAP): re-run distill.py on this pipeline")
+    candidate.explainer.explain(frame, prices)  # Warm-up only
+
+    findings = {"smoke_houses": len(prices), "smoke_prices": [round(float(p), 2) for p in prices]}
+    if candidate.student is not None:
+        findings["student_gap"] = round(student_gap, 4)
+        findings["student_shares_transform"] = candidate.student_shares_transform
+    if current is not None:
+        current_frame = validation.frame.reindex(columns=current.expected_columns).fillna(current.model_defaults)
+        current_prices = np.asarray(timed_predict(current_frame, current), dtype=float)
+        shift = float(np.max(np.abs(prices / current_prices - 1)))
+        findings["max_shift"] = round(shift, 4)
+        if shift > RELOAD_MAX_SHIFT:
+            raise ValueError(f"Smoke prices moved by up to {shift:.0%} (limit {RELOAD_MAX_SHIFT:.0%}, AMES_RELOAD_MAX_SHIFT)")
+    return findings
+
+reloader = HotReloader(load_models, validate_models, watch_paths_fn=watched_paths)
+try:
+    reloader.load_initial()
+    print(f"✅ Model & Columns loaded successfully! (version {reloader.current.version})")
 except FileNotFoundError as e:
     print(f"❌ FATAL ERROR: Could not find file. {e}")
     print(f"   Looking in: {MODELS_DIR}")
 except Exception as e:
     print(f"❌ FATAL ERROR: {e}")
 
+# `kill -HUP <pid>` reloads too (serve.py turns it into a rolling restart of the workers)
+install_reload_signal(reloader)
+if RELOAD_WATCH_SECONDS > 0:
+    reloader.start_watching(RELOAD_WATCH_SECONDS)
+    print(f"🔁 Watching {MODELS_DIR} for new artifacts every {RELOAD_WATCH_SECONDS:g} s")
+
 # ==================================================
 # 4. DEFINE GUARDRAILS
 # ==================================================
-class HouseData(BaseModel):
-    # --- 1. REQUIRED FIELDS ---
-    GrLivArea: float = Field(..., gt=100, lt=10000, description="Above ground living area in sq ft")
-    YearBuilt: int = Field(..., gt=1800, lt=2030)
-    OverallQual: int = Field(..., ge=1, le=10, description="Rates the overall material and finish (1-10)")
-    Neighborhood: str 
-
-    # --- 2. RENOVATION FIELDS (Optional) ---
-    KitchenQual: Optional[str] = Field(None, description="Ex, Gd, TA, Fa, Po")
-    FullBath: Optional[int] = Field(None, ge=0, le=5)
-    HalfBath: Optional[int] = Field(None, ge=0, le=4)
-    
-    GarageCars: Optional[int] = Field(None, ge=0, le=5)
-    GarageArea: Optional[float] = Field(None, ge=0)
-    GarageType: Optional[str] = None
-
-    TotalBsmtSF: Optional[float] = Field(None, ge=0)
-    BsmtFinSF1: Optional[float] = Field(None, ge=0)
-    BsmtQual: Optional[str] = None
-    
-    WoodDeckSF: Optional[float] = Field(None, ge=0)
-    OpenPorchSF: Optional[float] = Field(None, ge=0)
-    PoolArea: Optional[float] = Field(None, ge=0)
-    Fireplaces: Optional[int] = Field(None, ge=0)
-    CentralAir: Optional[str] = None
-
-    # --- 3. STRUCTURAL FIELDS (Optional) ---
-    LotArea: Optional[float] = Field(None, gt=0)
-    LotFrontage: Optional[float] = Field(None, gt=0)
-    BldgType: Optional[str] = None
-    HouseStyle: Optional[str] = None
-    OverallCond: Optional[int] = Field(None, ge=1, le=10)
-    YearRemodAdd: Optional[int] = Field(None, ge=1900)
-
-    # --- MAGIC SWITCH (UPDATED FOR PYDANTIC V2) ---
-    # This replaces the old "class Config" to fix the warning
-    model_config = ConfigDict(extra='allow')
+# HouseData lives in schemas.py so batch jobs can apply the same guardrails
+# column-by-column (see bulk_validation.py).
 
 # ==================================================
 # 5. PREDICT ENDPOINT
 # ==================================================
 @app.route('/predict', methods=['POST'])
 def predict():
+    m = g.models
+    mode, error = requested_mode(m)
+    if error:
+        return error
     try:
         # 1. Validate Input using Pydantic
         data = request.get_json()
-        validated_data = HouseData(**data)
-        
-        # 2. Convert to DataFrame
-        input_df = pd.DataFrame([validated_data.model_dump()])
+        with STAGE["validate"].time():
+            validated_data = HouseData(**data)
         
-        # 3. Align with Model Structure (Reindex)
-        input_df = input_df.reindex(columns=expected_columns)
-        
-        # 4. Fill Missing Data with Defaults
-        input_df = input_df.fillna(model_defaults)
-        
-        # 5. Predict
-        prediction = model.predict(input_df)[0]
+        # 2. Copy the defaults-filled template row and patch in the supplied fields
+        #    (replaces DataFrame -> Reindex -> Fillna; unknown extras are counted and dropped)
+        with STAGE["assemble"].time():
+            row = m.row_template.assemble(validated_data.model_dump())
+
+        # 3. Predict
+        #    (in microbatch mode a full-mode row waits briefly to share a model call with its neighbours)
+        if mode == "fast":
+            prediction = cached_predict(m, [row], lambda df: fast_predict(df, m), cache=fast_cache)[0]
+        else:
+            prediction = cached_predict(m, [row], m.micro_batcher.predict if m.micro_batcher else None)[0]
         
         return jsonify({
             "predicted_price": float(prediction),
             "status": "success",
-            "version": "4.0 (Guardrails + Pydantic)"
+            "mode": mode,
+            "version": m.version
         })
 
     except ValidationError as e:
@@ -117,9 +575,303 @@ def predict():
             "error": "Validation Failed",
             "details": e.errors()
         }), 400
+
+    except Shed as e:
+        return shed_response(e)
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-        
+
+# ==================================================
+# 6. BATCH PREDICT ENDPOINT
+# ==================================================
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    m = g.models
+    mode, error = requested_mode(m)
+    if error:
+        return error
+    try:
+        # 1. Decode: JSON by default, Arrow IPC / Parquet / MessagePack by Content-Type,
+        #    and answer in whatever the Accept header prefers (see wire_formats.py)
+        try:
+            in_format = wire_formats.canonical(request.mimetype)
+            out_format = wire_formats.negotiate(request.accept_mimetypes)
+        except UnsupportedFormat as e:
+            return jsonify({"error": str(e)}), 415
+        if in_format == wire_formats.JSON:
+            shape, records = "records", request.get_json()
+        else:
+            try:
+                with STAGE["decode"].time():
+                    shape, records = wire_formats.decode(request.get_data(), in_format, m.categorical_columns)
+            except Exception as e:
+                return jsonify({"error": f"Could not decode {in_format} body: {e}"}), 400
+
+        # 2. Check the envelope: an array (or columnar table) no bigger than MAX_BATCH_SIZE
+        if shape == "records" and not isinstance(records, list):
+            return jsonify({"error": "Expected a JSON array of house records"}), 400
+        if len(records) > MAX_BATCH_SIZE:
+            return jsonify({
+                "error": f"Batch too large: {len(records)} records (max {MAX_BATCH_SIZE})"
+            }), 413
+
+        # 3. Validate the whole batch column-by-column (same rules and errors as HouseData),
+        #    keeping failures in their input slot. Columnar bodies are already a DataFrame.
+        with STAGE["validate"].time():
+            validation = validate_frame(records) if shape == "frame" else validate_records(records)
+
+        # 4. One DataFrame -> one Reindex -> one Fillna -> one Predict
+        #    dtype=object keeps each value exactly as the single-row path sees it
+        #    (e.g. MSSubClass=60 stays '60' instead of becoming '60.0' next to a NaN)
+        prices = {}
+        if validation.n_valid:
+            with STAGE["dataframe"].time():
+                batch_df = validation.frame
+                valid_positions = batch_df.index.tolist()
+            with STAGE["reindex"].time():
+                batch_df = batch_df.reindex(columns=m.expected_columns)
+            with STAGE["fillna"].time():
+                batch_df = batch_df.fillna(m.model_defaults)
+            if mode == "fast":
+                predictions = cached_predict(m, batch_df, lambda df: fast_predict(df, m), cache=fast_cache)
+            else:
+                predictions = cached_predict(m, batch_df)
+            prices = dict(zip(valid_positions, predictions))
+
+        summary = {
+            "n_records": len(records),
+            "n_success": validation.n_valid,
+            "n_failed": validation.n_invalid,
+            "status": "success",
+            "mode": mode,
+            "version": m.version
+        }
+
+        # 5a. Binary formats answer column by column
+        if out_format != wire_formats.JSON:
+            with STAGE["encode"].time():
+                columns = wire_formats.batch_columns(len(records), prices, validation.errors)
+                body = wire_formats.encode(out_format, columns, summary)
+            return Response(body, content_type=out_format)
+
+        # 5b. JSON: one result per record, in input order
+        results = []
+        for i in range(len(records)):
+            if i in prices:
+                results.append({"index": i, "status": "success", "predicted_price": prices[i]})
+            else:
+                results.append({
+                    "index": i,
+                    "status": "error",
+                    "error": "Validation Failed",
+                    "details": validation.errors[i]
+                })
+        return jsonify({"predictions": results, **summary})
+
+    except Shed as e:
+        return shed_response(e)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ==================================================
+# 7. EXPLAIN ENDPOINT
+# ==================================================
+@app.route('/explain', methods=['POST'])
+def explain():
+    m = g.models
+    if m is None:
+        return jsonify({"error": "Model not loaded (see /readyz)"}), 503
+    try:
+        data = request.get_json()
+        try:
+            top = int(request.args['top']) if 'top' in request.args else None
+        except ValueError:
+            return jsonify({"error": "top must be an integer"}), 400
+
+        # 1. One house (object) or many (array, same envelope rules as /predict_batch)
+        single = isinstance(data, dict)
+        records = [data] if single else data
+        if not isinstance(records, list):
+            return jsonify({"error": "Expected a house record or a JSON array of house records"}), 400
+        if len(records) > MAX_BATCH_SIZE:
+            return jsonify({
+                "error": f"Batch too large: {len(records)} records (max {MAX_BATCH_SIZE})"
+            }), 413
+
+        # 2. Validate (same rules and errors as /predict and /predict_batch)
+        with STAGE["validate"].time():
+            validation = validate_records(records)
+        if single and validation.n_invalid:
+            return jsonify({"error": "Validation Failed", "details": validation.errors[0]}), 400
+
+        results = [
+            {"index": i, "status": "error", "error": "Validation Failed", "details": details}
+            for i, details in validation.errors.items()
+        ]
+
+        # 3. Align -> explain every valid row in one batch per member
+        if validation.n_valid:
+            batch_df = validation.frame
+            valid_positions = batch_df.index.tolist()
+            batch_df = batch_df.reindex(columns=m.expected_columns).fillna(m.model_defaults)
+            explanations = cached_explain(m, batch_df)
+            aligned_rows = batch_df.to_dict(orient='records')
+            for i, explanation, row in zip(valid_positions, explanations, aligned_rows):
+                results.append({"index": i, "status": "success", **format_explanation(explanation, row, top)})
+        results.sort(key=lambda item: item["index"])
+
+        if single:
+            result = results[0]
+            del result["index"]
+            return jsonify({**result, "version": m.version})
+
+        return jsonify({
+            "explanations": results,
+            "n_records": len(records),
+            "n_success": validation.n_valid,
+            "n_failed": validation.n_invalid,
+            "status": "success",
+            "version": m.version
+        })
+
+    except Shed as e:
+        return shed_response(e)
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ==================================================
+# 8. CACHE STATS ENDPOINT
+# ==================================================
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({**prediction_cache.stats(), "fast": fast_cache.stats(), "explain": explain_cache.stats()})
+
+# ==================================================
+# 9. MICRO-BATCH STATS ENDPOINT
+# ==================================================
+@app.route('/microbatch/stats', methods=['GET'])
+def microbatch_stats():
+    micro_batcher = reloader.current.micro_batcher if reloader.current is not None else None
+    if micro_batcher is None:
+        return jsonify({"enabled": False, "serving_mode": SERVING_MODE})
+    return jsonify({"enabled": True, "serving_mode": SERVING_MODE, **micro_batcher.stats()})
+
+# ==================================================
+# 10. ADMISSION STATS ENDPOINT
+# ==================================================
+@app.route('/admission/stats', methods=['GET'])
+def admission_stats():
+    return jsonify({**admission.stats(), "pid": os.getpid()})
+
+# ==================================================
+# 11. METRICS ENDPOINT (Prometheus text format)
+# ==================================================
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Copy the cache / micro-batcher / member-pool counters into gauges at scrape time
+    models = reloader.current
+    micro_batcher = models.micro_batcher if models is not None else None
+    for stat, value in prediction_cache.stats().items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            CACHE_GAUGE.labels(stat=stat).set(value)
+    for stat, value in explain_cache.stats().items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            EXPLAIN_CACHE_GAUGE.labels(stat=stat).set(value)
+    if models is not None and models.student is not None:
+        for stat, value in fast_cache.stats().items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                FAST_CACHE_GAUGE.labels(stat=stat).set(value)
+    if micro_batcher is not None:
+        for stat, value in micro_batcher.stats().items():
+            if isinstance(value, (int, float)):
+                MICROBATCH_GAUGE.labels(stat=stat).set(value)
+    if member_pool is not None:
+        for stat, value in member_pool.stats().items():
+            MEMBER_POOL_GAUGE.labels(stat=stat).set(value)
+    if admission.enabled:
+        stats = admission.stats()
+        SATURATION.set(stats["saturation"])
+        for lane, lane_stats in stats["lanes"].items():
+            for stat in ("in_flight", "queued", "max_queue", "admitted", "mean_service_ms"):
+                ADMISSION_GAUGE.labels(lane=lane, stat=stat).set(lane_stats[stat])
+            for reason, count in lane_stats["shed"].items():
+                ADMISSION_GAUGE.labels(lane=lane, stat=f"shed_{reason}").set(count)
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+# ==================================================
+# 12. ADMIN: ON-DEMAND PROFILER
+# ==================================================
+# `kill -USR2 <pid>` also profiles this process for 10 s (no token needed: you already own the box)
+install_signal_handler(output_dir=PROFILE_DIR, tag="api")
+
+def is_admin():
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+@app.route('/admin/profile', methods=['POST'])
+def admin_profile():
+    if not is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        seconds = min(float(request.args.get('seconds', 10)), MAX_PROFILE_SECONDS)
+        interval_ms = float(request.args.get('interval_ms', 5))
+        if not (seconds > 0 and interval_ms >= MIN_INTERVAL_MS):  # also rejects NaN
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": f"seconds must be a positive number and interval_ms a number "
+                                 f">= {MIN_INTERVAL_MS:g}"}), 400
+
+    # Blocks this request thread only; other requests keep flowing (and get sampled)
+    try:
+        path, summary = profile_for(seconds, PROFILE_DIR, interval_ms, tag="api")
+    except ProfilerBusy as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify({"status": "success", "file": str(path), **summary})
+
+# ==================================================
+# 13. ADMIN: HOT RELOAD
+# ==================================================
+# Set by serve.py: under the pre-fork server a reload is a rolling restart run by the master
+reload_broadcast = None
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    if not is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    if reload_broadcast is not None:
+        reload_broadcast()
+        return jsonify({"status": "accepted", "version": reloader.stats()["version"],
+                        "detail": "rolling reload started by the serve.py master"}), 202
+
+    # Load + validate on this request thread; other requests keep using the current version
+    result = reloader.reload(reason="admin")
+    code = {"swapped": 200, "unchanged": 200, "busy": 409}.get(result["status"], 422)
+    return jsonify(result), code
+
+@app.route('/admin/reload', methods=['GET'])
+def admin_reload_status():
+    if not is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(reloader.stats())
+
+# ==================================================
+# 14. HEALTH ENDPOINTS (Liveness / Readiness)
+# ==================================================
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    # Liveness: the process is up and answering HTTP
+    return jsonify({"status": "alive", "pid": os.getpid()})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    # Readiness: every model artifact loaded, so /predict can succeed
+    models = reloader.current
+    if models is None:
+        return jsonify({"status": "not ready", "pid": os.getpid()}), 503
+    return jsonify({"status": "ready", "version": models.version, "pid": os.getpid()})
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
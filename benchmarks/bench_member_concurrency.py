@@ -0,0 +1,91 @@
+# bench_member_concurrency.py
+# Wall time vs batch size: VotingRegressor members one after another (as trained, n_jobs=1)
+# vs side by side on member_pool.MemberPool with per-member thread budgets.
+#
+# Both modes must return the same prices; the benchmark checks that on every batch size.
+# On a 1-core machine there is nothing to overlap, so expect no gain there. The Lasso's BLAS
+# cap is process-wide, so both modes run under it (it is one matrix-vector product either way).
+#
+# Usage:
+#   python benchmarks/bench_member_concurrency.py --data data/Ames_Housing_Price_Data.csv
+#   python benchmarks/bench_member_concurrency.py --backend compiled --threads "lasso=1,xgb=3,catboost=3"
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import joblib
+import numpy as np
+
+from compiled_model import DATA_PATH, MODELS_DIR, PIPELINE_PATH, compile_pipeline, load_training_features
+from member_pool import MemberPool, apply_thread_budget, parse_threads, pipeline_members
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000, 50000]
+
+
+def stages(predictor, catboost_threads=-1):
+    """(preprocess, members, combine), as app_4.0.predict_stages() builds them."""
+    if hasattr(predictor, "members"):
+        return predictor.transform, predictor.members(), predictor.combine
+    ttr = predictor.named_steps['model']
+    voting = ttr.regressor_
+
+    def combine(member_preds):
+        log_price = np.average(np.column_stack(member_preds), axis=1, weights=voting.weights)
+        return ttr.inverse_func(log_price)
+
+    return predictor.named_steps['preprocessor'].transform, pipeline_members(voting, catboost_threads), combine
+
+
+def median_ms(fn, repeat):
+    """Median wall time of `repeat` calls in ms (robust to one slow warm-up), and the last result."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs concurrent member evaluation.")
+    parser.add_argument("--data", default=str(DATA_PATH), help="CSV the batches are sampled from")
+    parser.add_argument("--backend", choices=["pipeline", "compiled"], default="pipeline")
+    parser.add_argument("--threads", default=None, help='Per-member budget, e.g. "lasso=1,xgb=2,catboost=2"')
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from utils import cast_to_str  # noqa: F401  (needed to unpickle the Pipeline)
+
+    pipeline = joblib.load(PIPELINE_PATH)
+    columns = joblib.load(MODELS_DIR / 'ames_model_columns.pkl')
+    source = load_training_features(args.data, columns)
+    threads = parse_threads(args.threads)
+    print(f"{os.cpu_count()} CPUs | backend: {args.backend} | budgets: {threads}\n")
+
+    # Two copies of the predictor: library-default threads vs pinned budgets
+    sequential = pipeline if args.backend == "pipeline" else compile_pipeline(pipeline)
+    concurrent = joblib.load(PIPELINE_PATH) if args.backend == "pipeline" else compile_pipeline(pipeline)
+    blas_limits = apply_thread_budget(concurrent, threads)
+    pool = MemberPool(min_rows=1)  # Always concurrent here, so the small-batch cost shows up
+
+    print(f"{'rows':>8}{'sequential p50 ms':>20}{'concurrent p50 ms':>20}{'speedup':>10}{'max |diff| $':>15}")
+    rng = np.random.default_rng(42)
+    for n in BATCH_SIZES:
+        batch = source.iloc[rng.integers(0, len(source), n)].reset_index(drop=True)
+        preprocess, members, combine = stages(sequential)
+        X = preprocess(batch)
+        seq_ms, seq_prices = median_ms(lambda: combine([predict(X) for _, predict in members]), args.repeat)
+
+        preprocess, members, combine = stages(concurrent, threads["catboost"])
+        X = preprocess(batch)
+        con_ms, con_prices = median_ms(lambda: combine(pool.run(members, X)), args.repeat)
+
+        diff = float(np.max(np.abs(seq_prices - con_prices)))
+        print(f"{n:>8,}{seq_ms:>20.2f}{con_ms:>20.2f}{seq_ms / con_ms:>9.2f}x{diff:>15.6f}")
+
+    blas_limits.restore_original_limits()
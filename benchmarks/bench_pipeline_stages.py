@@ -0,0 +1,276 @@
+# bench_pipeline_stages.py
+# Time and peak memory of every stage of final_production_pipeline, one stage at a time,
+# at 1 / 100 / 10k / 1M rows, stored per commit so regressions show up stage by stage.
+#
+# Each stage gets exactly the input it sees inside the fitted Pipeline:
+#   cast_to_str -> constant SimpleImputer -> OrdinalEncoder       (46 categorical columns)
+#   the same codes from CategoryCodeEncoder (category_codes.py, no astype(str) round trip)
+#   median SimpleImputer                                          (33 numeric columns)
+#   lasso OneHotEncoder + StandardScaler -> Lasso.predict         (on the encoded matrix)
+#   the same Lasso folded into per-category tables (lasso_tables.py, what compiled_model.py runs)
+#   XGBRegressor.predict, CatBoostRegressor.predict               (on the encoded matrix)
+# plus the two notebook transformers from preprocessing.py:
+#   FeatureEngineer.transform (raw frame), CorrelationThreshold.fit / .transform (encoded frame,
+#   as X_train_ordinal in the modeling notebook).
+#
+# Larger sizes tile the training rows. Times are the median of repeated runs (at least
+# --min-time seconds or 3 runs each). Peak memory comes from two extra runs: one with the
+# kernel's RSS high-water mark reset first (/proc/self/clear_refs, after malloc_trim), which
+# includes XGBoost/CatBoost native buffers, and one under tracemalloc (Python + NumPy only).
+#
+# Results land in benchmarks/results/pipeline_stages/<commit>.json; --compare diffs them.
+#
+# Usage:
+#   python benchmarks/bench_pipeline_stages.py --data data/Ames_Housing_Price_Data.csv
+#   python benchmarks/bench_pipeline_stages.py --sizes 1,100,10000 --compare HEAD~1 --tolerance 0.25
+import argparse
+import ctypes
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from category_codes import CategoryCodeEncoder
+from compiled_model import DATA_PATH, PIPELINE_PATH, compile_pipeline, load_training_features
+from lasso_tables import fold_lasso
+from preprocessing import CorrelationThreshold, FeatureEngineer
+from utils import cast_to_str
+
+SIZES = [1, 100, 10_000, 1_000_000]
+RESULTS_DIR = BASE_DIR / "benchmarks" / "results" / "pipeline_stages"
+AMES_CENTER = (42.0347, -93.6200)  # The notebook's geocoding fallback
+
+
+# ==========================================
+# 1. MEASUREMENT
+# ==========================================
+def _status_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise OSError(field)
+
+
+def _reset_peak_rss():
+    # Hand freed heap pages back first, or a stage reusing them would look free
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")  # Resets VmHWM to the current RSS (Linux >= 4.0)
+
+
+def peak_memory_mb(fn):
+    """
+    Extra memory at the peak of one fn() call, measured twice:
+      rss:    kernel high-water mark (everything, incl. XGBoost/CatBoost native buffers; Linux only)
+      traced: tracemalloc peak (Python objects + NumPy/pandas buffers only, but exact)
+    """
+    gc.collect()
+    try:
+        _reset_peak_rss()
+        before = _status_kb("VmRSS")
+        fn()
+        rss = max(0.0, (_status_kb("VmHWM") - before) / 1024)
+    except OSError:
+        rss = None
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rss, peak / 2 ** 20
+
+
+def time_stage(fn, min_time, max_runs=50):
+    """Median / min seconds over repeated calls (>= 3 runs or min_time seconds, whichever is more)."""
+    fn()  # Warm-up: lazy model state, page faults
+    times = []
+    started = time.perf_counter()
+    while len(times) < 3 or (time.perf_counter() - started < min_time and len(times) < max_runs):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), min(times), len(times)
+
+
+# ==========================================
+# 2. STAGES
+# ==========================================
+def pipeline_parts(pipeline):
+    preprocessor = pipeline.named_steps['preprocessor']
+    cat_pipe, cat_cols = preprocessor.named_transformers_['cat'], preprocessor.transformers_[0][2]
+    num_pipe, num_cols = preprocessor.named_transformers_['num'], preprocessor.transformers_[1][2]
+    members = pipeline.named_steps['model'].regressor_.named_estimators_
+    return cat_pipe, list(cat_cols), num_pipe, list(num_cols), members
+
+
+def stage_inputs(pipeline, X):
+    """Run the pipeline once, keeping what every stage receives."""
+    cat_pipe, cat_cols, num_pipe, num_cols, members = pipeline_parts(pipeline)
+    lasso = members['lasso']
+    inputs = {"raw": X, "cat": X[cat_cols]}
+    inputs["str"] = cast_to_str(inputs["cat"])
+    inputs["imputed"] = cat_pipe.named_steps['imputer'].transform(inputs["str"])
+    codes = cat_pipe.named_steps['ordinal'].transform(inputs["imputed"])
+    inputs["num"] = X[num_cols]
+    inputs["encoded"] = np.hstack([codes, num_pipe.transform(inputs["num"])])
+    inputs["scaled"] = lasso.named_steps['scaler'].transform(lasso.named_steps['prep'].transform(inputs["encoded"]))
+    inputs["encoded_df"] = pd.DataFrame(inputs["encoded"], columns=cat_cols + num_cols)
+    return inputs
+
+
+def stages(pipeline, inputs, correlation):
+    """[(name, fn)] — each fn runs one stage on its real input."""
+    cat_pipe, cat_cols, num_pipe, _, members = pipeline_parts(pipeline)
+    lasso = members['lasso']
+    encoder = CategoryCodeEncoder.from_pipeline(cat_pipe, cat_cols)
+    tables = fold_lasso(compile_pipeline(pipeline))
+    engineer = FeatureEngineer(coords_dict={n: AMES_CENTER for n in inputs["raw"]['Neighborhood'].dropna().unique()})
+    return [
+        ("cast_to_str", lambda: cast_to_str(inputs["cat"])),
+        ("constant_imputer", lambda: cat_pipe.named_steps['imputer'].transform(inputs["str"])),
+        ("ordinal_encoder", lambda: cat_pipe.named_steps['ordinal'].transform(inputs["imputed"])),
+        ("category_codes", lambda: encoder.transform(inputs["cat"])),
+        ("median_imputer", lambda: num_pipe.transform(inputs["num"])),
+        ("lasso_ohe_scaler", lambda: lasso.named_steps['scaler'].transform(
+            lasso.named_steps['prep'].transform(inputs["encoded"]))),
+        ("lasso_predict", lambda: lasso.named_steps['model'].predict(inputs["scaled"])),
+        ("lasso_tables_predict", lambda: tables.predict(inputs["encoded"])),
+        ("xgb_predict", lambda: members['xgb'].predict(inputs["encoded"])),
+        ("catboost_predict", lambda: members['catboost'].predict(inputs["encoded"])),
+        ("full_pipeline_predict", lambda: pipeline.predict(inputs["raw"])),
+        ("feature_engineer", lambda: engineer.transform(inputs["raw"])),
+        ("correlation_fit", lambda: CorrelationThreshold(threshold=0.9).fit(inputs["encoded_df"])),
+        ("correlation_transform", lambda: correlation.transform(inputs["encoded_df"])),
+    ]
+
+
+def tile(X, n_rows):
+    repeats = -(-n_rows // len(X))
+    return pd.concat([X] * repeats, ignore_index=True).iloc[:n_rows].reset_index(drop=True)
+
+
+# ==========================================
+# 3. RESULTS (per commit)
+# ==========================================
+def git_commit():
+    """Short SHA, with '-dirty' if tracked files differ from it."""
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], cwd=BASE_DIR).returncode != 0
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def resolve_result(ref):
+    """A results file path, or a commit-ish whose results file should exist."""
+    path = Path(ref)
+    if path.exists():
+        return path
+    sha = subprocess.run(["git", "rev-parse", "--short", ref], cwd=BASE_DIR,
+                         capture_output=True, text=True).stdout.strip()
+    path = RESULTS_DIR / f"{sha}.json"
+    if not sha or not path.exists():
+        raise SystemExit(f"❌ No stored results for '{ref}' in {RESULTS_DIR}")
+    return path
+
+
+def compare(current, reference, tolerance):
+    """Print time ratios per stage and size; -> list of regressions past tolerance."""
+    old = {(r["stage"], r["rows"]): r for r in reference["results"]}
+    regressions = []
+    print(f"\nvs {reference['commit']}: {'stage':<24}{'rows':>10}{'old ms':>12}{'new ms':>12}{'ratio':>8}")
+    for r in current["results"]:
+        before = old.get((r["stage"], r["rows"]))
+        if before is None:
+            continue
+        ratio = r["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+        flag = ""
+        # Sub-0.1 ms timings are mostly timer noise
+        if ratio > 1 + tolerance and r["median_ms"] > 0.1:
+            regressions.append(f"{r['stage']} @ {r['rows']:,} rows: {before['median_ms']:.3f} -> {r['median_ms']:.3f} ms")
+            flag = "  ❌"
+        print(f"{'':<{len('vs ' + reference['commit']) + 2}}{r['stage']:<24}{r['rows']:>10,}"
+              f"{before['median_ms']:>12.3f}{r['median_ms']:>12.3f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Per-stage time and peak memory of the production pipeline.")
+    parser.add_argument("--data", default=str(DATA_PATH), help="Training CSV (rows are tiled to each size)")
+    parser.add_argument("--model", default=str(PIPELINE_PATH))
+    parser.add_argument("--sizes", default=",".join(str(n) for n in SIZES))
+    parser.add_argument("--stages", default=None, help="Comma-separated subset of stage names")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds of repeats per stage and size")
+    parser.add_argument("--output", default=None, help=f"Default: {RESULTS_DIR}/<commit>.json")
+    parser.add_argument("--compare", default=None, help="Commit or results file to diff against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before --compare fails")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)
+    pipeline = joblib.load(args.model)
+    columns = list(pipeline.named_steps['preprocessor'].feature_names_in_)
+    X_train = load_training_features(args.data, columns)
+    sizes = [int(n) for n in args.sizes.split(",")]
+    wanted = set(args.stages.split(",")) if args.stages else None
+
+    # Fitted once on the training rows, like the notebook; .transform is what gets timed per size
+    correlation = CorrelationThreshold(threshold=0.9).fit(stage_inputs(pipeline, X_train)["encoded_df"])
+
+    report = {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "machine": platform.machine(),
+                        "numpy": np.__version__, "pandas": pd.__version__},
+        "results": [],
+    }
+    print(f"{'stage':<24}{'rows':>10}{'median ms':>12}{'min ms':>12}{'us/row':>10}{'RSS MB':>10}{'traced MB':>10}{'runs':>6}")
+    for n_rows in sizes:
+        inputs = stage_inputs(pipeline, tile(X_train, n_rows))
+        for name, fn in stages(pipeline, inputs, correlation):
+            if wanted and name not in wanted:
+                continue
+            median_s, min_s, runs = time_stage(fn, args.min_time)
+            peak_rss_mb, peak_traced_mb = peak_memory_mb(fn)
+            report["results"].append({
+                "stage": name, "rows": n_rows, "median_ms": median_s * 1000, "min_ms": min_s * 1000,
+                "us_per_row": median_s * 1e6 / n_rows, "peak_rss_mb": peak_rss_mb,
+                "peak_traced_mb": peak_traced_mb, "runs": runs,
+            })
+            rss = f"{peak_rss_mb:>10.1f}" if peak_rss_mb is not None else f"{'n/a':>10}"
+            print(f"{name:<24}{n_rows:>10,}{median_s * 1000:>12.3f}{min_s * 1000:>12.3f}"
+                  f"{median_s * 1e6 / n_rows:>10.2f}{rss}{peak_traced_mb:>10.1f}{runs:>6}")
+        del inputs
+        gc.collect()
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n📝 Results written to {output}")
+
+    if args.compare:
+        regressions = compare(report, json.loads(resolve_result(args.compare).read_text()), args.tolerance)
+        if regressions:
+            print(f"\n❌ Slower than {args.compare} by more than {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✅ No stage slower than {args.compare} by more than {args.tolerance:.0%}")
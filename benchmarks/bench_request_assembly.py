@@ -0,0 +1,91 @@
+# bench_request_assembly.py
+# /predict request assembly: DataFrame -> reindex -> fillna (old) vs RowTemplate copy + patch (new).
+#
+# Both paths must hand the model the same values, so the benchmark first checks that the
+# cache keys and model.predict() agree for every payload, then times each path.
+#
+# Usage:
+#   python benchmarks/bench_request_assembly.py [--repeat 20000]
+import argparse
+import sys
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import joblib
+import pandas as pd
+
+from compiled_model import MODELS_DIR, PIPELINE_PATH
+from prediction_cache import make_row_key
+from row_template import RowTemplate
+from schemas import HouseData
+
+PAYLOADS = {
+    "minimal (4 fields)": {"Neighborhood": "CollgCr", "GrLivArea": 1500, "YearBuilt": 2005, "OverallQual": 7},
+    "full HouseData (25 fields)": {
+        "Neighborhood": "NridgHt", "GrLivArea": 2400, "YearBuilt": 2007, "OverallQual": 9,
+        "KitchenQual": "Ex", "FullBath": 2, "HalfBath": 1, "GarageCars": 3, "GarageArea": 820,
+        "GarageType": "Attchd", "TotalBsmtSF": 1600, "BsmtFinSF1": 1100, "BsmtQual": "Ex",
+        "WoodDeckSF": 200, "OpenPorchSF": 60, "PoolArea": 0, "Fireplaces": 1, "CentralAir": "Y",
+        "LotArea": 12000, "LotFrontage": 85, "BldgType": "1Fam", "HouseStyle": "2Story",
+        "OverallCond": 5, "YearRemodAdd": 2008,
+    },
+    "extras (model + unknown fields)": {
+        "Neighborhood": "OldTown", "GrLivArea": 1200, "YearBuilt": 1925, "OverallQual": 5,
+        "MSSubClass": 70, "Street": "Pave", "listing_id": "A-1042", "agent": "x", "utm_source": "mail",
+    },
+}
+
+
+def old_path(fields, columns, defaults):
+    input_df = pd.DataFrame([fields])
+    input_df = input_df.reindex(columns=columns)
+    return input_df.fillna(defaults)
+
+
+def time_per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6  # microseconds
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark /predict request assembly.")
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    from utils import cast_to_str  # noqa: F401  (needed to unpickle the Pipeline)
+
+    warnings.simplefilter("ignore", FutureWarning)  # fillna's downcasting notice, once per call
+
+    model = joblib.load(PIPELINE_PATH)
+    columns = joblib.load(MODELS_DIR / 'ames_model_columns.pkl')
+    defaults = joblib.load(MODELS_DIR / 'ames_model_defaults.pkl')
+    categorical_columns = set(model.named_steps['preprocessor'].transformers_[0][2])
+    categorical_mask = [col in categorical_columns for col in columns]
+    template = RowTemplate(columns, defaults)
+
+    print(f"{'payload':<34}{'old µs':>10}{'assemble µs':>13}{'+ frame µs':>12}{'speedup':>10}   parity")
+    for label, payload in PAYLOADS.items():
+        fields = HouseData(**payload).model_dump()
+
+        # 1. Same values in, same price out
+        old_df = old_path(fields, columns, defaults)
+        row = template.assemble(fields)
+        new_df = template.frame([row])
+        same_key = make_row_key(next(old_df.itertuples(index=False, name=None)), categorical_mask) == \
+            make_row_key(row, categorical_mask)
+        old_price, new_price = model.predict(old_df)[0], model.predict(new_df)[0]
+        parity = "✅" if same_key and old_price == new_price else f"❌ ({old_price:.2f} vs {new_price:.2f})"
+
+        # 2. Timings: the cache-hit path only needs the row; a miss also builds the frame
+        old_us = time_per_call(lambda: old_path(fields, columns, defaults), args.repeat // 10)
+        assemble_us = time_per_call(lambda: template.assemble(fields), args.repeat)
+        frame_us = time_per_call(lambda: template.frame([template.assemble(fields)]), args.repeat // 10)
+        print(f"{label:<34}{old_us:>10.1f}{assemble_us:>13.1f}{frame_us:>12.1f}{old_us / frame_us:>9.1f}x   {parity}")
+
+    stats = template.stats()
+    print(f"\nUnknown fields dropped during the run: {stats['dropped_fields_total']:,} ({stats['dropped_fields']})")
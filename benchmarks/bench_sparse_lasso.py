@@ -0,0 +1,120 @@
+# bench_sparse_lasso.py
+# Dense vs sparse Lasso branch (sparse_lasso.py): time and peak memory for training and for
+# batch scoring, plus the coefficient / prediction differences between the two.
+#
+#   train:  make_lasso_branch(sparse=False / True).fit(encoded X, log1p(SalePrice))
+#   score:  the shipped Lasso member .predict(encoded X), as-is vs sparsify_lasso_branch()
+#
+# The input is the production preprocessor's output (what the member sees inside the Pipeline);
+# larger sizes tile the training rows. Peak memory is measured as in bench_pipeline_stages.py.
+# A dense run that would not fit in memory (--max-dense-gb) is skipped and reported as such.
+#
+# Usage:
+#   python benchmarks/bench_sparse_lasso.py --data data/Ames_Housing_Price_Data.csv
+#   python benchmarks/bench_sparse_lasso.py --train-sizes 0,100000 --score-sizes 10000,1000000
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import warnings
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from bench_pipeline_stages import git_commit, peak_memory_mb, tile, time_stage
+from compiled_model import DATA_PATH, PIPELINE_PATH
+from sparse_lasso import check_equivalence, make_lasso_branch, sparsify_lasso_branch
+
+RESULTS_DIR = BASE_DIR / "benchmarks" / "results" / "sparse_lasso"
+
+
+def dense_gb(n_rows, n_features):
+    # The OHE output and the scaler's copy of it exist at the same time
+    return 2 * n_rows * n_features * 8 / 2 ** 30
+
+
+def measure(fn, min_time):
+    median_s, _, runs = time_stage(fn, min_time, max_runs=10)
+    peak_rss_mb, peak_traced_mb = peak_memory_mb(fn)
+    return {"seconds": median_s, "peak_rss_mb": peak_rss_mb, "peak_traced_mb": peak_traced_mb, "runs": runs}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Dense vs sparse Lasso branch: time and peak memory.")
+    parser.add_argument("--data", default=str(DATA_PATH), help="Ames CSV (with SalePrice)")
+    parser.add_argument("--model", default=str(PIPELINE_PATH))
+    parser.add_argument("--train-sizes", default="0,100000", help="Rows to fit on (0 = the CSV as is)")
+    parser.add_argument("--score-sizes", default="10000,1000000")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds of repeats per measurement")
+    parser.add_argument("--max-dense-gb", type=float, default=None,
+                        help="Skip dense runs whose one-hot matrices would exceed this (default: half of RAM)")
+    parser.add_argument("--output", default=None, help=f"Default: {RESULTS_DIR}/<commit>.json")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)
+    pipeline = joblib.load(args.model)
+    preprocessor = pipeline.named_steps['preprocessor']
+    df = pd.read_csv(args.data)
+    raw = df.reindex(columns=preprocessor.feature_names_in_)
+    log_price = np.log1p(df['SalePrice'].to_numpy())
+    n_cats = len(preprocessor.transformers_[0][2])
+
+    shipped = pipeline.named_steps['model'].regressor_.named_estimators_['lasso']
+    branches = {"dense": shipped, "sparse": sparsify_lasso_branch(shipped)}
+    n_features = len(shipped.named_steps['scaler'].scale_)
+    max_dense_gb = args.max_dense_gb
+    if max_dense_gb is None:
+        max_dense_gb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 2 ** 30 / 2
+
+    report = {"commit": git_commit(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "one_hot_features": n_features, "results": [], "equivalence": {}}
+    print(f"{'phase':<7}{'rows':>11}{'kind':>8}{'seconds':>10}{'RSS MB':>10}{'traced MB':>11}")
+
+    def run(phase, n_rows, kind, fn):
+        if kind == "dense" and dense_gb(n_rows, n_features) > max_dense_gb:
+            print(f"{phase:<7}{n_rows:>11,}{kind:>8}   skipped (needs ~{dense_gb(n_rows, n_features):.1f} GB dense)")
+            report["results"].append({"phase": phase, "rows": n_rows, "kind": kind, "skipped": True,
+                                      "dense_gb": dense_gb(n_rows, n_features)})
+            return
+        result = measure(fn, args.min_time)
+        report["results"].append({"phase": phase, "rows": n_rows, "kind": kind, **result})
+        rss = f"{result['peak_rss_mb']:>10.1f}" if result['peak_rss_mb'] is not None else f"{'n/a':>10}"
+        print(f"{phase:<7}{n_rows:>11,}{kind:>8}{result['seconds']:>10.3f}{rss}{result['peak_traced_mb']:>11.1f}")
+
+    # A. Training (the tiled rows have the same optimum, so the coefficients must agree at every size)
+    for n_rows in [int(n) or len(raw) for n in args.train_sizes.split(",")]:
+        X = preprocessor.transform(tile(raw, n_rows))
+        y = np.resize(log_price, n_rows)
+        for kind in ("dense", "sparse"):
+            run("train", n_rows, kind, lambda: make_lasso_branch(n_cats, sparse=kind == "sparse").fit(X, y))
+        if dense_gb(n_rows, n_features) <= max_dense_gb:
+            fitted = {kind: make_lasso_branch(n_cats, sparse=kind == "sparse").fit(X, y) for kind in ("dense", "sparse")}
+            report["equivalence"][f"train_{n_rows}"] = check_equivalence(fitted["dense"], fitted["sparse"], X)
+        del X
+        gc.collect()
+
+    # B. Scoring with the shipped member
+    for n_rows in [int(n) for n in args.score_sizes.split(",")]:
+        X = preprocessor.transform(tile(raw, n_rows))
+        for kind, branch in branches.items():
+            run("score", n_rows, kind, lambda: branch.predict(X))
+        if dense_gb(n_rows, n_features) <= max_dense_gb:
+            report["equivalence"][f"score_{n_rows}"] = check_equivalence(branches["dense"], branches["sparse"], X)
+        del X
+        gc.collect()
+
+    print()
+    for name, eq in report["equivalence"].items():
+        print(f"{name:<16} max |coef diff| {eq['max_coef_diff']:.1e}   max |pred diff| {eq['max_pred_diff']:.1e} log-$")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n📝 Results written to {output}")
@@ -0,0 +1,89 @@
+# bench_wire_formats.py
+# POST /predict_batch round trip per wire format: client encode -> server -> client decode.
+#
+# The prediction cache is warmed first, so the model call is a cache hit and the timings show
+# what the wire format costs (body parsing, validation input, response building), not inference.
+# Every format must return the same statuses and prices as JSON; the benchmark checks that.
+#
+# Usage:
+#   python benchmarks/bench_wire_formats.py --data data/Ames_Housing_Price_Data.csv [--rows 1000]
+import argparse
+import io
+import json
+import statistics
+import sys
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import msgpack
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import wire_formats
+from compiled_model import DATA_PATH
+from serve import load_app_module
+
+
+def encode_request(fmt, df, records):
+    if fmt == wire_formats.JSON:
+        return json.dumps(records).encode()
+    if fmt == wire_formats.MSGPACK:
+        return msgpack.packb(records)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    if fmt == wire_formats.ARROW:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, sink)
+    return sink.getvalue()
+
+
+def decode_response(fmt, body):
+    """-> (statuses, prices) in input order."""
+    if fmt == wire_formats.JSON:
+        predictions = json.loads(body)["predictions"]
+        return [p["status"] for p in predictions], [p.get("predicted_price", np.nan) for p in predictions]
+    if fmt == wire_formats.MSGPACK:
+        columns = msgpack.unpackb(body)["predictions"]
+        return columns["status"], [np.nan if p is None else p for p in columns["predicted_price"]]
+    table = pa.ipc.open_stream(body).read_all() if fmt == wire_formats.ARROW else pq.read_table(io.BytesIO(body))
+    return table.column("status").to_pylist(), table.column("predicted_price").to_numpy(zero_copy_only=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark /predict_batch wire formats.")
+    parser.add_argument("--data", default=str(DATA_PATH), help="CSV the batch is taken from")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)
+    app_module = load_app_module()
+    client = app_module.app.test_client()
+
+    df = pd.read_csv(args.data).drop(columns=['PID', 'Unnamed: 0', 'SalePrice'], errors='ignore').head(args.rows)
+    records = json.loads(df.to_json(orient='records'))
+
+    reference = None
+    print(f"{'format':<40}{'request KB':>11}{'response KB':>12}{'round trip ms':>15}   parity")
+    for fmt in wire_formats.FORMATS:
+        times = []
+        for _ in range(args.repeat + 1):  # The first call warms the cache
+            start = time.perf_counter()
+            body = encode_request(fmt, df, records)
+            response = client.post('/predict_batch', data=body, content_type=fmt, headers={"Accept": fmt})
+            statuses, prices = decode_response(fmt, response.data)
+            times.append(time.perf_counter() - start)
+
+        prices = np.asarray(prices, dtype=np.float64)
+        if reference is None:
+            reference = (statuses, prices)
+        same = list(statuses) == list(reference[0]) and np.array_equal(prices, reference[1], equal_nan=True)
+        print(f"{fmt:<40}{len(body) / 1024:>11.0f}{len(response.data) / 1024:>12.0f}"
+              f"{statistics.median(times[1:]) * 1000:>15.1f}   {'✅' if same else '❌'}")
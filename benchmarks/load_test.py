@@ -0,0 +1,336 @@
+# load_test.py
+# Reproducible HTTP load test + latency regression gate for app_4.0.py.
+#
+# 1. Starts the API locally (serve.py, N pre-forked workers) on a free port and waits for /readyz,
+#    or drives an already-running server with --url.
+# 2. C client threads send a weighted mix of requests for a fixed duration (after a warm-up):
+#      full     /predict with every field of a real Ames row              -> 200
+#      minimal  /predict with the four required fields                    -> 200
+#      invalid  /predict breaking a guardrail (200k sq ft)                -> 400
+#      batch    /predict_batch with --batch-size real rows                -> 200
+#    Closed loop by default (each thread sends as soon as its last reply arrives). With --rate the
+#    load is open loop: requests are scheduled at a fixed total rate and latency is measured from
+#    the scheduled time, so a stalled server cannot hide its queueing delay (coordinated omission).
+#    House values are varied per request, so the prediction cache only sees realistic repeats.
+# 3. Writes a JSON report: throughput, p50/p95/p99/max latency and status codes, overall and per kind.
+# 4. With --baseline, compares against a stored report and exits 1 if throughput dropped or a
+#    latency percentile grew by more than --tolerance (or any request got an unexpected status).
+#
+# Usage:
+#   python benchmarks/load_test.py --concurrency 8 --duration 30 --mix "full=4,minimal=4,invalid=1,batch=1"
+#   python benchmarks/load_test.py --output load.json --save-baseline benchmarks/baselines/load_test.json
+#   python benchmarks/load_test.py --baseline benchmarks/baselines/load_test.json --tolerance 0.15   # CI gate
+#   python benchmarks/load_test.py --url http://127.0.0.1:5000 --rate 200
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import requests
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from bulk_validation import validate_records
+from compiled_model import DATA_PATH
+
+KINDS = ("full", "minimal", "invalid", "batch")
+EXPECTED_STATUS = {"full": 200, "minimal": 200, "invalid": 400, "batch": 200}
+PERCENTILES = (50, 95, 99)
+DEFAULT_MIX = "full=4,minimal=4,invalid=1,batch=1"
+
+
+def parse_mix(text):
+    """'full=4,minimal=4,invalid=1,batch=1' -> {kind: weight}"""
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in KINDS:
+            raise SystemExit(f"❌ Unknown request kind '{kind}' (expected one of {list(KINDS)})")
+        mix[kind] = float(weight or 1)
+    return {kind: weight for kind, weight in mix.items() if weight > 0}
+
+
+# ==========================================
+# 1. PAYLOADS
+# ==========================================
+class Payloads:
+    def __init__(self, data_path, batch_size, seed):
+        df = pd.read_csv(data_path).drop(columns=['PID', 'Unnamed: 0', 'SalePrice'], errors='ignore')
+        # Through JSON, so NaN cells are dropped exactly as a real client would omit them
+        rows = [{k: v for k, v in row.items() if v is not None} for row in json.loads(df.to_json(orient='records'))]
+        # Only rows that pass the guardrails, so every "full" request is expected to succeed
+        validation = validate_records(rows)
+        self.rows = [row for i, row in enumerate(rows) if i not in validation.errors]
+        if not self.rows:
+            raise SystemExit(f"❌ No row of {data_path} passes the HouseData guardrails")
+        self.batch_size = batch_size
+        self.seed = seed
+
+    def generator(self, thread_id):
+        rng = random.Random(self.seed * 1000 + thread_id)
+
+        def make(kind):
+            if kind == "full":
+                return "/predict", {**rng.choice(self.rows), "GrLivArea": rng.randint(600, 4000)}
+            if kind == "minimal":
+                return "/predict", {"Neighborhood": rng.choice(self.rows)["Neighborhood"],
+                                    "GrLivArea": rng.randint(600, 4000),
+                                    "YearBuilt": rng.randint(1900, 2010),
+                                    "OverallQual": rng.randint(1, 10)}
+            if kind == "invalid":
+                return "/predict", {**rng.choice(self.rows), "GrLivArea": 200000}
+            return "/predict_batch", rng.sample(self.rows, min(self.batch_size, len(self.rows)))
+
+        return make
+
+
+# ==========================================
+# 2. SERVER UNDER TEST
+# ==========================================
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers, env_overrides, log_path, timeout=300):
+    port = free_port()
+    env = {**os.environ, **env_overrides}
+    log = open(log_path, "w")
+    process = subprocess.Popen(
+        [sys.executable, str(BASE_DIR / "serve.py"), "--workers", str(workers),
+         "--host", "127.0.0.1", "--port", str(port), "--report-interval", "0"],
+        cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"❌ Server exited during startup (see {log_path})")
+        try:
+            if requests.get(f"{url}/readyz", timeout=1).status_code == 200:
+                return process, url
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise SystemExit(f"❌ Server not ready after {timeout} s (see {log_path})")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# ==========================================
+# 3. LOAD GENERATION
+# ==========================================
+def run_load(url, payloads, mix, concurrency, duration, warmup, rate=None):
+    """-> list of (kind, status, latency_s, rows) recorded after the warm-up."""
+    kinds, weights = zip(*mix.items())
+    start = time.perf_counter() + 0.2  # Every thread starts together
+    record_from = start + warmup
+    stop_at = record_from + duration
+    interval = concurrency / rate if rate else None  # Per-thread schedule for the open loop
+    results = [[] for _ in range(concurrency)]
+
+    def client(thread_id):
+        session = requests.Session()
+        make = payloads.generator(thread_id)
+        rng = random.Random(payloads.seed * 1000 + thread_id + 500)
+        scheduled = start + (interval * thread_id / concurrency if interval else 0.0)
+        while True:
+            if not interval:
+                scheduled = max(time.perf_counter(), start)  # Closed loop: the next request goes out now
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if scheduled >= stop_at:
+                break
+            kind = rng.choices(kinds, weights)[0]
+            path, body = make(kind)
+            try:
+                status = session.post(url + path, json=body, timeout=60).status_code
+            except requests.RequestException:
+                status = 0  # Connection error / timeout
+            latency = time.perf_counter() - scheduled
+            if scheduled >= record_from:
+                results[thread_id].append((kind, status, latency, len(body) if kind == "batch" else 1))
+            if interval:
+                scheduled += interval
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return [sample for thread_results in results for sample in thread_results]
+
+
+# ==========================================
+# 4. REPORT
+# ==========================================
+def summarize(samples, duration):
+    latencies_ms = np.array([latency for _, _, latency, _ in samples]) * 1000.0
+    statuses = Counter(str(status) for _, status, _, _ in samples)
+    unexpected = sum(1 for kind, status, _, _ in samples if status != EXPECTED_STATUS[kind])
+    summary = {
+        "requests": len(samples),
+        "rows": int(sum(rows for _, _, _, rows in samples)),
+        "throughput_rps": len(samples) / duration,
+        "rows_per_s": sum(rows for _, _, _, rows in samples) / duration,
+        "latency_ms": {f"p{p}": float(np.percentile(latencies_ms, p)) if len(samples) else 0.0
+                       for p in PERCENTILES},
+        "status_codes": dict(sorted(statuses.items())),
+        "unexpected_status": unexpected,
+    }
+    summary["latency_ms"]["max"] = float(latencies_ms.max()) if len(samples) else 0.0
+    summary["latency_ms"]["mean"] = float(latencies_ms.mean()) if len(samples) else 0.0
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(samples, args, mix):
+    return {
+        "config": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "rate": args.rate,
+            "mix": mix,
+            "batch_size": args.batch_size,
+            "workers": None if args.url else args.workers,
+            "server_env": dict(args.env),
+            "seed": args.seed,
+        },
+        "environment": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "overall": summarize(samples, args.duration),
+        "by_kind": {kind: summarize([s for s in samples if s[0] == kind], args.duration) for kind in mix},
+    }
+
+
+def print_report(report):
+    print(f"\n{'kind':<10}{'requests':>10}{'req/s':>10}{'rows/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'max ms':>10}   status codes")
+    for name, s in [*report["by_kind"].items(), ("overall", report["overall"])]:
+        lat = s["latency_ms"]
+        print(f"{name:<10}{s['requests']:>10}{s['throughput_rps']:>10.1f}{s['rows_per_s']:>10.0f}"
+              f"{lat['p50']:>10.1f}{lat['p95']:>10.1f}{lat['p99']:>10.1f}{lat['max']:>10.1f}   {s['status_codes']}")
+
+
+# ==========================================
+# 5. REGRESSION GATE
+# ==========================================
+def compare(report, baseline, tolerance):
+    """-> list of human-readable regressions (empty = pass)."""
+    regressions = []
+    for name in ["overall", *report["by_kind"]]:
+        current = report["overall"] if name == "overall" else report["by_kind"][name]
+        reference = baseline["overall"] if name == "overall" else baseline.get("by_kind", {}).get(name)
+        if reference is None or not reference["requests"]:
+            continue
+        if current["unexpected_status"]:
+            regressions.append(f"{name}: {current['unexpected_status']} unexpected status codes "
+                               f"{current['status_codes']}")
+        if current["throughput_rps"] < reference["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {current['throughput_rps']:.1f} req/s vs "
+                               f"baseline {reference['throughput_rps']:.1f}")
+        for p in PERCENTILES:
+            key = f"p{p}"
+            if current["latency_ms"][key] > reference["latency_ms"][key] * (1 + tolerance):
+                regressions.append(f"{name}: {key} {current['latency_ms'][key]:.1f} ms vs "
+                                   f"baseline {reference['latency_ms'][key]:.1f} ms")
+    load_shape = ("mix", "concurrency", "rate", "batch_size", "workers")
+    if any(report["config"].get(key) != baseline["config"].get(key) for key in load_shape):
+        print(f"⚠️ Baseline was recorded with a different load ({', '.join(load_shape)}); "
+              "the comparison is indicative only.")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test and latency regression gate for app_4.0.py")
+    parser.add_argument("--url", default=None, help="Drive a running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="serve.py workers for the local server")
+    parser.add_argument("--env", action="append", default=[], type=lambda kv: tuple(kv.split("=", 1)),
+                        help="Extra server environment, e.g. --env AMES_CACHE_SIZE=0 (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before that")
+    parser.add_argument("--rate", type=float, default=None, help="Open loop: total requests/s (default: closed loop)")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--data", default=str(DATA_PATH), help="CSV the house payloads are drawn from")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="load_test_report.json")
+    parser.add_argument("--baseline", default=None, help="Fail (exit 1) if results regress past this report")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="Allowed relative regression")
+    parser.add_argument("--save-baseline", default=None, help="Also store this run as the baseline here")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    payloads = Payloads(args.data, args.batch_size, args.seed)
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_server(args.workers, dict(args.env), Path(args.output).with_suffix(".server.log"))
+        print(f"🚀 Started serve.py ({args.workers} worker(s)) on {url}")
+    try:
+        mode = f"open loop at {args.rate:.0f} req/s" if args.rate else "closed loop"
+        print(f"🔥 {args.concurrency} clients, {mode}, mix {mix}: {args.warmup:.0f} s warm-up + {args.duration:.0f} s")
+        samples = run_load(url, payloads, mix, args.concurrency, args.duration, args.warmup, args.rate)
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    report = build_report(samples, args, mix)
+    print_report(report)
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"\n📝 Report written to {args.output}")
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+        print(f"📌 Baseline stored in {args.save_baseline}")
+
+    if args.baseline:
+        regressions = compare(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print(f"\n❌ Regression past the baseline (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✅ Within {args.tolerance:.0%} of the baseline {args.baseline}")
+    elif report["overall"]["unexpected_status"]:
+        print(f"\n❌ {report['overall']['unexpected_status']} requests got an unexpected status code")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,429 @@
+# bulk_validation.py
+# Columnar validation: the HouseData guardrails applied to a whole batch at once.
+#
+# HouseData.model_validate() builds one Python object per record, which dominates batch jobs
+# of more than a few thousand rows. This module reads the same field definitions from the
+# schema (type, required/optional, gt/ge/lt/le from Field(...)) and checks each field as one
+# NumPy/pandas column operation. Failing rows get the same error dicts as
+# ValidationError.errors() (type, loc, msg, input, ctx, url), so /predict_batch and offline
+# jobs reject exactly what /predict rejects, with the same messages.
+#
+# Missing values:
+#   - validate_records(records): an absent key and an explicit null are told apart,
+#     exactly as Pydantic does (required + null -> "valid number", not "Field required")
+#   - validate_frame(df): NaN / None cells mean "not provided" (CSV / Parquet files)
+#
+# Usage:
+#   result = validate_frame(df)
+#   result.valid_mask        # one bool per row
+#   result.errors[7]         # [{'type': 'greater_than', 'loc': ('GrLivArea',), 'msg': ...}]
+#   result.frame             # valid rows, values coerced like model_dump()
+import math
+import re
+import typing
+
+import numpy as np
+import pandas as pd
+import pydantic
+
+from schemas import HouseData
+
+ERROR_URL = f"https://errors.pydantic.dev/{pydantic.version.version_short()}/v/{{}}"
+
+MESSAGES = {
+    "missing": "Field required",
+    "model_type": "Input should be a valid dictionary or instance of {class_name}",
+    "string_type": "Input should be a valid string",
+    "string_unicode": "Input should be a valid string, unable to parse raw data as a unicode string",
+    "float_type": "Input should be a valid number",
+    "float_parsing": "Input should be a valid number, unable to parse string as a number",
+    "int_type": "Input should be a valid integer",
+    "int_parsing": "Input should be a valid integer, unable to parse string as an integer",
+    "int_from_float": "Input should be a valid integer, got a number with a fractional part",
+    "int_parsing_size": "Unable to parse input string as an integer, exceeded maximum size",
+    "finite_number": "Input should be a finite number",
+    "less_than_equal": "Input should be less than or equal to {le}",
+    "less_than": "Input should be less than {lt}",
+    "greater_than_equal": "Input should be greater than or equal to {ge}",
+    "greater_than": "Input should be greater than {gt}",
+}
+
+# Floats and NumPy scalars must fit in an int64 to become an int (Python ints and strings need not)
+INT64_LIMIT = 2.0 ** 63
+# float64 holds every integer below this exactly; larger ones are read back from the input cell
+EXACT_FLOAT_LIMIT = 2.0 ** 53
+
+# Pydantic checks bounds in this order and reports only the first failure
+CONSTRAINTS = [("le", "less_than_equal"), ("lt", "less_than"), ("ge", "greater_than_equal"), ("gt", "greater_than")]
+
+# The string forms Pydantic accepts (after stripping whitespace); ASCII digits only
+_DIGITS = r"[0-9]+(?:_[0-9]+)*"
+INT_STRING = re.compile(rf"[+-]?{_DIGITS}(?:\.0+)?")
+FLOAT_STRING = re.compile(
+    rf"[+-]?(?:(?:{_DIGITS}(?:\.(?:{_DIGITS})?)?|\.{_DIGITS})(?:[eE][+-]?{_DIGITS})?|inf|infinity|nan)",
+    re.IGNORECASE,
+)
+
+KINDS = {float: "float", int: "int", str: "str"}
+TYPE_ERRORS = {"float": "float_type", "int": "int_type", "str": "string_type"}
+
+# Per-cell failures are kept as int8 codes (0 = valid) until the error dicts are built
+OK = 0
+ERROR_TYPES = [None] + [error_type for error_type in MESSAGES if error_type != "model_type"]
+CODES = {error_type: code for code, error_type in enumerate(ERROR_TYPES) if error_type}
+
+
+# ==========================================
+# 1. RULES GENERATED FROM THE SCHEMA
+# ==========================================
+class FieldRule:
+    def __init__(self, name, kind, required, bounds):
+        self.name = name
+        self.kind = kind            # "float" | "int" | "str"
+        self.required = required
+        self.bounds = bounds        # [(op, error type, bound as written in Field(...))] in check order
+
+
+def compile_rules(schema=HouseData):
+    """One FieldRule per declared field, in declaration order (= Pydantic's error order)."""
+    rules = []
+    for name, info in schema.model_fields.items():
+        args = [arg for arg in typing.get_args(info.annotation) if arg is not type(None)]
+        base = args[0] if len(args) == 1 else info.annotation
+        if base not in KINDS:
+            raise TypeError(f"{schema.__name__}.{name}: no columnar rule for type {info.annotation!r}")
+
+        written = {}
+        for meta in info.metadata:
+            for op, _ in CONSTRAINTS:
+                if getattr(meta, op, None) is not None:
+                    written[op] = getattr(meta, op)
+        bounds = [(op, error_type, written[op]) for op, error_type in CONSTRAINTS if op in written]
+        rules.append(FieldRule(name, KINDS[base], info.is_required(), bounds))
+    return rules
+
+
+# ==========================================
+# 2. ONE COLUMN AT A TIME
+# ==========================================
+def _error(error_type, loc, value, ctx=None, written=None):
+    # msg shows the bound as written in Field(...); ctx holds it cast to the field type
+    error = {"type": error_type, "loc": loc, "msg": MESSAGES[error_type].format(**(written or ctx or {})), "input": value}
+    if ctx is not None:
+        error["ctx"] = ctx
+    error["url"] = ERROR_URL.format(error_type)
+    return error
+
+
+def _python(value):
+    # numpy scalars -> plain Python, so errors serialize like Pydantic's
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _parse_strings(strings, kind):
+    """Strings -> (parsed float values, ok mask), accepting exactly what Pydantic accepts."""
+    stripped = strings.str.strip()
+    ok = stripped.str.fullmatch(INT_STRING if kind == "int" else FLOAT_STRING).fillna(False).to_numpy(bool)
+    values = np.full(len(strings), np.nan)
+    if ok.any():
+        values[ok] = stripped[ok].str.replace("_", "", regex=False).astype(np.float64).to_numpy()
+    return values, ok
+
+
+INTEGER, NUMBER, TEXT, BYTES, OTHER = range(5)
+
+
+def _type_code(t):
+    if issubclass(t, int):   # Python ints (and bools) have no size limit
+        return INTEGER
+    if issubclass(t, (float, np.integer, np.floating, np.bool_)):
+        return NUMBER
+    if issubclass(t, str):
+        return TEXT
+    if issubclass(t, bytes):
+        return BYTES
+    return OTHER
+
+
+def _type_codes(values):
+    """One small int per cell for an object array: integer, number, text, bytes or other."""
+    types = np.fromiter(map(type, values), dtype=object, count=len(values))
+    codes = np.full(len(values), OTHER, dtype=np.int8)
+    for t in set(types):  # a handful of distinct types per column
+        codes[types == t] = _type_code(t)
+    return codes
+
+
+def _float(value):
+    try:
+        return float(value)
+    except OverflowError:   # a Python int beyond the float range: only its sign matters for the bounds
+        return math.inf if value > 0 else -math.inf
+
+
+def _as_floats(values):
+    """Object array of numbers -> float64, with Python ints too large for a float as +-inf."""
+    try:
+        return values.astype(np.float64)
+    except OverflowError:
+        return np.array([_float(v) for v in values], dtype=np.float64)
+
+
+def _exact_int(value):
+    """One valid int cell -> the exact Python int Pydantic returns for it."""
+    if isinstance(value, bytes):
+        value = value.decode()
+    if isinstance(value, str):
+        return int(value.strip().replace("_", "").split(".")[0])
+    return int(value)
+
+
+def _check_column(rule, column, absent):
+    """
+    Returns (failed, values) for one field: failed holds an error code (0 = ok) per row,
+    values the coerced numbers (float/int fields) or the original objects (str fields).
+    """
+    n = len(column)
+    present = ~absent
+    failed = np.zeros(n, dtype=np.int8)
+    raw = column.to_numpy()
+    if not present.any():
+        return failed, (np.full(n, np.nan) if rule.kind != "str" else raw.astype(object))
+
+    if rule.kind == "str":
+        values = raw.astype(object)
+        if column.dtype != object:
+            failed[present] = CODES["string_type"]
+            return failed, values
+        positions = np.flatnonzero(present)
+        codes = _type_codes(values[positions])
+        others = positions[codes == OTHER]
+        is_bytearray = np.array([isinstance(v, bytearray) for v in values[others]], dtype=bool)
+        for i in np.concatenate([positions[codes == BYTES], others[is_bytearray]]):
+            try:
+                values[i] = bytes(values[i]).decode()
+            except UnicodeDecodeError:
+                failed[i] = CODES["string_unicode"]
+        failed[positions[(codes == INTEGER) | (codes == NUMBER)]] = CODES["string_type"]
+        failed[others[~is_bytearray]] = CODES["string_type"]
+        return failed, values
+
+    # Cells holding an exact integer of any size (Python ints, strings): exempt from the int64 limit
+    unbounded = np.zeros(n, dtype=bool)
+    if column.dtype.kind in "biuf":
+        # Fast path (numeric CSV / Parquet columns): no per-cell type checks at all
+        values = raw.astype(np.float64)
+        if column.dtype.kind in "bi":
+            unbounded = present.copy()   # always fits in an int64
+    else:
+        values = np.full(n, np.nan)
+        positions = np.flatnonzero(present)
+        codes = _type_codes(raw[positions])
+
+        integers = positions[codes == INTEGER]
+        numbers = positions[codes == NUMBER]
+        values[integers] = _as_floats(raw[integers])
+        values[numbers] = raw[numbers].astype(np.float64)
+        if rule.kind == "float":
+            failed[integers[np.isinf(values[integers])]] = CODES["float_type"]
+
+        text = positions[(codes == TEXT) | (codes == BYTES)]
+        unbounded[integers] = True
+        unbounded[text] = True
+        if len(text):
+            # Undecodable bytes are left with a replacement character, so they fail to parse (as in Pydantic)
+            strings = pd.Series([v.decode(errors="replace") if isinstance(v, bytes) else v for v in raw[text]],
+                                dtype=object)
+            parsed, ok = _parse_strings(strings, rule.kind)
+            values[text] = parsed
+            failed[text[~ok]] = CODES["int_parsing" if rule.kind == "int" else "float_parsing"]
+        failed[positions[codes == OTHER]] = CODES[TYPE_ERRORS[rule.kind]]
+
+    pending = present & (failed == OK)
+    if rule.kind == "int":
+        with np.errstate(invalid="ignore"):
+            infinite = pending & ~unbounded & ~np.isfinite(values)
+            too_large = pending & ~unbounded & ~infinite & ~((values > -INT64_LIMIT) & (values < INT64_LIMIT))
+            fractional = pending & ~infinite & ~too_large & (values != np.round(values))
+        failed[infinite] = CODES["finite_number"]
+        failed[too_large] = CODES["int_parsing_size"]
+        failed[fractional] = CODES["int_from_float"]
+        pending &= ~(infinite | too_large | fractional)
+
+    # Range checks; comparisons with NaN are False, so NaN fails the first bound (as in Pydantic)
+    for op, error_type, bound in rule.bounds:
+        with np.errstate(invalid="ignore"):
+            if op == "le":
+                bad = ~(values <= bound)
+            elif op == "lt":
+                bad = ~(values < bound)
+            elif op == "ge":
+                bad = ~(values >= bound)
+            else:
+                bad = ~(values > bound)
+        bad &= pending
+        failed[bad] = CODES[error_type]
+        pending &= ~bad
+
+    return failed, values
+
+
+# ==========================================
+# 3. WHOLE FRAMES
+# ==========================================
+class BulkValidationResult:
+    def __init__(self, valid_mask, errors, build_frame):
+        self.valid_mask = valid_mask    # np.ndarray[bool], one per input row
+        self.errors = errors            # {row position: [Pydantic-style error dicts]}
+        self._build_frame = build_frame
+        self._frame = None
+
+    @property
+    def frame(self):
+        """Valid rows only (original index), coerced like model_dump(). Built on first use."""
+        if self._frame is None:
+            self._frame = self._build_frame()
+        return self._frame
+
+    @property
+    def n_valid(self):
+        return int(self.valid_mask.sum())
+
+    @property
+    def n_invalid(self):
+        return len(self.valid_mask) - self.n_valid
+
+
+class ColumnarValidator:
+    def __init__(self, schema=HouseData):
+        self.schema = schema
+        self.rules = compile_rules(schema)
+
+    def _row_inputs(self, df, rows, records):
+        # The "input" of a missing-field error is the whole record, as in Pydantic
+        if records is not None:
+            return {i: records[i] for i in rows}
+        dicts = df.iloc[rows].to_dict("records")
+        return {i: {col: _python(v) for col, v in row.items() if not pd.isna(v)} for i, row in zip(rows, dicts)}
+
+    def validate(self, df, records=None):
+        """
+        df:      One record per row; extra columns are kept (HouseData allows extras).
+        records: The dicts df was built from, if any. Only used to tell an explicit NaN
+                 from an absent key and to echo whole records in "missing" errors.
+        """
+        n = len(df)
+        errors = {}
+        failures = []   # (rule, column, failed) per field, in declaration order
+        coerced = {}
+
+        for rule in self.rules:
+            if rule.name in df.columns:
+                column = df[rule.name]
+                missing = column.isna().to_numpy()
+            else:
+                column = pd.Series(np.nan, index=df.index, dtype=object)
+                missing = np.ones(n, dtype=bool)
+
+            if records is None:
+                absent, explicit_null = missing, np.zeros(n, dtype=bool)
+            else:
+                # JSON tells an absent key (NaN here), null (None) and a literal NaN apart
+                explicit_null = column.map(lambda v: v is None).to_numpy(bool)
+                absent = missing & ~explicit_null
+                for i in np.flatnonzero(absent):
+                    if rule.name in records[i]:
+                        absent[i] = False
+
+            not_given = absent | explicit_null
+            failed, values = _check_column(rule, column, not_given)
+            if rule.required:
+                failed[absent] = CODES["missing"]
+                failed[explicit_null] = CODES[TYPE_ERRORS[rule.kind]]
+            failures.append((rule, column, failed))
+            coerced[rule.name] = (values, not_given)
+
+        missing_rows = np.flatnonzero(np.any([failed == CODES["missing"] for _, _, failed in failures], axis=0)).tolist()
+        row_inputs = self._row_inputs(df, missing_rows, records) if missing_rows else {}
+
+        valid_mask = np.ones(n, dtype=bool)
+        for rule, column, failed in failures:
+            bad_rows = np.flatnonzero(failed)
+            if not len(bad_rows):
+                continue
+            valid_mask[bad_rows] = False
+            loc = (rule.name,)
+            bounds = {error_type: (op, bound) for op, error_type, bound in rule.bounds}
+            bad_inputs = column.to_numpy()[bad_rows].tolist()   # plain Python values, like Pydantic's "input"
+            for i, code, value in zip(bad_rows.tolist(), failed[bad_rows].tolist(), bad_inputs):
+                error_type = ERROR_TYPES[code]
+                if error_type == "missing":
+                    error = _error(error_type, loc, row_inputs[i])
+                elif error_type in bounds:
+                    op, bound = bounds[error_type]
+                    ctx = {op: int(bound) if rule.kind == "int" else float(bound)}
+                    error = _error(error_type, loc, value, ctx, written={op: bound})
+                else:
+                    error = _error(error_type, loc, value)
+                errors.setdefault(i, []).append(error)
+
+        return BulkValidationResult(valid_mask, errors, lambda: self._coerce(df, coerced, valid_mask))
+
+    def _coerce(self, df, coerced, valid_mask):
+        # Valid rows as model_dump() would return them: declared fields typed, None when not given
+        frame = df.loc[valid_mask].copy()
+        for rule in self.rules:
+            values, not_given = coerced[rule.name]
+            values, not_given = values[valid_mask], not_given[valid_mask]
+            if not_given.all():
+                column = np.full(len(not_given), None, dtype=object)
+            elif rule.kind == "int":
+                large = ~not_given & ~(np.abs(values) < EXACT_FLOAT_LIMIT)
+                column = np.array(np.where(not_given | large, 0, values).astype(np.int64).tolist(), dtype=object)
+                if large.any():
+                    raw = df[rule.name].to_numpy()[valid_mask]
+                    for i in np.flatnonzero(large):
+                        column[i] = _exact_int(raw[i])
+            elif rule.kind == "float":
+                column = values.astype(object)
+            else:
+                column = np.asarray(values, dtype=object)
+            column[not_given] = None
+            frame[rule.name] = column
+        return frame
+
+
+_validators = {}
+
+
+def _validator_for(schema):
+    # Rules are generated once per schema, not once per batch
+    if schema not in _validators:
+        _validators[schema] = ColumnarValidator(schema)
+    return _validators[schema]
+
+
+def validate_frame(df, schema=HouseData):
+    """Validate every row of df against schema in one columnar pass (NaN / None = not provided)."""
+    return _validator_for(schema).validate(df)
+
+
+def validate_records(records, schema=HouseData):
+    """Validate a list of JSON records. Non-dict entries fail with model_type, as in Pydantic."""
+    dict_positions = np.array([i for i, record in enumerate(records) if isinstance(record, dict)], dtype=np.int64)
+    dict_records = [records[i] for i in dict_positions]
+    result = _validator_for(schema).validate(pd.DataFrame(dict_records, dtype=object), records=dict_records)
+
+    # Map row positions back to positions in the original list
+    valid_mask = np.zeros(len(records), dtype=bool)
+    valid_mask[dict_positions] = result.valid_mask
+    errors = {int(dict_positions[i]): row_errors for i, row_errors in result.errors.items()}
+    for i in sorted(set(range(len(records))) - set(dict_positions.tolist())):
+        errors[i] = [_error("model_type", (), records[i], {"class_name": schema.__name__})]
+
+    def build_frame():
+        frame = result.frame
+        frame.index = dict_positions[result.valid_mask]
+        return frame
+
+    return BulkValidationResult(valid_mask, errors, build_frame)
@@ -0,0 +1,191 @@
+# category_codes.py
+# The categorical branch (cast_to_str -> SimpleImputer('None') -> OrdinalEncoder) without
+# turning every cell into a Python string.
+#
+# What the branch computes, per cell: code = categories.index(str(value)), or -1 if unseen.
+#   - str() is pandas .astype(str): 60 -> '60', 60.0 -> '60.0', NaN -> 'nan', None -> 'None',
+#     pd.NA -> '<NA>'. So MSSubClass 60 and 60.0 are different categories, exactly as today.
+#   - The SimpleImputer never fires: after astype(str) nothing is missing any more ('nan' is a
+#     category of its own), so it is not reproduced.
+#
+# CategoryCodeEncoder gets the same codes from far fewer str() calls:
+#   - pandas Categorical:       one str() per category, then the integer codes index a table
+#   - int / bool / float:       pd.factorize, then one str() per distinct value
+#   - object columns of only strings, only ints or only floats (plus missing values): the same
+#   - anything else (mixed 60 / 60.0 / True objects, which hash alike but print differently),
+#     and small batches: str() per cell, as before
+# Missing cells are resolved by type, because None, NaN and pd.NA print differently.
+#
+#   encoder = CategoryCodeEncoder().fit(X[cat_cols])           # training: replaces the 'cat' branch
+#   encoder = CategoryCodeEncoder.from_pipeline(cat_pipe)      # serving: same vocabulary as a fitted branch
+#   use_category_codes(pipeline)                               # swap it into a fitted Pipeline, in place
+#
+# Usage:
+#   python category_codes.py --data data/Ames_Housing_Price_Data.csv   # parity + speed vs cast_to_str
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from utils import cast_to_str  # noqa: F401  (needed to unpickle the Pipeline)
+
+
+# Below these batch sizes a plain per-cell str() + dict lookup is faster than pd.factorize's fixed
+# cost (~0.1 ms per column). Object columns need far more rows: hashing a Python string costs
+# about the same in factorize as in a dict, so only the per-cell str() call is saved.
+PER_CELL_BELOW = 512
+PER_CELL_BELOW_OBJECT = 8192
+
+# str() of a missing value of these types never depends on the value
+_MISSING_STRINGS = {type(None): 'None', float: 'nan', np.float64: 'nan', np.float32: 'nan', type(pd.NA): '<NA>'}
+
+
+def _missing_strings(series, missing):
+    """str() of each missing cell (positions `missing`): one dict lookup per cell, str() only for odd types."""
+    if series.dtype.kind == "f":
+        return np.full(len(missing), 'nan', dtype=object)  # A float column's only missing value
+    raw = series.to_numpy(dtype=object)[missing]
+    return np.array([_MISSING_STRINGS.get(type(v)) or str(v) for v in raw.tolist()], dtype=object)
+
+
+def _has_negative_zero(values):
+    # factorize treats -0.0 == 0.0, but str() prints '-0.0'
+    zeros = values == 0
+    return bool(zeros.any() and np.signbit(values[zeros]).any())
+
+
+def _factorizable(series):
+    """True when equal values always print the same, so one str() per distinct value is exact."""
+    kind = series.dtype.kind
+    if kind in "biu":
+        return True
+    if kind == "f":
+        return not _has_negative_zero(series.to_numpy())
+    if kind == "O":
+        inferred = pd.api.types.infer_dtype(series, skipna=True)
+        if inferred == "floating":  # Python / NumPy floats only (a 60 next to a 60.0 is "mixed-integer-float")
+            return not _has_negative_zero(series.dropna().to_numpy(dtype=np.float64))
+        return inferred in ("string", "integer", "empty")
+    return False
+
+
+def encode_column(series, lookup, unknown=-1.0):
+    """
+    One column -> float64 ordinal codes, identical to lookup.get(str(v), unknown) per cell.
+    lookup: {category string: code}, i.e. the OrdinalEncoder's categories_ for this column.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        table = np.array([lookup.get(str(c), unknown) for c in series.cat.categories] +
+                         [lookup.get('nan', unknown)], dtype=np.float64)  # astype(str) of a missing entry
+        return table[series.cat.codes.to_numpy()]  # Missing = code -1 = the last entry
+
+    small = PER_CELL_BELOW_OBJECT if series.dtype.kind == "O" else PER_CELL_BELOW
+    if len(series) < small or not _factorizable(series):
+        return np.array([lookup.get(str(v), unknown) for v in series.tolist()], dtype=np.float64)
+
+    codes, uniques = pd.factorize(series)
+    table = np.array([lookup.get(str(u), unknown) for u in uniques] + [np.nan], dtype=np.float64)
+    out = table[codes]
+    missing = np.flatnonzero(codes < 0)
+    if len(missing):
+        strings = _missing_strings(series, missing)
+        for string in pd.unique(strings):
+            out[missing[strings == string]] = lookup.get(string, unknown)
+    return out
+
+
+def column_categories(series):
+    """Sorted distinct str() values of a column, as OrdinalEncoder would learn them after cast_to_str."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        present = series.cat.categories[np.unique(series.cat.codes[series.cat.codes >= 0])]
+        strings = {str(c) for c in present} | ({'nan'} if (series.cat.codes < 0).any() else set())
+    elif _factorizable(series):
+        codes, uniques = pd.factorize(series)
+        strings = {str(u) for u in uniques} | set(_missing_strings(series, np.flatnonzero(codes < 0)))
+    else:
+        strings = {str(v) for v in series.tolist()}
+    return np.array(sorted(strings), dtype=object)
+
+
+class CategoryCodeEncoder(TransformerMixin, BaseEstimator):
+    """Drop-in for Pipeline([caster, SimpleImputer('None'), OrdinalEncoder(unknown -> -1)])."""
+
+    def __init__(self, unknown_value=-1):
+        self.unknown_value = unknown_value
+
+    def fit(self, X, y=None):
+        X = pd.DataFrame(X)
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = X.shape[1]
+        self.categories_ = [column_categories(X[col]) for col in X.columns]
+        self._build_lookups()
+        return self
+
+    def _build_lookups(self):
+        self.lookups_ = [{category: float(code) for code, category in enumerate(categories)}
+                         for categories in self.categories_]
+
+    @classmethod
+    def from_pipeline(cls, cat_pipe, columns):
+        """The encoder equivalent to a fitted cast_to_str -> imputer -> OrdinalEncoder branch."""
+        ordinal = cat_pipe.named_steps['ordinal']
+        encoder = cls(unknown_value=ordinal.unknown_value)
+        encoder.feature_names_in_ = np.asarray(columns, dtype=object)
+        encoder.n_features_in_ = len(columns)
+        encoder.categories_ = [np.asarray(categories, dtype=object) for categories in ordinal.categories_]
+        encoder._build_lookups()
+        return encoder
+
+    def transform(self, X):
+        X = pd.DataFrame(X)
+        out = np.empty((len(X), self.n_features_in_), dtype=np.float64)
+        for j, lookup in enumerate(self.lookups_):
+            out[:, j] = encode_column(X.iloc[:, j], lookup, float(self.unknown_value))
+        return out
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(self.feature_names_in_, dtype=object)
+
+
+def use_category_codes(pipeline):
+    """Swap the encoder into a fitted production Pipeline's preprocessor, in place. Returns the pipeline."""
+    preprocessor = pipeline.named_steps['preprocessor']
+    name, cat_pipe, columns = preprocessor.transformers_[0]
+    if not isinstance(cat_pipe, CategoryCodeEncoder):
+        preprocessor.transformers_[0] = (name, CategoryCodeEncoder.from_pipeline(cat_pipe, list(columns)), columns)
+    return pipeline
+
+
+if __name__ == '__main__':
+    import joblib
+    from compiled_model import DATA_PATH, PIPELINE_PATH, load_training_features
+
+    parser = argparse.ArgumentParser(description="Category-code encoder: parity and speed vs the cast_to_str branch.")
+    parser.add_argument("--data", default=str(DATA_PATH))
+    parser.add_argument("--rows", type=int, default=100_000, help="Tile the CSV to this many rows")
+    args = parser.parse_args()
+
+    pipeline = joblib.load(PIPELINE_PATH)
+    preprocessor = pipeline.named_steps['preprocessor']
+    _, cat_pipe, cat_cols = preprocessor.transformers_[0]
+    X = load_training_features(args.data, list(preprocessor.feature_names_in_))
+    X = pd.concat([X] * -(-args.rows // len(X)), ignore_index=True).iloc[:args.rows]
+    encoder = CategoryCodeEncoder.from_pipeline(cat_pipe, list(cat_cols))
+
+    frames = {"as read": X[cat_cols], "categorical": X[cat_cols].astype("category"),
+              "object": X[cat_cols].astype(object)}
+    for name, frame in frames.items():
+        started = time.perf_counter()
+        expected = cat_pipe.transform(frame)
+        before = time.perf_counter() - started
+        started = time.perf_counter()
+        actual = encoder.transform(frame)
+        after = time.perf_counter() - started
+        print(f"{name:<12} {len(frame):,} rows: cast_to_str branch {before * 1000:8.1f} ms, "
+              f"encoder {after * 1000:7.1f} ms ({before / after:4.1f}x), identical: {np.array_equal(expected, actual)}")
+
+    refit = CategoryCodeEncoder().fit(X[cat_cols])
+    same = all(np.array_equal(a, b) for a, b in zip(refit.categories_, cat_pipe.named_steps['ordinal'].categories_))
+    print(f"Fitting from scratch learns the OrdinalEncoder's categories: {same}")
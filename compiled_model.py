@@ -0,0 +1,276 @@
+# compiled_model.py
+# A flat, NumPy-only predictor compiled from the fitted production Pipeline.
+#
+# The sklearn Pipeline spends most of a single-row call in pandas/sklearn
+# dispatch. CompiledPredictor keeps only the fitted numbers:
+#   - category -> ordinal code lookup dicts (cast_to_str + SimpleImputer + OrdinalEncoder);
+#     DataFrames are encoded per column without the astype(str) round trip (category_codes.py)
+#   - the median vector (numerical SimpleImputer)
+#   - the OHE + StandardScaler + Lasso parameters, folded into per-category tables (lasso_tables.py)
+#   - the raw XGBoost Booster and CatBoost model
+# and reproduces the weighted vote + expm1 on a contiguous float array.
+#
+# Usage:
+#   python compiled_model.py                      # compile + parity check + save
+#   python compiled_model.py --data my_sales.csv  # parity check on another CSV
+import argparse
+import math
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from category_codes import PER_CELL_BELOW, encode_column
+from lasso_tables import fold_lasso
+from sparse_lasso import centered_lasso_params
+from utils import cast_to_str  # noqa: F401  (needed to unpickle the Pipeline)
+
+BASE_DIR = Path(__file__).parent
+MODELS_DIR = BASE_DIR / "models"
+PIPELINE_PATH = MODELS_DIR / "ames_housing_super_model_production.pkl"
+COMPILED_PATH = MODELS_DIR / "ames_compiled_predictor.pkl"
+DATA_PATH = BASE_DIR / "data" / "Ames_Housing_Price_Data.csv"
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+# ==========================================
+# 1. THE COMPILED PREDICTOR
+# ==========================================
+class CompiledPredictor:
+    def __init__(self, cat_cols, num_cols, category_codes, unknown_code, medians,
+                 lasso_ohe_offsets, lasso_mean, lasso_scale, lasso_coef, lasso_intercept,
+                 xgb_booster, catboost_model, weights):
+        """
+        cat_cols / num_cols: Column order of the ColumnTransformer output ([cats, nums]).
+        category_codes:      One {category string: ordinal code} dict per categorical column.
+        lasso_ohe_offsets:   One {ordinal code: one-hot column index} dict per categorical column.
+        weights:             VotingRegressor weights for (lasso, xgb, catboost).
+        """
+        self.cat_cols = list(cat_cols)
+        self.num_cols = list(num_cols)
+        self.columns = self.cat_cols + self.num_cols
+        self.category_codes = category_codes
+        self.unknown_code = float(unknown_code)
+        self.medians = np.asarray(medians, dtype=np.float64)
+        self.lasso_ohe_offsets = lasso_ohe_offsets
+        self.lasso_mean = np.asarray(lasso_mean, dtype=np.float64)
+        self.lasso_scale = np.asarray(lasso_scale, dtype=np.float64)
+        self.lasso_coef = np.asarray(lasso_coef, dtype=np.float64)
+        self.lasso_intercept = float(lasso_intercept)
+        self.xgb_booster = xgb_booster
+        self.catboost_model = catboost_model
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.catboost_threads = -1  # -1 = CatBoost's default (all cores)
+        self.lasso_tables = fold_lasso(self)
+
+    # --- A. Preprocessing (replaces the ColumnTransformer) ---
+    def _encode_column(self, values, j):
+        # str(value) matches pandas .astype(str) for scalars: 60 -> '60', 60.0 -> '60.0', NaN -> 'nan'
+        lookup = self.category_codes[j]
+        unknown = self.unknown_code
+        return [lookup.get(str(v), unknown) for v in values]
+
+    def _impute_column(self, values, j):
+        median = self.medians[j]
+        return [median if _is_missing(v) else float(v) for v in values]
+
+    def transform_columns(self, columns, n_rows):
+        """Build the [cat codes, numericals] float matrix from {column: list of values}."""
+        X = np.empty((n_rows, len(self.columns)), dtype=np.float64)
+        for j, col in enumerate(self.cat_cols):
+            X[:, j] = self._encode_column(columns[col], j)
+        n_cats = len(self.cat_cols)
+        for j, col in enumerate(self.num_cols):
+            X[:, n_cats + j] = self._impute_column(columns[col], j)
+        return X
+
+    def transform(self, X):
+        """DataFrame (aligned to the training columns) -> preprocessed float matrix."""
+        if len(X) < PER_CELL_BELOW:  # Serving-sized: per-column dispatch would cost more than it saves
+            return self.transform_columns({col: X[col].tolist() for col in self.columns}, len(X))
+        out = np.empty((len(X), len(self.columns)), dtype=np.float64)
+        for j, col in enumerate(self.cat_cols):
+            out[:, j] = encode_column(X[col], self.category_codes[j], self.unknown_code)
+        n_cats = len(self.cat_cols)
+        for j, col in enumerate(self.num_cols):
+            out[:, n_cats + j] = self._impute_column(X[col].tolist(), j)
+        return out
+
+    def matches_preprocessor(self, preprocessor):
+        """True if a fitted ColumnTransformer computes exactly what transform() does (columns, codes, medians)."""
+        tables = preprocessor_tables(preprocessor)
+        return (tables["cat_cols"] == self.cat_cols
+                and tables["num_cols"] == self.num_cols
+                and tables["category_codes"] == self.category_codes
+                and float(tables["unknown_code"]) == self.unknown_code
+                and np.array_equal(tables["medians"], self.medians, equal_nan=True))
+
+    def transform_records(self, records):
+        """List of dicts (already aligned and filled with defaults) -> preprocessed float matrix."""
+        columns = {col: [record.get(col) for record in records] for col in self.columns}
+        return self.transform_columns(columns, len(records))
+
+    # --- B. Ensemble members ---
+    def _predict_lasso(self, X):
+        # Gather-and-sum over the folded tables: no one-hot / standardized matrix
+        tables = getattr(self, "lasso_tables", None)
+        if tables is None:  # older pickles predate the attribute
+            tables = self.lasso_tables = fold_lasso(self)
+        return tables.predict(X)
+
+    def _predict_xgb(self, X):
+        return self.xgb_booster.inplace_predict(X).astype(np.float64)
+
+    def _predict_catboost(self, X):
+        threads = getattr(self, "catboost_threads", -1)  # older pickles predate the attribute
+        return np.asarray(self.catboost_model.predict(X, thread_count=threads), dtype=np.float64)
+
+    def set_member_threads(self, xgb=None, catboost=None):
+        """Pin the intra-op thread count of the tree members (None = leave the library default)."""
+        if xgb is not None:
+            self.xgb_booster.set_param({"nthread": int(xgb)})
+        if catboost is not None:
+            self.catboost_threads = int(catboost)
+
+    def members(self):
+        """(name, predict_fn) for each VotingRegressor member, in vote order."""
+        return [
+            ("lasso", self._predict_lasso),
+            ("xgb", self._predict_xgb),
+            ("catboost", self._predict_catboost),
+        ]
+
+    def combine(self, member_preds):
+        """Member log-price predictions -> prices (weighted vote in log space, then expm1)."""
+        log_price = np.average(np.column_stack(member_preds), axis=1, weights=self.weights)
+        return np.expm1(log_price)
+
+    def predict_matrix(self, X):
+        """Preprocessed float matrix -> prices."""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        return self.combine([predict(X) for _, predict in self.members()])
+
+    # --- C. Public entry points (mirror Pipeline.predict) ---
+    def predict(self, X):
+        return self.predict_matrix(self.transform(X))
+
+    def predict_records(self, records):
+        return self.predict_matrix(self.transform_records(records))
+
+
+# ==========================================
+# 2. THE EXPORTER
+# ==========================================
+def preprocessor_tables(preprocessor):
+    """
+    The fitted numbers of the preprocessing ColumnTransformer:
+    [('cat', caster -> imputer -> ordinal, CATS), ('num', median imputer, NUMS)]
+    """
+    cat_pipe = preprocessor.named_transformers_['cat']
+    num_pipe = preprocessor.named_transformers_['num']
+    ordinal = cat_pipe.named_steps['ordinal']
+    return {
+        "cat_cols": list(preprocessor.transformers_[0][2]),
+        "num_cols": list(preprocessor.transformers_[1][2]),
+        "category_codes": [
+            {str(category): float(code) for code, category in enumerate(categories)}
+            for categories in ordinal.categories_
+        ],
+        "unknown_code": ordinal.unknown_value,
+        "medians": num_pipe.named_steps['imputer'].statistics_,
+    }
+
+
+def compile_pipeline(pipeline):
+    """Pull the fitted numbers out of final_production_pipeline into a CompiledPredictor."""
+    ttr = pipeline.named_steps['model']
+    voting = ttr.regressor_
+
+    # A. Preprocessor
+    tables = preprocessor_tables(pipeline.named_steps['preprocessor'])
+
+    # B. Lasso branch: OHE(first n_cats cols) + passthrough -> StandardScaler -> Lasso
+    lasso_pipe = voting.named_estimators_['lasso']
+    ohe = lasso_pipe.named_steps['prep'].named_transformers_['ohe']
+    # Centered form, whether the branch is the notebook's dense one or sparse_lasso.py's
+    lasso_mean, lasso_scale, lasso_coef, lasso_intercept = centered_lasso_params(lasso_pipe)
+
+    lasso_ohe_offsets = []
+    offset = 0
+    for categories in ohe.categories_:
+        lasso_ohe_offsets.append({float(code): offset + k for k, code in enumerate(categories)})
+        offset += len(categories)
+
+    # C. Tree members
+    xgb_booster = voting.named_estimators_['xgb'].get_booster()
+    catboost_model = voting.named_estimators_['catboost']
+
+    return CompiledPredictor(
+        cat_cols=tables["cat_cols"],
+        num_cols=tables["num_cols"],
+        category_codes=tables["category_codes"],
+        unknown_code=tables["unknown_code"],
+        medians=tables["medians"],
+        lasso_ohe_offsets=lasso_ohe_offsets,
+        lasso_mean=lasso_mean,
+        lasso_scale=lasso_scale,
+        lasso_coef=lasso_coef,
+        lasso_intercept=lasso_intercept,
+        xgb_booster=xgb_booster,
+        catboost_model=catboost_model,
+        weights=voting.weights,
+    )
+
+
+# ==========================================
+# 3. PARITY CHECK
+# ==========================================
+def check_parity(pipeline, compiled, X, rtol=1e-6):
+    """Compare compiled.predict against pipeline.predict on every row of X."""
+    expected = pipeline.predict(X)
+    actual = compiled.predict(X)
+    abs_diff = np.abs(actual - expected)
+    rel_diff = abs_diff / np.maximum(np.abs(expected), 1.0)
+    return {
+        "rows": len(X),
+        "max_abs_diff": float(abs_diff.max()),
+        "max_rel_diff": float(rel_diff.max()),
+        "passed": bool(rel_diff.max() <= rtol),
+    }
+
+
+def load_training_features(data_path, columns):
+    df = pd.read_csv(data_path)
+    df = df.drop(columns=['PID', 'Unnamed: 0', 'SalePrice'], errors='ignore')
+    return df.reindex(columns=columns)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compile the production Pipeline into a flat predictor.")
+    parser.add_argument("--data", default=str(DATA_PATH), help="CSV used for the parity check")
+    parser.add_argument("--output", default=str(COMPILED_PATH), help="Where to save the compiled predictor")
+    args = parser.parse_args()
+
+    print(f"Loading Production Pipeline from: {PIPELINE_PATH} ...")
+    pipeline = joblib.load(PIPELINE_PATH)
+    columns = joblib.load(MODELS_DIR / 'ames_model_columns.pkl')
+
+    # Import ourselves by module name so the pickle points at compiled_model.CompiledPredictor,
+    # not __main__.CompiledPredictor (the same "Pickle Problem" as cast_to_str).
+    from compiled_model import compile_pipeline as _compile_pipeline
+    compiled = _compile_pipeline(pipeline)
+
+    X = load_training_features(args.data, columns)
+    report = check_parity(pipeline, compiled, X)
+    print(f"Parity on {report['rows']} rows: max abs diff ${report['max_abs_diff']:.6f}, "
+          f"max rel diff {report['max_rel_diff']:.2e}")
+
+    if not report['passed']:
+        raise SystemExit("❌ Compiled predictor does not match model.predict. Not saving.")
+
+    joblib.dump(compiled, args.output)
+    print(f"✅ Compiled predictor saved to: {args.output}")
@@ -1,3 +1,4 @@
+import os
 from shiny import App, render, ui, reactive
 import pandas as pd
 import numpy as np
@@ -5,68 +6,151 @@ import joblib
 from pathlib import Path
 import matplotlib.pyplot as plt
 from utils import cast_to_str
+from model_bundle import load_bundle
+from profiler import install_signal_handler
+from hot_reload import HotReloader, content_version, install_reload_signal
 
 # ==========================================
-# 1. LOAD ASSETS
+# 1. LOAD ASSETS (hot-reloadable: see hot_reload.py)
 # ==========================================
 MODELS_DIR = Path(__file__).parent / "models"
+# Optional distilled single-model student (python distill.py): much quicker while dragging sliders
+STUDENT_PATH = MODELS_DIR / 'ames_student_fast.pkl'
+RELOAD_WATCH_SECONDS = float(os.environ.get("AMES_RELOAD_WATCH_SECONDS", 10))
+fast_by_default = os.environ.get("AMES_DASHBOARD_MODE", "full") == "fast"
+# Same limit as the API: a student whose price strays this far from the ensemble's is stale
+STUDENT_MAX_GAP = float(os.environ.get("AMES_STUDENT_MAX_GAP", 0.2))
 
-model = joblib.load(MODELS_DIR / 'ames_housing_super_model_production.pkl')
-model_columns = joblib.load(MODELS_DIR / 'ames_model_columns.pkl')
-model_defaults = joblib.load(MODELS_DIR / 'ames_model_defaults.pkl')
-# Load the new options file
-model_options = joblib.load(MODELS_DIR / 'ames_model_options.pkl')
+class DashboardModels:
+    """One artifact version; a reload swaps the whole thing, so model, columns and options always match."""
+    student = None
 
-# Get the full list (No more guessing or hardcoding!)
-neighborhoods = model_options['Neighborhood']
+def load_models():
+    m = DashboardModels()
+    if os.environ.get("AMES_INFERENCE_BACKEND") == "bundle":
+        # Pickle-free bundle (see model_bundle.py): same .predict(), columns, defaults and options
+        bundle = load_bundle(MODELS_DIR / "ames_bundle")
+        m.model = bundle.predictor
+        m.model_columns = bundle.columns
+        m.model_defaults = bundle.defaults
+        m.model_options = bundle.options
+        m.artifact_paths = [MODELS_DIR / "ames_bundle" / "manifest.json"]
+    else:
+        m.artifact_paths = [MODELS_DIR / name for name in (
+            'ames_housing_super_model_production.pkl', 'ames_model_columns.pkl',
+            'ames_model_defaults.pkl', 'ames_model_options.pkl')]
+        m.model, m.model_columns, m.model_defaults, m.model_options = map(joblib.load, m.artifact_paths)
+
+    if STUDENT_PATH.exists():
+        m.student = joblib.load(STUDENT_PATH)
+        m.artifact_paths.append(STUDENT_PATH)
+    m.version = content_version(m.artifact_paths)
+    return m
+
+def validate_models(candidate, current):
+    # One smoke deal through every predictor (also the warm-up) before anyone's session sees it
+    house = pd.DataFrame([candidate.model_defaults]).reindex(columns=candidate.model_columns)
+    house = house.fillna(candidate.model_defaults)
+    prices = [candidate.model.predict(house)[0]]
+    if candidate.student is not None:
+        prices.append(candidate.student.predict(house)[0])
+    if not all(np.isfinite(price) and 10_000 < price < 5_000_000 for price in prices):
+        raise ValueError(f"Smoke prediction out of range: {prices}")
+    if candidate.student is not None and abs(prices[1] / prices[0] - 1) > STUDENT_MAX_GAP:
+        raise ValueError(f"Student disagrees with the ensemble ({prices[1]:,.0f} vs {prices[0]:,.0f}): "
+                         "re-run distill.py on this pipeline")
+    if 'Neighborhood' not in candidate.model_options:
+        raise ValueError("Options artifact lacks Neighborhood")
+    return {"smoke_prices": [float(price) for price in prices]}
+
+def watched_paths():
+    paths = list(reloader.current.artifact_paths)
+    return paths if STUDENT_PATH in paths else paths + [STUDENT_PATH]
+
+reloader = HotReloader(load_models, validate_models, watch_paths_fn=watched_paths)
+reloader.load_initial()
+# New artifacts in models/ (or `kill -HUP <pid>`) reach open sessions without a restart
+install_reload_signal(reloader)
+if RELOAD_WATCH_SECONDS > 0:
+    reloader.start_watching(RELOAD_WATCH_SECONDS)
+
+# `kill -USR2 <pid>` writes a 10 s collapsed-stack profile to profiles/ (e.g. to catch slow calculate_deal runs)
+install_signal_handler(tag="dashboard")
 
 # ==========================================
 # 2. UI LAYOUT
 # ==========================================
-app_ui = ui.page_sidebar(
-    ui.sidebar(
-        ui.h3("🏠 House Flipper Pro"),
-        ui.hr(),
-        ui.h5("1. Acquisition Strategy"),
-        ui.input_select("neighborhood", "Neighborhood", choices=neighborhoods, selected="NAmes"),
-        ui.input_slider("sqft", "Living Area (SqFt)", min=500, max=4000, value=1500),
-        ui.input_slider("quality", "Current Quality (1-10)", min=1, max=10, value=5),
-        ui.input_numeric("year_built", "Year Built", value=1960),
-        # NEW: The Discount Slider
-        ui.input_slider("discount", "Purchase Discount (%)", min=0, max=50, value=0, post="%"),
-        ui.help_text("Simulate buying below market value (e.g., foreclosure, distress)."),
-
-        ui.hr(),
-        ui.h5("2. Renovation Plan"),
-        ui.input_switch("add_garage", "Add 2-Car Garage (Cost: $20k)", value=False),
-        ui.input_switch("add_ac", "Add Central Air (Cost: $6k)", value=False),
-        ui.input_switch("reno_kitchen", "Luxury Kitchen (Cost: $25k)", value=False),
-        ui.input_switch("finish_bsmt", "Finish Bsmt (+500sf, $30k)", value=False),
-    ),
-
-    ui.layout_columns(
-        ui.card(
-            ui.card_header("💰 Deal Economics"),
-            ui.output_ui("economics_box"),
+def app_ui(request):
+    # Built per page load, so the neighborhood list comes from the version serving now
+    models = reloader.current
+    # Get the full list (No more guessing or hardcoding!)
+    neighborhoods = models.model_options['Neighborhood']
+    return ui.page_sidebar(
+        ui.sidebar(
+            ui.h3("🏠 House Flipper Pro"),
+            ui.hr(),
+            ui.h5("1. Acquisition Strategy"),
+            ui.input_select("neighborhood", "Neighborhood", choices=neighborhoods, selected="NAmes"),
+            ui.input_slider("sqft", "Living Area (SqFt)", min=500, max=4000, value=1500),
+            ui.input_slider("quality", "Current Quality (1-10)", min=1, max=10, value=5),
+            ui.input_numeric("year_built", "Year Built", value=1960),
+            # NEW: The Discount Slider
+            ui.input_slider("discount", "Purchase Discount (%)", min=0, max=50, value=0, post="%"),
+            ui.help_text("Simulate buying below market value (e.g., foreclosure, distress)."),
+
+            ui.hr(),
+            ui.h5("2. Renovation Plan"),
+            ui.input_switch("add_garage", "Add 2-Car Garage (Cost: $20k)", value=False),
+            ui.input_switch("add_ac", "Add Central Air (Cost: $6k)", value=False),
+            ui.input_switch("reno_kitchen", "Luxury Kitchen (Cost: $25k)", value=False),
+            ui.input_switch("finish_bsmt", "Finish Bsmt (+500sf, $30k)", value=False),
+
+            ui.hr(),
+            ui.input_switch("fast_mode", "⚡ Fast Mode (single distilled model)",
+                            value=fast_by_default and models.student is not None),
+            ui.help_text("Slightly less accurate, much quicker. Needs models/ames_student_fast.pkl (distill.py)."),
+            ui.output_ui("model_version"),
+        ),
+
+        ui.layout_columns(
+            ui.card(
+                ui.card_header("💰 Deal Economics"),
+                ui.output_ui("economics_box"),
+            ),
+            ui.card(
+                ui.card_header("📈 Net Profit Potential"),
+                ui.output_ui("profit_box"),
+            ),
         ),
         ui.card(
-            ui.card_header("📈 Net Profit Potential"),
-            ui.output_ui("profit_box"),
+            ui.card_header("ROI Analysis (Purchase + Reno vs. Sale)"),
+            ui.output_plot("roi_plot"),
         ),
-    ),
-    ui.card(
-        ui.card_header("ROI Analysis (Purchase + Reno vs. Sale)"),
-        ui.output_plot("roi_plot"),
-    ),
-)
+    )
 
 # ==========================================
 # 3. SERVER LOGIC
 # ==========================================
 def server(input, output, session):
 
+    @reactive.poll(lambda: reloader.current.version, 2)
+    def serving_version():
+        # Re-runs every deal once a reload swaps in a new version
+        return reloader.current.version
+
+    @output
+    @render.ui
+    def model_version():
+        return ui.help_text(f"Model version: {serving_version()}")
+
     @reactive.Calc
     def calculate_deal():
+        serving_version()
+        models = reloader.current  # One version for the whole deal, even if a reload lands midway
+        model_columns, model_defaults = models.model_columns, models.model_defaults
+        # Fast mode swaps the 3-model ensemble for the distilled student (same .predict)
+        predictor = models.student if input.fast_mode() and models.student is not None else models.model
+
         # --- A. DEFINE BASE HOUSE ---
         base_df = pd.DataFrame([model_defaults])
         base_df['Neighborhood'] = input.neighborhood()
@@ -86,7 +170,7 @@ def server(input, output, session):
         base_no_reno['BsmtFinSF1'] = 0; base_no_reno['TotalBsmtSF'] = 1000
         
         final_base = base_no_reno.reindex(columns=model_columns).fillna(model_defaults)
-        fmv_pre_reno = model.predict(final_base)[0]
+        fmv_pre_reno = predictor.predict(final_base)[0]
 
         # --- B. APPLY PURCHASE DISCOUNT ---
         discount_pct = input.discount() / 100
@@ -121,7 +205,7 @@ def server(input, output, session):
         final_reno = reno_df.reindex(columns=model_columns).fillna(model_defaults)
         
         # PREDICT FINAL SALE PRICE
-        sale_price = model.predict(final_reno)[0]
+        sale_price = predictor.predict(final_reno)[0]
 
         # --- D. CALCULATE COSTS ---
         reno_cost = 0
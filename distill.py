@@ -0,0 +1,193 @@
+# distill.py
+# "Fast mode": distil the 3-model ensemble (teacher) into ONE compact XGBoost (student).
+#
+# The teacher evaluates a dense one-hot Lasso, 500 XGBoost trees and 1000 CatBoost iterations for
+# every prediction. Interactive uses (dashboard sliders) do not need that, so the student learns
+# to reproduce the teacher's predictions instead of the raw sale prices:
+#
+#   1. Transfer set = the notebook's training split + perturbed copies of it
+#      (numbers nudged by up to +/-10%, some categories swapped for other observed values)
+#   2. Labels       = teacher.predict(transfer set)
+#   3. Student      = the teacher's fitted preprocessor -> log1p -> one XGBoost -> expm1
+#
+# The student is a second artifact (models/ames_student_fast.pkl) with the same .predict(aligned_df)
+# as the Pipeline, so app_4.0.py (?mode=fast) and dashboard_v3.py can switch between the two.
+#
+# Usage:
+#   python distill.py --data data/Ames_Housing_Price_Data.csv
+#   -> models/ames_student_fast.pkl + models/ames_student_fast_report.json
+import argparse
+import json
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.compose import TransformedTargetRegressor
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from xgboost import XGBRegressor
+
+from compiled_model import DATA_PATH, MODELS_DIR, PIPELINE_PATH, compile_pipeline
+
+STUDENT_PATH = MODELS_DIR / "ames_student_fast.pkl"
+REPORT_PATH = MODELS_DIR / "ames_student_fast_report.json"
+
+# Deliberately small: fewer, deeper trees than the teacher's XGBoost, and nothing else
+STUDENT_PARAMS = dict(
+    n_estimators=400, learning_rate=0.08, max_depth=4, subsample=0.8, colsample_bytree=0.8,
+    random_state=42, n_jobs=1
+)
+
+
+# ==========================================
+# 1. TRANSFER SET
+# ==========================================
+def perturb(X, cat_cols, num_cols, copies=4, num_scale=0.10, num_prob=0.3, cat_prob=0.1, seed=42):
+    """`copies` perturbed versions of X, values kept inside what the training data has seen."""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(copies):
+        Xp = X.copy()
+        n = len(Xp)
+        for col in num_cols:
+            values = Xp[col].to_numpy(dtype=np.float64)
+            observed = values[~np.isnan(values)]
+            if not len(observed):
+                continue
+            nudge = rng.random(n) < num_prob
+            factors = rng.uniform(1 - num_scale, 1 + num_scale, n)
+            new = np.where(nudge, values * factors, values)
+            if np.all(observed == np.round(observed)):
+                new = np.round(new)  # counts, years and ratings stay whole numbers
+            Xp[col] = np.clip(new, observed.min(), observed.max())
+        for col in cat_cols:
+            swap = rng.random(n) < cat_prob
+            if swap.any():
+                donors = X[col].to_numpy(dtype=object)
+                values = Xp[col].to_numpy(dtype=object).copy()
+                values[swap] = donors[rng.integers(0, n, swap.sum())]
+                Xp[col] = values
+        frames.append(Xp)
+    return pd.concat([X] + frames, ignore_index=True)
+
+
+# ==========================================
+# 2. DISTILLATION
+# ==========================================
+def distill(teacher, X_train, copies=8, seed=42):
+    """Fit the student on the teacher's predictions. Returns (student Pipeline, transfer-set size)."""
+    preprocessor = teacher.named_steps['preprocessor']
+    cat_cols = list(preprocessor.transformers_[0][2])
+    num_cols = list(preprocessor.transformers_[1][2])
+
+    transfer = perturb(X_train, cat_cols, num_cols, copies=copies, seed=seed)
+    soft_labels = teacher.predict(transfer)
+
+    regressor = TransformedTargetRegressor(
+        regressor=XGBRegressor(**STUDENT_PARAMS), func=np.log1p, inverse_func=np.expm1
+    )
+    regressor.fit(preprocessor.transform(transfer), soft_labels)
+
+    # Reuse the teacher's fitted preprocessor: same encoding, same 'nan'/unknown handling
+    student = Pipeline([('preprocessor', preprocessor), ('model', regressor)])
+    return student, len(transfer)
+
+
+def single_row_latency_ms(predict, X, n=200):
+    rows = [X.iloc[[i % len(X)]] for i in range(n)]
+    times = []
+    for row in rows:
+        start = time.perf_counter()
+        predict(row)
+        times.append(time.perf_counter() - start)
+    return {"p50": float(np.percentile(times, 50) * 1000), "p99": float(np.percentile(times, 99) * 1000)}
+
+
+def batch_latency_ms(predict, X, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predict(X)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1000)
+
+
+def report(teacher, student, X_test, y_test, student_path, transfer_rows):
+    teacher_test = teacher.predict(X_test)
+    student_test = student.predict(X_test)
+
+    # What app_4.0 runs in mode=fast on the compiled/bundle backends: flat preprocessing + the student
+    compiled = compile_pipeline(teacher)
+    regressor = student.named_steps['model']
+    def fast_path(X):
+        return regressor.predict(compiled.transform(X))
+
+    return {
+        "transfer_rows": transfer_rows,
+        "student_params": STUDENT_PARAMS,
+        "r2_student_vs_teacher": float(r2_score(teacher_test, student_test)),
+        "r2_student_vs_test": float(r2_score(y_test, student_test)),
+        "r2_teacher_vs_test": float(r2_score(y_test, teacher_test)),
+        "latency_single_row_ms": {
+            "teacher": single_row_latency_ms(teacher.predict, X_test),
+            "student": single_row_latency_ms(student.predict, X_test),
+            "student_compiled_preprocessing": single_row_latency_ms(fast_path, X_test),
+        },
+        "latency_batch_ms": {
+            "rows": len(X_test),
+            "teacher": batch_latency_ms(teacher.predict, X_test),
+            "student": batch_latency_ms(student.predict, X_test),
+            "student_compiled_preprocessing": batch_latency_ms(fast_path, X_test),
+        },
+        "artifact_bytes": {
+            "teacher": PIPELINE_PATH.stat().st_size,
+            "student": Path(student_path).stat().st_size,
+        },
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Distil the production ensemble into a fast single model.")
+    parser.add_argument("--data", default=str(DATA_PATH), help="Ames CSV (with SalePrice)")
+    parser.add_argument("--copies", type=int, default=8, help="Perturbed copies of the training split")
+    parser.add_argument("--output", default=str(STUDENT_PATH))
+    parser.add_argument("--report", default=str(REPORT_PATH))
+    args = parser.parse_args()
+
+    from utils import cast_to_str  # noqa: F401  (needed to unpickle the Pipeline)
+
+    teacher = joblib.load(PIPELINE_PATH)
+    columns = joblib.load(MODELS_DIR / 'ames_model_columns.pkl')
+
+    # Same split as the production notebook, so the test rows were never seen by either model
+    df = pd.read_csv(args.data).drop(columns=['PID', 'Unnamed: 0'], errors='ignore')
+    X = df.drop(columns=['SalePrice']).reindex(columns=columns)
+    y = df['SalePrice']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    print(f"Distilling on {len(X_train):,} training rows + {args.copies} perturbed copies ...")
+    start = time.perf_counter()
+    student, transfer_rows = distill(teacher, X_train, copies=args.copies)
+    print(f"   Student fitted in {time.perf_counter() - start:.1f}s")
+
+    joblib.dump(student, args.output)
+    results = report(teacher, student, X_test, y_test, args.output, transfer_rows)
+    Path(args.report).write_text(json.dumps(results, indent=2))
+
+    single = results["latency_single_row_ms"]
+    batch = results["latency_batch_ms"]
+    size = results["artifact_bytes"]
+    print(f"\nR² student vs teacher:  {results['r2_student_vs_teacher']:.4f}")
+    print(f"R² vs test set:         student {results['r2_student_vs_test']:.4f} | "
+          f"teacher {results['r2_teacher_vs_test']:.4f}")
+    print(f"Single row p50:         student {single['student']['p50']:.2f} ms "
+          f"({single['student_compiled_preprocessing']['p50']:.2f} ms with compiled preprocessing) | "
+          f"teacher {single['teacher']['p50']:.2f} ms")
+    print(f"Batch of {batch['rows']:,}:         student {batch['student']:.1f} ms "
+          f"({batch['student_compiled_preprocessing']:.1f} ms with compiled preprocessing) | "
+          f"teacher {batch['teacher']:.1f} ms")
+    print(f"Artifact size:          student {size['student'] / 1024:,.0f} KB | teacher {size['teacher'] / 1024:,.0f} KB")
+    print(f"\n✅ Student saved to {args.output} (report: {args.report})")
@@ -0,0 +1,103 @@
+# explain.py
+# Exact, batched per-field explanations for final_production_pipeline (no sampling, no background set).
+#
+# Every member predicts log1p(price), so each one is split into a baseline plus one additive term
+# per encoded column, computed natively and for the whole batch at once:
+#   lasso:    coef * standardized value (baseline = intercept; the scaler centres every column)
+#   xgb:      Booster.predict(pred_contribs=True)      (exact TreeSHAP, last column = bias)
+#   catboost: get_feature_importance(type='ShapValues') (exact, last column = expected value)
+#
+# The vote is linear, so the ensemble's log-space terms are the same 1:2:2 weighted average.
+# The Lasso's one-hot slots (all of them: a 0 is information too) are summed back into their
+# Ames field, so every explanation has exactly one entry per model column.
+#
+# Dollars: price = expm1(baseline + sum(terms)) is not additive. Each field gets its share of
+# (price - expm1(baseline)) in proportion to its log-space term, so the dollar contributions
+# add up exactly to the predicted price. The log-space terms are returned as well.
+import numpy as np
+
+from compiled_model import CompiledPredictor, compile_pipeline
+
+
+class Explainer:
+    def __init__(self, predictor):
+        """predictor: a CompiledPredictor, or the fitted Pipeline (compiled here; same numbers)."""
+        compiled = predictor if isinstance(predictor, CompiledPredictor) else compile_pipeline(predictor)
+        self.compiled = compiled
+        self.columns = compiled.columns  # [cats, nums], the encoded column order
+        self.weights = compiled.weights / compiled.weights.sum()
+        n_cats = len(compiled.cat_cols)
+
+        # One-hot slot k is "column slot_columns[k] == slot_codes[k]"; fold_ohe sums slots per field
+        slot_columns, slot_codes = [], []
+        for j, offsets in enumerate(compiled.lasso_ohe_offsets):
+            for code, _ in sorted(offsets.items(), key=lambda item: item[1]):
+                slot_columns.append(j)
+                slot_codes.append(code)
+        self.slot_columns = np.array(slot_columns)
+        self.slot_codes = np.array(slot_codes)
+        self.fold_ohe = np.zeros((len(slot_columns), n_cats))
+        self.fold_ohe[np.arange(len(slot_columns)), self.slot_columns] = 1.0
+
+    # --- A. Member contributions (log space), shape [N, n_columns] + baseline [N] ---
+    def _lasso(self, X):
+        c = self.compiled
+        n_cats = len(c.cat_cols)
+        onehot = (X[:, self.slot_columns] == self.slot_codes).astype(np.float64)
+        Z = np.hstack([onehot, X[:, n_cats:]])
+        terms = c.lasso_coef * ((Z - c.lasso_mean) / c.lasso_scale)
+        n_ohe = len(self.slot_columns)
+        contribs = np.hstack([terms[:, :n_ohe] @ self.fold_ohe, terms[:, n_ohe:]])
+        return contribs, np.full(len(X), c.lasso_intercept)
+
+    def _xgb(self, X):
+        import xgboost as xgb
+
+        raw = self.compiled.xgb_booster.predict(xgb.DMatrix(X), pred_contribs=True).astype(np.float64)
+        return raw[:, :-1], raw[:, -1]
+
+    def _catboost(self, X):
+        from catboost import Pool
+
+        raw = self.compiled.catboost_model.get_feature_importance(Pool(X), type="ShapValues")
+        return raw[:, :-1], raw[:, -1]
+
+    def explain_matrix(self, X):
+        """Preprocessed matrix -> (ensemble log-space contributions [N, n_columns], baseline [N])."""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        contribs = np.zeros(X.shape)
+        baseline = np.zeros(len(X))
+        for weight, member in zip(self.weights, (self._lasso, self._xgb, self._catboost)):
+            member_contribs, member_baseline = member(X)
+            contribs += weight * member_contribs
+            baseline += weight * member_baseline
+        return contribs, baseline
+
+    # --- B. Public entry point ---
+    def explain(self, aligned_df, prices=None):
+        """
+        Aligned, defaults-filled frame -> one dict per row:
+          {"base_price", "contributions" ($ per field), "log_contributions", "log_base"}
+        prices: the prices served for these rows (default: expm1 of the explanation itself), so
+        the dollar contributions add up to exactly what /predict returned.
+        """
+        contribs, baseline = self.explain_matrix(self.compiled.transform(aligned_df))
+        log_total = contribs.sum(axis=1)
+        if prices is None:
+            prices = np.expm1(baseline + log_total)
+        prices = np.asarray(prices, dtype=np.float64)
+        base_prices = np.expm1(baseline)
+
+        explanations = []
+        for i in range(len(contribs)):
+            if abs(log_total[i]) > 1e-12:
+                scale = (prices[i] - base_prices[i]) / log_total[i]
+            else:
+                scale = np.exp(baseline[i])  # Nothing to share out: first-order d expm1(x)/dx
+            explanations.append({
+                "base_price": float(base_prices[i]),
+                "log_base": float(baseline[i]),
+                "contributions": dict(zip(self.columns, (contribs[i] * scale).tolist())),
+                "log_contributions": dict(zip(self.columns, contribs[i].tolist())),
+            })
+        return explanations
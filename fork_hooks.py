@@ -0,0 +1,32 @@
+# fork_hooks.py
+# Per-instance "after fork, in the child" hooks that do not keep their instances alive.
+#
+# os.register_at_fork() hooks can never be removed, so registering a bound method per instance
+# pins that instance (and everything it references: a retired model version, its ONNX session,
+# ...) for the life of the process, and re-runs its hook in every forked child. Here there is
+# ONE process-wide hook, which walks the instances that are still alive and still registered:
+#
+#   fork_hooks.register(self, "_start_worker")   # in __init__: self._start_worker() runs in each child
+#   fork_hooks.unregister(self)                  # on close: no more hook, nothing held
+import os
+import weakref
+
+# instance -> name of the method to call in the child (weak keys: registration never keeps it alive)
+_hooks = weakref.WeakKeyDictionary()
+
+
+def register(instance, method_name):
+    _hooks[instance] = method_name
+
+
+def unregister(instance):
+    if instance is not None:
+        _hooks.pop(instance, None)
+
+
+def _after_fork_in_child():
+    for instance, method_name in list(_hooks.items()):
+        getattr(instance, method_name)()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
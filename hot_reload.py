@@ -0,0 +1,258 @@
+# hot_reload.py
+# Zero-downtime reload of model artifacts: load, warm up and validate off to the side, then swap.
+#
+#   reloader = HotReloader(load_fn, validate_fn)     # load_fn() -> snapshot (.version, .artifact_paths)
+#   reloader.load_initial()
+#   with reloader.lease() as models:                 # one consistent snapshot for a whole request
+#       ...
+#   reloader.reload(reason="admin")                  # -> status dict; on failure the old snapshot keeps serving
+#   reloader.start_watching(poll_seconds=5)          # reload when the artifact files change and settle
+#
+# A snapshot is everything one artifact version needs to serve (pipeline, columns, defaults,
+# options, derived predictors). The swap is a single reference assignment, so a request sees
+# either the old snapshot or the new one, never a mix. The previous snapshot is closed (its
+# close(), if any) once the last request holding it has finished.
+#
+# Versions are content-derived (sha256 of every artifact file, like model_bundle.py), so
+# touching a file without changing it does not reload, and every response can name the exact
+# artifacts that produced it.
+import hashlib
+import os
+import signal
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import fork_hooks
+
+
+class ReloadFailed(Exception):
+    pass
+
+
+def file_signature(paths):
+    """(mtime_ns, size) per path (None if missing): cheap enough to poll."""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def content_version(paths):
+    """First 12 hex digits of a sha256 over every artifact's name and content."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(str(path)).encode())
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class HotReloader:
+    def __init__(self, load_fn, validate_fn=None, watch_paths_fn=None, history=20):
+        """
+        load_fn:        () -> snapshot with .version and .artifact_paths (and optionally .close()).
+        validate_fn:    (candidate, current or None) -> dict of findings; raises to reject the candidate.
+                        Its smoke predictions double as the warm-up (first calls build lazy native state),
+                        so the first real request after a swap is not the slow one.
+        watch_paths_fn: () -> paths to poll (default: the current snapshot's artifact_paths).
+        """
+        self.load_fn = load_fn
+        self.validate_fn = validate_fn
+        self.watch_paths_fn = watch_paths_fn
+        self.current = None
+        self.history = deque(maxlen=history)
+
+        self._lock = threading.Lock()          # Swap + leases
+        self._reload_lock = threading.Lock()   # One reload at a time
+        self._leases = {}                      # id(snapshot) -> requests holding it
+        self._retired = {}                     # id(snapshot) -> snapshot waiting for its last lease
+        self._watch_thread = None
+        self._poll_seconds = 0.0
+        self._signature = None
+        self._pending = None
+
+        # Threads do not survive fork(): pre-forked workers restart the watcher if it was running
+        fork_hooks.register(self, "_after_fork")
+
+    # --- A. Leases ---
+    def acquire(self):
+        """The current snapshot, held until release() (None if nothing is loaded yet)."""
+        with self._lock:
+            snapshot = self.current
+            if snapshot is not None:
+                self._leases[id(snapshot)] = self._leases.get(id(snapshot), 0) + 1
+            return snapshot
+
+    def release(self, snapshot):
+        if snapshot is None:
+            return
+        with self._lock:
+            key = id(snapshot)
+            self._leases[key] -= 1
+            if self._leases[key]:
+                return
+            del self._leases[key]
+            retired = self._retired.pop(key, None)
+        if retired is not None:
+            self._close(retired)
+
+    @contextmanager
+    def lease(self):
+        snapshot = self.acquire()
+        try:
+            yield snapshot
+        finally:
+            self.release(snapshot)
+
+    def in_flight(self):
+        with self._lock:
+            return sum(self._leases.values())
+
+    @staticmethod
+    def _close(snapshot):
+        close = getattr(snapshot, "close", None)
+        if close is not None:
+            close()
+
+    # --- B. Loading ---
+    def _record(self, entry):
+        entry["at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.history.append(entry)
+        return entry
+
+    def load_initial(self):
+        """First load at startup: no previous snapshot to fall back on, so failures raise."""
+        started = time.perf_counter()
+        snapshot = self.load_fn()
+        findings = self.validate_fn(snapshot, None) if self.validate_fn else {}
+        self._swap(snapshot)
+        return self._record({"status": "loaded", "reason": "startup", "version": snapshot.version,
+                             "seconds": time.perf_counter() - started, "checks": findings})
+
+    def reload(self, reason="manual"):
+        """
+        Load -> warm up -> validate -> swap. Returns a status dict:
+          swapped | unchanged (same content version) | failed (old snapshot still serving) | busy
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return {"status": "busy", "reason": reason, "version": getattr(self.current, "version", None)}
+        try:
+            started = time.perf_counter()
+            previous = self.current
+            # Acted on these files whatever the outcome: the watcher does not retry a rejected
+            # candidate every poll, only once the files change again (an admin reload still retries)
+            signature = file_signature(self._watch_paths())
+            try:
+                candidate = self.load_fn()
+            except Exception as e:
+                self._signature = signature
+                return self._record({"status": "failed", "reason": reason, "stage": "load",
+                                     "error": f"{type(e).__name__}: {e}", "version": getattr(previous, "version", None)})
+            if previous is not None and candidate.version == previous.version:
+                self._close(candidate)
+                self._signature = signature
+                return self._record({"status": "unchanged", "reason": reason, "version": candidate.version,
+                                     "seconds": time.perf_counter() - started})
+            try:
+                findings = self.validate_fn(candidate, previous) if self.validate_fn else {}
+            except Exception as e:
+                self._close(candidate)
+                self._signature = signature
+                return self._record({"status": "failed", "reason": reason, "stage": "validate",
+                                     "error": f"{type(e).__name__}: {e}", "candidate": candidate.version,
+                                     "version": getattr(previous, "version", None)})
+            self._swap(candidate)
+            return self._record({"status": "swapped", "reason": reason, "version": candidate.version,
+                                 "previous": getattr(previous, "version", None),
+                                 "seconds": time.perf_counter() - started, "checks": findings})
+        finally:
+            self._reload_lock.release()
+
+    def _swap(self, snapshot):
+        with self._lock:
+            previous, self.current = self.current, snapshot
+            self._signature = file_signature(self._watch_paths())
+            if previous is None:
+                return
+            if self._leases.get(id(previous)):
+                self._retired[id(previous)] = previous  # Closed by the last release()
+                previous = None
+        if previous is not None:
+            self._close(previous)
+
+    # --- C. Watching ---
+    def _watch_paths(self):
+        if self.watch_paths_fn is not None:
+            return list(self.watch_paths_fn())
+        return list(getattr(self.current, "artifact_paths", []))
+
+    def changed(self):
+        """
+        True once the watched files differ from the last ones reloaded AND were identical on
+        the previous call too, so a half-copied pickle is never loaded. Call it periodically.
+        """
+        signature = file_signature(self._watch_paths())
+        if signature == self._signature:
+            self._pending = None
+            return False
+        settled = signature == self._pending
+        self._pending = signature
+        return settled
+
+    def _watch(self, stop):
+        while not stop.wait(self._poll_seconds):
+            if self.changed():
+                self.reload(reason="watch")
+
+    def start_watching(self, poll_seconds=5.0):
+        self.stop_watching()
+        self._poll_seconds = poll_seconds
+        self._watch_stop = threading.Event()
+        self._watch_thread = threading.Thread(target=self._watch, args=(self._watch_stop,),
+                                              name="artifact-watcher", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        if self._watch_thread is not None:
+            self._watch_stop.set()
+            self._watch_thread = None
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._leases = {}
+        self._retired = {}
+        if self._watch_thread is not None:
+            self.start_watching(self._poll_seconds)
+
+    # --- D. Status ---
+    def stats(self):
+        return {
+            "version": getattr(self.current, "version", None),
+            "watching": self._watch_thread is not None,
+            "poll_seconds": self._poll_seconds if self._watch_thread is not None else None,
+            "in_flight": self.in_flight(),
+            "draining": len(self._retired),
+            "history": list(self.history),
+        }
+
+
+def install_reload_signal(reloader, signum=getattr(signal, "SIGHUP", None)):
+    """`kill -HUP <pid>` reloads in a background thread (the handler itself must return at once)."""
+    def handler(*_):
+        threading.Thread(target=reloader.reload, kwargs={"reason": "signal"}, daemon=True).start()
+
+    if signum is None:
+        return False  # No SIGHUP on Windows: endpoint-only
+    try:
+        signal.signal(signum, handler)
+    except ValueError:
+        return False  # Not the main thread: endpoint-only
+    return True
@@ -0,0 +1,143 @@
+# lasso_tables.py
+# The fitted OneHotEncoder + StandardScaler + Lasso folded into lookup tables.
+#
+# With the branch in centered form (mean m, scale s, coef w, intercept b; see sparse_lasso.py):
+#   lasso(x) = b + sum_k w_k * (z_k - m_k) / s_k
+# A one-hot slot k is 1 for exactly one category of its column and 0 otherwise, so this is
+#   lasso(x) = intercept                                  (b - sum_k w_k * m_k / s_k)
+#            + sum over categorical columns j of term_j[code_j]   (w_k / s_k of that category's slot)
+#            + sum over numeric columns j of slope_j * x_j        (w_k / s_k)
+# An unseen category (ordinal code -1) has no slot: its term is 0. Scoring is one gather per
+# categorical column plus a small dot product, with no n_rows x ~330 intermediate.
+#
+# Categories whose term Lasso drove to exactly 0 are listed by zero_categories(); columns where
+# every term (or the slope) is 0 are skipped at predict time.
+#
+# Usage:
+#   python lasso_tables.py                          # fold models/ + write models/ames_lasso_tables.json
+#   python lasso_tables.py --zeros                  # also print every zero-coefficient category
+import argparse
+import json
+
+import numpy as np
+
+
+class LassoTables:
+    def __init__(self, cat_cols, num_cols, intercept, category_terms, slopes):
+        """
+        cat_cols / num_cols: Column order of the encoded matrix ([cats, nums]).
+        intercept:           The folded constant (log-price of a row whose every term is 0).
+        category_terms:      One {category string: (ordinal code, term)} dict per categorical column.
+        slopes:              Per-numeric-column slope on the imputed (unscaled) value.
+        """
+        self.cat_cols = list(cat_cols)
+        self.num_cols = list(num_cols)
+        self.intercept = float(intercept)
+        self.category_terms = category_terms
+        self.slopes = np.asarray(slopes, dtype=np.float64)
+
+        # One flat table: column j's block is [unknown (code -1), code 0, code 1, ...]
+        sizes = [max((code for code, _ in terms.values()), default=-1) + 2 for terms in category_terms]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        self.table = np.zeros(int(sum(sizes)), dtype=np.float64)
+        for j, terms in enumerate(category_terms):
+            for code, term in terms.values():
+                self.table[self.offsets[j] + 1 + code] = term
+
+        # Skip what contributes nothing
+        self.active_cats = np.array([j for j, terms in enumerate(category_terms)
+                                     if any(term != 0.0 for _, term in terms.values())], dtype=np.int64)
+        self.active_nums = np.flatnonzero(self.slopes)
+
+    def predict(self, X):
+        """Encoded matrix ([ordinal codes, imputed numerics]) -> the Lasso's log-price per row."""
+        n_cats = len(self.cat_cols)
+        out = X[:, n_cats + self.active_nums] @ self.slopes[self.active_nums]
+        out += self.intercept
+        if len(X) <= 1024:
+            # One fancy-index for the whole block: per-call overhead is what matters for small batches
+            codes = X[:, self.active_cats].astype(np.int64)
+            out += self.table[codes + (self.offsets[self.active_cats] + 1)].sum(axis=1)
+            return out
+        # One column at a time: the temporaries stay a few n_rows vectors, whatever the batch size
+        for j in self.active_cats:
+            out += self.table[X[:, j].astype(np.int64) + (self.offsets[j] + 1)]
+        return out
+
+    def zero_categories(self):
+        """{categorical column: [categories whose term is exactly 0]} (columns with none are left out)."""
+        zeros = {}
+        for col, terms in zip(self.cat_cols, self.category_terms):
+            dropped = [category for category, (_, term) in terms.items() if term == 0.0]
+            if dropped:
+                zeros[col] = dropped
+        return zeros
+
+    def zero_numeric(self):
+        return [col for col, slope in zip(self.num_cols, self.slopes) if slope == 0.0]
+
+    def to_dict(self):
+        return {
+            "intercept": self.intercept,
+            "categorical": {col: {category: term for category, (_, term) in terms.items()}
+                            for col, terms in zip(self.cat_cols, self.category_terms)},
+            "numeric": dict(zip(self.num_cols, self.slopes.tolist())),
+            "zero_categories": self.zero_categories(),
+            "zero_numeric": self.zero_numeric(),
+        }
+
+
+def fold_lasso(compiled):
+    """A CompiledPredictor (or anything with its lasso_* and category_codes fields) -> LassoTables."""
+    n_ohe = len(compiled.lasso_mean) - len(compiled.num_cols)
+    weights = compiled.lasso_coef / compiled.lasso_scale  # Per slot / numeric column
+    intercept = compiled.lasso_intercept - float(np.dot(weights, compiled.lasso_mean))
+
+    category_terms = []
+    for lookup, offsets in zip(compiled.category_codes, compiled.lasso_ohe_offsets):
+        terms = {}
+        for category, code in lookup.items():
+            slot = offsets.get(code)
+            # A code the Lasso's OneHotEncoder never saw is "unknown" to it: term 0
+            terms[category] = (int(code), float(weights[slot]) if slot is not None else 0.0)
+        category_terms.append(terms)
+
+    return LassoTables(compiled.cat_cols, compiled.num_cols, intercept, category_terms, weights[n_ohe:])
+
+
+if __name__ == '__main__':
+    import joblib
+    from compiled_model import DATA_PATH, MODELS_DIR, PIPELINE_PATH, compile_pipeline, load_training_features
+
+    parser = argparse.ArgumentParser(description="Fold the Lasso member into per-category contribution tables.")
+    parser.add_argument("--data", default=str(DATA_PATH), help="CSV used for the parity check")
+    parser.add_argument("--output", default=str(MODELS_DIR / "ames_lasso_tables.json"))
+    parser.add_argument("--zeros", action="store_true", help="Print every zero-coefficient category")
+    args = parser.parse_args()
+
+    pipeline = joblib.load(PIPELINE_PATH)
+    compiled = compile_pipeline(pipeline)
+    tables = fold_lasso(compiled)
+
+    # Parity against the sklearn member on the encoded training rows
+    preprocessor = pipeline.named_steps['preprocessor']
+    X = preprocessor.transform(load_training_features(args.data, list(preprocessor.feature_names_in_)))
+    lasso = pipeline.named_steps['model'].regressor_.named_estimators_['lasso']
+    diff = np.max(np.abs(tables.predict(X) - lasso.predict(X)))
+    print(f"Parity on {len(X)} rows: max |diff| {diff:.2e} log-$")
+
+    zeros = tables.zero_categories()
+    n_categories = sum(len(terms) for terms in tables.category_terms)
+    n_zero = sum(len(categories) for categories in zeros.values())
+    print(f"{n_zero} of {n_categories} categories have a zero coefficient; "
+          f"{len(tables.cat_cols) - len(tables.active_cats)} of {len(tables.cat_cols)} categorical and "
+          f"{len(tables.num_cols) - len(tables.active_nums)} of {len(tables.num_cols)} numeric columns are skipped entirely")
+    if args.zeros:
+        for col, categories in zeros.items():
+            print(f"   {col}: {', '.join(categories)}")
+        if tables.zero_numeric():
+            print(f"   numeric: {', '.join(tables.zero_numeric())}")
+
+    with open(args.output, "w") as f:
+        json.dump(tables.to_dict(), f, indent=2)
+    print(f"📝 Tables written to {args.output}")
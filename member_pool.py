@@ -0,0 +1,116 @@
+# member_pool.py
+# Concurrent evaluation of the VotingRegressor members (Lasso, XGBoost, CatBoost) for batches.
+#
+# final_production_pipeline votes with n_jobs=1, so the three members predict one after another.
+# All three spend their time in native code that releases the GIL (BLAS, XGBoost's and
+# CatBoost's C++ predictors), so for large batches they can run side by side on three threads.
+# Each member gets its own intra-op thread budget so the three do not oversubscribe the cores:
+#
+#   AMES_MEMBER_THREADS="lasso=1,xgb=2,catboost=2"
+#
+# The combine step is unchanged: 1:2:2 weighted vote in log space, then expm1.
+# Small batches (below min_rows) stay sequential: thread hand-off costs more than it saves.
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import fork_hooks
+
+MEMBERS = ("lasso", "xgb", "catboost")
+
+
+def default_threads(cpu_count=None):
+    """Split the cores between the two tree members; the Lasso is one matrix-vector product."""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    trees = max(1, (cpu_count - 1) // 2)
+    return {"lasso": 1, "xgb": trees, "catboost": trees}
+
+
+def parse_threads(spec):
+    """'lasso=1,xgb=2,catboost=2' -> {'lasso': 1, 'xgb': 2, 'catboost': 2} (missing members: default)."""
+    threads = default_threads()
+    for part in filter(None, (part.strip() for part in (spec or "").split(","))):
+        name, _, value = part.partition("=")
+        if name.strip() not in MEMBERS:
+            raise ValueError(f"Unknown member '{name.strip()}' in thread budget (expected one of {MEMBERS})")
+        threads[name.strip()] = int(value)
+    return threads
+
+
+# ==========================================
+# 1. THREAD BUDGETS
+# ==========================================
+def limit_blas_threads(n):
+    """Lasso's budget. BLAS pools are process-wide, so this caps every NumPy matmul in the process."""
+    from threadpoolctl import threadpool_limits
+
+    return threadpool_limits(limits=n, user_api="blas")
+
+
+def apply_thread_budget(predictor, threads):
+    """
+    Pin each member's intra-op threads, once at startup. Works for the sklearn Pipeline and for
+    a CompiledPredictor. Returns the threadpoolctl handle for the Lasso's BLAS cap (.restore_original_limits() undoes it).
+    """
+    if hasattr(predictor, "set_member_threads"):
+        predictor.set_member_threads(xgb=threads["xgb"], catboost=threads["catboost"])
+    else:
+        # A fitted CatBoost model is read-only: its budget goes to pipeline_members() instead
+        estimators = predictor.named_steps['model'].regressor_.named_estimators_
+        estimators["xgb"].set_params(n_jobs=threads["xgb"])
+    return limit_blas_threads(threads["lasso"])
+
+
+def pipeline_members(voting, catboost_threads=-1):
+    """[(name, predict)] for a fitted VotingRegressor; CatBoost gets its thread count per call."""
+    members = []
+    for name, estimator in voting.named_estimators_.items():
+        predict = estimator.predict
+        if name == "catboost":
+            predict = functools.partial(predict, thread_count=catboost_threads)
+        members.append((name, predict))
+    return members
+
+
+# ==========================================
+# 2. THE POOL
+# ==========================================
+class MemberPool:
+    def __init__(self, min_rows=256, max_workers=len(MEMBERS)):
+        """
+        min_rows:    Batches smaller than this run the members sequentially on the calling thread.
+        max_workers: Pool threads; one per member by default.
+        """
+        self.min_rows = min_rows
+        self.max_workers = max_workers
+        self._start_executor()
+
+        # Pool threads do not survive fork(): pre-forked workers (serve.py) need their own
+        fork_hooks.register(self, "_start_executor")
+
+    def _start_executor(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="member")
+        self._lock = threading.Lock()
+        self._concurrent_batches = 0
+        self._sequential_batches = 0
+
+    def run(self, members, X):
+        """[(name, predict)] -> [prediction per member], in vote order."""
+        if len(X) < self.min_rows:
+            with self._lock:
+                self._sequential_batches += 1
+            return [predict(X) for _, predict in members]
+
+        with self._lock:
+            self._concurrent_batches += 1
+        futures = [self._executor.submit(predict, X) for _, predict in members]
+        return [future.result() for future in futures]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "min_rows": self.min_rows,
+                "concurrent_batches": self._concurrent_batches,
+                "sequential_batches": self._sequential_batches,
+            }
@@ -0,0 +1,238 @@
+# metrics.py
+# Minimal, low-overhead Prometheus-style metrics (no client library needed).
+#
+#   REQUESTS = Counter("ames_requests_total", "Requests served", ["endpoint", "status"])
+#   REQUESTS.labels(endpoint="/predict", status="200").inc()
+#
+#   LATENCY = Histogram("ames_stage_latency_seconds", "Per-stage latency", ["stage"])
+#   with LATENCY.labels(stage="fillna").time():
+#       ...
+#
+#   registry.render()  ->  Prometheus text exposition format (for GET /metrics)
+#
+# Each observation is one perf_counter() pair, one bisect and one lock, so it is cheap
+# enough to leave on in production. Histograms also export p50/p90/p99 estimated from
+# their buckets, so a plain curl shows percentiles without a Prometheus server.
+import bisect
+import math
+import threading
+import time
+
+# 50 us .. ~13 s, roughly x2 per bucket: fine enough for sub-millisecond stages
+DEFAULT_BUCKETS = tuple(0.00005 * 2 ** i for i in range(19))
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra or [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{name}="{str(value)}"' for name, value in pairs)
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+# ==========================================
+# 1. METRIC TYPES
+# ==========================================
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, **labelvalues):
+        key = tuple(str(labelvalues[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        # Unlabelled metrics act as their own single child
+        return self.labels()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self._value += amount
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_format_labels(labelnames, key)} {_format_value(self._value)}"]
+
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+    def set(self, value):
+        with self._lock:
+            self._value = float(value)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._upper_bounds = list(buckets) + [math.inf]
+        self._counts = [0] * len(self._upper_bounds)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self._upper_bounds, seconds)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += seconds
+            self._count += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def quantile(self, q):
+        """Prometheus-style histogram_quantile: linear interpolation inside the bucket."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+        if total == 0:
+            return 0.0
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                lower = self._upper_bounds[i - 1] if i else 0.0
+                upper = self._upper_bounds[i]
+                if upper == math.inf:
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self._upper_bounds[-2]
+
+    def render(self, name, labelnames, key):
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+            total = self._count
+        lines = []
+        cumulative = 0
+        for upper, count in zip(self._upper_bounds, counts):
+            cumulative += count
+            labels = _format_labels(labelnames, key, [("le", _format_value(upper))])
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(total_sum)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {total}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._start)
+        return False
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1.0):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount=1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount=1.0):
+        self._default().dec(amount)
+
+    def set(self, value):
+        self._default().set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, seconds):
+        self._default().observe(seconds)
+
+    def time(self):
+        return self._default().time()
+
+    def render(self):
+        lines = super().render()
+        # Companion gauge family with bucket-estimated percentiles, e.g. ..._quantile{quantile="0.99"}
+        quantile_name = f"{self.name}_quantile"
+        lines.append(f"# HELP {quantile_name} {self.documentation} (p50/p90/p99 estimated from buckets)")
+        lines.append(f"# TYPE {quantile_name} gauge")
+        for key, child in sorted(self._children.items()):
+            for q in QUANTILES:
+                labels = _format_labels(self.labelnames, key, [("quantile", q)])
+                lines.append(f"{quantile_name}{labels} {_format_value(child.quantile(q))}")
+        return lines
+
+
+# ==========================================
+# 2. REGISTRY
+# ==========================================
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
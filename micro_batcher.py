@@ -0,0 +1,144 @@
+# micro_batcher.py
+# Adaptive micro-batching for concurrent single-row predictions.
+#
+# Request threads put one aligned row on a queue and wait on a Future.
+# A single worker thread flushes the queue when it holds max_batch_size rows
+# or when the oldest row has waited max_wait_ms, whichever comes first,
+# runs ONE predict call on the stacked frame and fans the prices back out.
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from queue import Empty, Queue
+
+import numpy as np
+import pandas as pd
+
+import fork_hooks
+
+
+class MicroBatcher:
+    def __init__(self, predict_fn, columns, max_batch_size=32, max_wait_ms=5.0, window=10000):
+        """
+        predict_fn:     Callable(aligned DataFrame) -> array of prices.
+        columns:        Column order of the aligned rows (ames_model_columns.pkl).
+        max_batch_size: Flush as soon as this many rows are queued.
+        max_wait_ms:    Flush once the oldest queued row has waited this long.
+        window:         How many recent queueing delays to keep for percentiles.
+        """
+        self.predict_fn = predict_fn
+        self.columns = list(columns)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._batch_sizes = Counter()
+        self._queue_delays = deque(maxlen=window)
+        self._rows = 0
+        self._batches = 0
+        self._fallbacks = 0
+        self._closed = False
+
+        self._start_worker()
+
+        # Threads do not survive fork(): pre-forked workers (serve.py) need their own queue + worker
+        fork_hooks.register(self, "_start_worker")
+
+    def _start_worker(self):
+        if self._closed:
+            return
+        self._queue = Queue()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    # --- A. Request side ---
+    def submit(self, values):
+        """Queue one aligned row (values in self.columns order). Returns a Future price."""
+        future = Future()
+        self._queue.put((list(values), future, time.perf_counter()))
+        return future
+
+    def predict(self, aligned_df):
+        """Drop-in for predictor.predict: one Future per row, all resolved by the worker."""
+        futures = [self.submit(row) for row in aligned_df.itertuples(index=False, name=None)]
+        return np.array([future.result() for future in futures])
+
+    def close(self):
+        """Stop the worker once every row already queued is served (no submit() after this)."""
+        self._closed = True
+        self._queue.put(None)
+        fork_hooks.unregister(self)
+
+    # --- B. Worker side ---
+    def _collect(self):
+        """The next batch, and whether close() was called (the None sentinel is always last)."""
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _frame(self, rows):
+        # dtype=object keeps every value exactly as the single-row path sees it
+        return pd.DataFrame(rows, columns=self.columns, dtype=object)
+
+    def _run(self):
+        closed = False
+        while not closed:
+            batch, closed = self._collect()
+            if not batch:
+                break
+            started = time.perf_counter()
+            rows = [row for row, _, _ in batch]
+            futures = [future for _, future, _ in batch]
+
+            try:
+                prices = self.predict_fn(self._frame(rows))
+                for future, price in zip(futures, prices):
+                    future.set_result(float(price))
+            except Exception:
+                # One bad row must not fail its neighbours: retry the batch row by row
+                with self._lock:
+                    self._fallbacks += 1
+                for row, future in zip(rows, futures):
+                    try:
+                        future.set_result(float(self.predict_fn(self._frame([row]))[0]))
+                    except Exception as e:
+                        future.set_exception(e)
+
+            with self._lock:
+                self._batches += 1
+                self._rows += len(batch)
+                self._batch_sizes[len(batch)] += 1
+                self._queue_delays.extend(started - enqueued for _, _, enqueued in batch)
+
+    # --- C. Metrics ---
+    def stats(self):
+        with self._lock:
+            delays_ms = np.array(self._queue_delays) * 1000.0
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "rows": self._rows,
+                "mean_batch_size": self._rows / self._batches if self._batches else 0.0,
+                "batch_size_distribution": {str(size): n for size, n in sorted(self._batch_sizes.items())},
+                "queue_delay_ms": {
+                    "p50": float(np.percentile(delays_ms, 50)) if len(delays_ms) else 0.0,
+                    "p90": float(np.percentile(delays_ms, 90)) if len(delays_ms) else 0.0,
+                    "p99": float(np.percentile(delays_ms, 99)) if len(delays_ms) else 0.0,
+                    "max": float(delays_ms.max()) if len(delays_ms) else 0.0,
+                },
+                "row_by_row_fallbacks": self._fallbacks,
+            }
@@ -0,0 +1,297 @@
+# model_bundle.py
+# A single, versioned, pickle-free model bundle directory.
+#
+# models/ames_bundle/
+#   manifest.json        format + bundle version, library versions, sha256 of every file
+#   metadata.json        columns, defaults and options (typed JSON)
+#   xgb_booster.ubj      XGBoost booster, native UBJSON format
+#   catboost.cbm         CatBoost model, native .cbm format
+#   *.npy                medians, encoder vocabularies, scaler + Lasso parameters (memory-mappable)
+#
+# The loader rebuilds a CompiledPredictor (see compiled_model.py), so nothing here depends on
+# pickle internals or on cast_to_str being importable. Loading with mmap=True maps the .npy
+# files read-only, so every process on the host shares one copy of the weights.
+#
+# The manifest records the library versions the bundle was exported with. Loading under a
+# different major.minor XGBoost or CatBoost (whose native formats hold the trees) raises
+# BundleError; scikit-learn / numpy differences only warn.
+#
+# Usage:
+#   python model_bundle.py export    # pickles -> models/ames_bundle/
+#   python model_bundle.py verify    # checksums + parity vs the Pipeline + cold-start timing
+import argparse
+import hashlib
+import json
+import re
+import time
+import warnings
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version as installed_version
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from compiled_model import (
+    DATA_PATH, MODELS_DIR, PIPELINE_PATH,
+    CompiledPredictor, check_parity, compile_pipeline, load_training_features
+)
+
+BUNDLE_DIR = MODELS_DIR / "ames_bundle"
+FORMAT_VERSION = 1
+
+ARRAY_FILES = [
+    "medians", "ordinal_categories", "ordinal_offsets", "ohe_codes", "ohe_offsets",
+    "lasso_mean", "lasso_scale", "lasso_coef", "weights",
+]
+
+
+# Libraries whose native model formats the bundle stores: a major.minor mismatch is an error
+STRICT_LIBRARIES = ("xgboost", "catboost")
+
+
+class BundleError(Exception):
+    pass
+
+
+class ModelBundle:
+    def __init__(self, predictor, columns, defaults, options, manifest):
+        self.predictor = predictor
+        self.columns = columns
+        self.defaults = defaults
+        self.options = options
+        self.manifest = manifest
+
+    @property
+    def version(self):
+        return self.manifest["bundle_version"]
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _major_minor(version):
+    match = re.match(r"(\d+)\.(\d+)", version or "")
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def _check_library_versions(recorded):
+    """Raise (XGBoost / CatBoost) or warn (the rest) if an installed major.minor differs from the manifest's."""
+    problems = []
+    for library, exported in recorded.items():
+        try:
+            installed = installed_version(library)
+        except PackageNotFoundError:
+            installed = None
+        if installed is None or _major_minor(installed) != _major_minor(exported):
+            problems.append((library, exported, installed))
+
+    strict = [f"{library} {exported} (installed: {installed or 'none'})"
+              for library, exported, installed in problems if library in STRICT_LIBRARIES]
+    if strict:
+        raise BundleError(f"Bundle was exported with {', '.join(strict)}: re-export it with "
+                          f"`python model_bundle.py export` under the installed libraries")
+    for library, exported, installed in problems:
+        warnings.warn(f"Bundle was exported with {library} {exported}, installed is {installed or 'none'}")
+
+
+def _flatten(groups, dtype):
+    """List of lists -> (flat array, offsets) so ragged vocabularies fit in two .npy files."""
+    offsets = np.cumsum([0] + [len(group) for group in groups]).astype(np.int64)
+    flat = np.array([value for group in groups for value in group], dtype=dtype)
+    return flat, offsets
+
+
+def _unflatten(flat, offsets):
+    return [flat[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+
+# ==========================================
+# 1. EXPORT
+# ==========================================
+def export_bundle(compiled, columns, defaults, options, bundle_dir=BUNDLE_DIR):
+    bundle_dir = Path(bundle_dir)
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+
+    # A. Tree members in their native formats
+    compiled.xgb_booster.save_model(str(bundle_dir / "xgb_booster.ubj"))
+    compiled.catboost_model.save_model(str(bundle_dir / "catboost.cbm"), format="cbm")
+
+    # B. Encoders, imputer, scaler and Lasso as plain arrays
+    ordinal_categories, ordinal_offsets = _flatten(
+        [sorted(lookup, key=lookup.get) for lookup in compiled.category_codes], dtype=str
+    )
+    ohe_codes, ohe_offsets = _flatten(
+        [sorted(offsets, key=offsets.get) for offsets in compiled.lasso_ohe_offsets], dtype=np.float64
+    )
+    arrays = {
+        "medians": compiled.medians,
+        "ordinal_categories": ordinal_categories,
+        "ordinal_offsets": ordinal_offsets,
+        "ohe_codes": ohe_codes,
+        "ohe_offsets": ohe_offsets,
+        "lasso_mean": compiled.lasso_mean,
+        "lasso_scale": compiled.lasso_scale,
+        "lasso_coef": compiled.lasso_coef,
+        "weights": compiled.weights,
+    }
+    for name, array in arrays.items():
+        np.save(bundle_dir / f"{name}.npy", np.ascontiguousarray(array))
+
+    # C. Columns, defaults and options as one typed JSON
+    metadata = {
+        "columns": list(columns),
+        "cat_cols": compiled.cat_cols,
+        "num_cols": compiled.num_cols,
+        "unknown_code": compiled.unknown_code,
+        "lasso_intercept": compiled.lasso_intercept,
+        "defaults": {col: (str(value) if col in compiled.cat_cols else float(value))
+                     for col, value in defaults.items()},
+        "default_types": {col: ("str" if col in compiled.cat_cols else "float") for col in defaults},
+        "options": {col: [str(value) for value in values] for col, values in options.items()},
+    }
+    (bundle_dir / "metadata.json").write_text(json.dumps(metadata, indent=2))
+
+    # D. Manifest: checksums of everything above, and a content-derived version
+    import catboost
+    import sklearn
+    import xgboost
+
+    files = {}
+    for path in sorted(bundle_dir.iterdir()):
+        if path.name != "manifest.json":
+            files[path.name] = {"sha256": _sha256(path), "bytes": path.stat().st_size}
+    version_digest = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "bundle_version": version_digest[:12],
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "libraries": {
+            "xgboost": xgboost.__version__,
+            "catboost": catboost.__version__,
+            "scikit-learn": sklearn.__version__,
+            "numpy": np.__version__,
+        },
+        "files": files,
+    }
+    (bundle_dir / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+# ==========================================
+# 2. LOAD
+# ==========================================
+def load_bundle(bundle_dir=BUNDLE_DIR, mmap=True, verify=True, check_versions=True):
+    """Rebuild a CompiledPredictor (+ columns, defaults, options) from a bundle directory."""
+    import xgboost as xgb
+    from catboost import CatBoostRegressor
+
+    bundle_dir = Path(bundle_dir)
+    manifest = json.loads((bundle_dir / "manifest.json").read_text())
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise BundleError(f"Unsupported bundle format {manifest.get('format_version')} (expected {FORMAT_VERSION})")
+    if check_versions:
+        _check_library_versions(manifest.get("libraries", {}))
+
+    if verify:
+        for name, info in manifest["files"].items():
+            if _sha256(bundle_dir / name) != info["sha256"]:
+                raise BundleError(f"Checksum mismatch for {name}: bundle is corrupt or partially written")
+
+    metadata = json.loads((bundle_dir / "metadata.json").read_text())
+    mmap_mode = "r" if mmap else None
+    arrays = {name: np.load(bundle_dir / f"{name}.npy", mmap_mode=mmap_mode) for name in ARRAY_FILES}
+
+    category_codes = [
+        {str(category): float(code) for code, category in enumerate(categories)}
+        for categories in _unflatten(arrays["ordinal_categories"], arrays["ordinal_offsets"])
+    ]
+    lasso_ohe_offsets = []
+    for j, codes in enumerate(_unflatten(arrays["ohe_codes"], arrays["ohe_offsets"])):
+        start = int(arrays["ohe_offsets"][j])
+        lasso_ohe_offsets.append({float(code): start + k for k, code in enumerate(codes)})
+
+    booster = xgb.Booster()
+    booster.load_model(str(bundle_dir / "xgb_booster.ubj"))
+    catboost_model = CatBoostRegressor()
+    catboost_model.load_model(str(bundle_dir / "catboost.cbm"), format="cbm")
+
+    predictor = CompiledPredictor(
+        cat_cols=metadata["cat_cols"],
+        num_cols=metadata["num_cols"],
+        category_codes=category_codes,
+        unknown_code=metadata["unknown_code"],
+        medians=arrays["medians"],
+        lasso_ohe_offsets=lasso_ohe_offsets,
+        lasso_mean=arrays["lasso_mean"],
+        lasso_scale=arrays["lasso_scale"],
+        lasso_coef=arrays["lasso_coef"],
+        lasso_intercept=metadata["lasso_intercept"],
+        xgb_booster=booster,
+        catboost_model=catboost_model,
+        weights=arrays["weights"],
+    )
+
+    casts = {"str": str, "float": float, "int": int}
+    defaults = {col: casts[metadata["default_types"][col]](value) for col, value in metadata["defaults"].items()}
+    return ModelBundle(predictor, metadata["columns"], defaults, metadata["options"], manifest)
+
+
+# ==========================================
+# 3. CLI
+# ==========================================
+def _load_pickles():
+    from utils import cast_to_str  # noqa: F401  (needed to unpickle the Pipeline)
+
+    return (
+        joblib.load(PIPELINE_PATH),
+        joblib.load(MODELS_DIR / 'ames_model_columns.pkl'),
+        joblib.load(MODELS_DIR / 'ames_model_defaults.pkl'),
+        joblib.load(MODELS_DIR / 'ames_model_options.pkl'),
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export / verify the native model bundle.")
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("--bundle", default=str(BUNDLE_DIR), help="Bundle directory")
+    parser.add_argument("--data", default=str(DATA_PATH), help="CSV used for the parity check")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        pipeline, columns, defaults, options = _load_pickles()
+        manifest = export_bundle(compile_pipeline(pipeline), columns, defaults, options, args.bundle)
+        total_kb = sum(info["bytes"] for info in manifest["files"].values()) / 1024
+        print(f"✅ Bundle {manifest['bundle_version']} written to {args.bundle} "
+              f"({len(manifest['files'])} files, {total_kb:,.0f} KB)")
+
+    else:
+        # Import the libraries first so both timings measure only artifact loading
+        import catboost  # noqa: F401
+        import sklearn.pipeline  # noqa: F401
+        import xgboost  # noqa: F401
+
+        start = time.perf_counter()
+        pipeline, columns, defaults, options = _load_pickles()
+        pickle_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bundle = load_bundle(args.bundle)
+        bundle_seconds = time.perf_counter() - start
+
+        print(f"Cold start: 4 pickles {pickle_seconds * 1000:.0f} ms | bundle {bundle_seconds * 1000:.0f} ms")
+        assert bundle.columns == list(columns), "Column order differs from ames_model_columns.pkl"
+        assert bundle.options == {c: [str(v) for v in vals] for c, vals in options.items()}, "Options differ"
+
+        report = check_parity(pipeline, bundle.predictor, load_training_features(args.data, columns))
+        print(f"Parity on {report['rows']} rows: max abs diff ${report['max_abs_diff']:.6f}, "
+              f"max rel diff {report['max_rel_diff']:.2e}")
+        if not report['passed']:
+            raise SystemExit(f"❌ Bundle {bundle.version} does not match model.predict.")
+        print(f"✅ Bundle {bundle.version} verified.")
@@ -0,0 +1,377 @@
+# onnx_model.py
+# final_production_pipeline as ONE ONNX graph, served by onnxruntime on CPU.
+#
+# Graph (all in one session.run):
+#   categoricals [N, 46] str    -> LabelEncoder per column (unknown -> unknown_value, i.e. -1)  -> codes
+#   numericals   [N, 33] double -> IsNaN / Where (training medians)                            -> imputed
+#   encoded = [codes, imputed]
+#     lasso    = one-hot(codes) (unseen codes -> all zeros) ++ imputed -> StandardScaler -> Lasso
+#     xgb      = TreeEnsembleRegressor (onnxmltools)
+#     catboost = TreeEnsembleRegressor (CatBoost's own ONNX export)
+#   price = expm1(weighted vote 1:2:2)
+#
+# cast_to_str stays on the host: ONNX has no equivalent of Python's str(60.0) == '60.0', and the
+# Pipeline encodes '60' and '60.0' differently. OnnxPredictor.transform() does that cast exactly
+# like the compiled predictor. The 'None' SimpleImputer after cast_to_str never fires (NaN is
+# already the string 'nan', a category of its own), so the graph has no node for it.
+#
+# Requires: pip install onnx onnxruntime onnxmltools
+#
+# Usage:
+#   python onnx_model.py export   # build + parity check + save models/ames_pipeline.onnx
+#   python onnx_model.py verify   # parity (prices, members, category codes) + single-row latency
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import fork_hooks
+from compiled_model import DATA_PATH, MODELS_DIR, PIPELINE_PATH, compile_pipeline, load_training_features
+
+ONNX_PATH = MODELS_DIR / "ames_pipeline.onnx"
+OPSET = 15
+ML_OPSET = 3
+IR_VERSION = 8  # Readable by every onnxruntime release that supports opset 15
+OUTPUTS = ("price", "encoded", "lasso", "xgb", "catboost")
+
+
+# ==========================================
+# 1. THE EXPORTER
+# ==========================================
+def _embed(nodes, initializers, model, input_name, output_name, prefix):
+    """Copy a single-input, single-output tree model's nodes into our graph, rewired to our tensors."""
+    import onnx.compose
+
+    sub = onnx.compose.add_prefix(model, prefix)
+    source_in, source_out = sub.graph.input[0].name, sub.graph.output[0].name
+    for node in sub.graph.node:
+        renamed_in = [input_name if name == source_in else name for name in node.input]
+        renamed_out = [output_name if name == source_out else name for name in node.output]
+        del node.input[:], node.output[:]
+        node.input.extend(renamed_in)
+        node.output.extend(renamed_out)
+        nodes.append(node)
+    initializers.extend(sub.graph.initializer)
+
+
+def _tree_models(pipeline, n_features, workdir):
+    """The two tree members as standalone ONNX models taking float[N, n_features]."""
+    import onnx
+    from onnxmltools import convert_xgboost
+    from onnxmltools.convert.common.data_types import FloatTensorType
+
+    members = pipeline.named_steps['model'].regressor_.named_estimators_
+    xgb_model = convert_xgboost(
+        members['xgb'], initial_types=[('input', FloatTensorType([None, n_features]))], target_opset=OPSET
+    )
+    catboost_path = os.path.join(workdir, "catboost.onnx")
+    members['catboost'].save_model(catboost_path, format="onnx")
+    return xgb_model, onnx.load(catboost_path)
+
+
+def build_graph(pipeline):
+    """final_production_pipeline -> onnx.ModelProto (see the header for the graph layout)."""
+    import tempfile
+
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    compiled = compile_pipeline(pipeline)
+    n_cats, n_nums = len(compiled.cat_cols), len(compiled.num_cols)
+    nodes, initializers = [], []
+
+    def const(name, array):
+        initializers.append(numpy_helper.from_array(np.asarray(array), name))
+        return name
+
+    # A. Categoricals: one LabelEncoder per column, codes exactly as OrdinalEncoder assigns them
+    split_outputs = [f"cat_{j}" for j in range(n_cats)]
+    nodes.append(helper.make_node("Split", ["categoricals"], split_outputs, axis=1))
+    for j, lookup in enumerate(compiled.category_codes):
+        nodes.append(helper.make_node(
+            "LabelEncoder", [f"cat_{j}"], [f"code_{j}"], domain="ai.onnx.ml",
+            keys_strings=list(lookup), values_int64s=[int(code) for code in lookup.values()],
+            default_int64=int(compiled.unknown_code),
+        ))
+    nodes.append(helper.make_node("Concat", [f"code_{j}" for j in range(n_cats)], ["codes"], axis=1))
+
+    # B. Numericals: median imputation
+    nodes.append(helper.make_node("IsNaN", ["numericals"], ["num_missing"]))
+    nodes.append(helper.make_node("Where", ["num_missing", const("medians", compiled.medians), "numericals"], ["imputed"]))
+
+    nodes.append(helper.make_node("Cast", ["codes"], ["codes_f64"], to=TensorProto.DOUBLE))
+    nodes.append(helper.make_node("Concat", ["codes_f64", "imputed"], ["encoded"], axis=1))
+    nodes.append(helper.make_node("Cast", ["encoded"], ["encoded_f32"], to=TensorProto.FLOAT))
+
+    # C. Lasso: one-hot = Gather each one-hot slot's source column, compare with the slot's code.
+    #    An unseen code (-1) matches no slot -> all zeros, like OneHotEncoder(handle_unknown='ignore').
+    slot_columns, slot_codes = [], []
+    for j, offsets in enumerate(compiled.lasso_ohe_offsets):
+        for code, _ in sorted(offsets.items(), key=lambda item: item[1]):
+            slot_columns.append(j)
+            slot_codes.append(int(code))
+    nodes.append(helper.make_node("Gather", ["codes", const("ohe_columns", np.array(slot_columns, dtype=np.int64))],
+                                  ["ohe_source"], axis=1))
+    nodes.append(helper.make_node("Equal", ["ohe_source", const("ohe_codes", np.array(slot_codes, dtype=np.int64))],
+                                  ["ohe_hits"]))
+    nodes.append(helper.make_node("Cast", ["ohe_hits"], ["onehot"], to=TensorProto.DOUBLE))
+    nodes.append(helper.make_node("Concat", ["onehot", "imputed"], ["lasso_in"], axis=1))
+    nodes.append(helper.make_node("Sub", ["lasso_in", const("lasso_mean", compiled.lasso_mean)], ["lasso_centered"]))
+    nodes.append(helper.make_node("Div", ["lasso_centered", const("lasso_scale", compiled.lasso_scale)], ["lasso_scaled"]))
+    nodes.append(helper.make_node("MatMul", ["lasso_scaled", const("lasso_coef", compiled.lasso_coef)], ["lasso_dot"]))
+    nodes.append(helper.make_node("Add", ["lasso_dot", const("lasso_intercept", np.array(compiled.lasso_intercept))],
+                                  ["lasso"]))
+
+    # D. Tree members on float32 features (both libraries predict in float32 internally)
+    with tempfile.TemporaryDirectory() as workdir:
+        xgb_model, catboost_model = _tree_models(pipeline, n_cats + n_nums, workdir)
+    flat = const("flat_shape", np.array([-1], dtype=np.int64))
+    for name, model in (("xgb", xgb_model), ("catboost", catboost_model)):
+        _embed(nodes, initializers, model, "encoded_f32", f"{name}_raw", prefix=f"{name}_")
+        nodes.append(helper.make_node("Reshape", [f"{name}_raw", flat], [f"{name}_f32"]))
+        nodes.append(helper.make_node("Cast", [f"{name}_f32"], [name], to=TensorProto.DOUBLE))
+
+    # E. Weighted vote in log space, then expm1
+    weights = compiled.weights / compiled.weights.sum()
+    axes = const("member_axis", np.array([1], dtype=np.int64))
+    for name in ("lasso", "xgb", "catboost"):
+        nodes.append(helper.make_node("Unsqueeze", [name, axes], [f"{name}_col"]))
+    nodes.append(helper.make_node("Concat", ["lasso_col", "xgb_col", "catboost_col"], ["member_preds"], axis=1))
+    nodes.append(helper.make_node("MatMul", ["member_preds", const("vote_weights", weights)], ["log_price"]))
+    nodes.append(helper.make_node("Exp", ["log_price"], ["exp_price"]))
+    nodes.append(helper.make_node("Sub", ["exp_price", const("one", np.array(1.0))], ["price"]))
+
+    graph = helper.make_graph(
+        nodes, "ames_final_production_pipeline",
+        inputs=[
+            helper.make_tensor_value_info("categoricals", TensorProto.STRING, ["N", n_cats]),
+            helper.make_tensor_value_info("numericals", TensorProto.DOUBLE, ["N", n_nums]),
+        ],
+        outputs=[
+            helper.make_tensor_value_info("price", TensorProto.DOUBLE, ["N"]),
+            helper.make_tensor_value_info("encoded", TensorProto.DOUBLE, ["N", n_cats + n_nums]),
+            helper.make_tensor_value_info("lasso", TensorProto.DOUBLE, ["N"]),
+            helper.make_tensor_value_info("xgb", TensorProto.DOUBLE, ["N"]),
+            helper.make_tensor_value_info("catboost", TensorProto.DOUBLE, ["N"]),
+        ],
+        initializer=initializers,
+    )
+    model = helper.make_model(
+        graph, producer_name="ames-housing-ml",
+        opset_imports=[helper.make_opsetid("", OPSET), helper.make_opsetid("ai.onnx.ml", ML_OPSET)],
+    )
+    model.ir_version = IR_VERSION
+    helper.set_model_props(model, {
+        "cat_cols": json.dumps(compiled.cat_cols),
+        "num_cols": json.dumps(compiled.num_cols),
+        "unknown_code": json.dumps(compiled.unknown_code),
+    })
+    onnx.checker.check_model(model)
+    return model
+
+
+# ==========================================
+# 2. THE RUNTIME
+# ==========================================
+class OnnxPredictor:
+    def __init__(self, path=ONNX_PATH, threads=1):
+        """
+        path:    The exported .onnx file.
+        threads: onnxruntime intra-op threads (single rows gain nothing from more; 0 = all cores).
+        """
+        self.path = str(path)
+        self.threads = threads
+        self._start_session()
+
+        # Sessions with a thread pool do not survive fork(): pre-forked workers (serve.py) need their own
+        fork_hooks.register(self, "_start_session")
+
+    def _start_session(self):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.cat_cols = json.loads(meta["cat_cols"])
+        self.num_cols = json.loads(meta["num_cols"])
+        self.columns = self.cat_cols + self.num_cols
+
+    def transform(self, X):
+        """DataFrame (aligned to the training columns) -> the graph's input feeds."""
+        categoricals = np.empty((len(X), len(self.cat_cols)), dtype=object)
+        for j, col in enumerate(self.cat_cols):
+            # str(value) matches pandas .astype(str) (= cast_to_str): 60 -> '60', 60.0 -> '60.0', NaN -> 'nan'
+            categoricals[:, j] = [str(v) for v in X[col].tolist()]
+        numericals = X[self.num_cols].to_numpy(dtype=np.float64)
+        return {"categoricals": categoricals, "numericals": numericals}
+
+    def run(self, feeds, outputs=("price",)):
+        return self.session.run(list(outputs), feeds)
+
+    def predict(self, X):
+        return self.run(self.transform(X))[0]
+
+    def __getstate__(self):
+        # Sessions are not picklable; re-open the file on the other side
+        return {"path": self.path, "threads": self.threads}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+# ==========================================
+# 3. PARITY CHECK
+# ==========================================
+def category_probes(pipeline, X):
+    """
+    One row per (categorical column, probe value), every other column from X's first row.
+    Probes: every training category, values the vocabulary has never seen, NaN / None / '',
+    and the int/float spellings of numeric-looking categories (MSSubClass 60 vs 60.0).
+    """
+    preprocessor = pipeline.named_steps['preprocessor']
+    cat_cols = list(preprocessor.transformers_[0][2])
+    ordinal = preprocessor.named_transformers_['cat'].named_steps['ordinal']
+    base = X.iloc[0].to_dict()
+
+    records, probes = [], []
+    for col, categories in zip(cat_cols, ordinal.categories_):
+        values = list(categories) + ["__unseen__", np.nan, None, ""]
+        for category in categories:
+            if str(category).lstrip('-').isdigit():
+                values += [int(category), float(category)]
+        for value in values:
+            records.append({**base, col: value})
+            probes.append((col, value))
+    return pd.DataFrame(records, columns=X.columns, dtype=object), probes
+
+
+def check_parity(pipeline, predictor, X, rtol=1e-4, max_examples=5):
+    """
+    Compare the ONNX graph with final_production_pipeline on X and on category probes:
+      - prices (relative), and each member in log space
+      - category codes, column by column: any value the two encode differently is flagged
+        (an unknown mapped to something other than unknown_value, '60.0' treated like '60', ...)
+    Tree members run in float32 in both, but sum their trees in a different order: hence rtol.
+    """
+    preprocessor = pipeline.named_steps['preprocessor']
+    members = pipeline.named_steps['model'].regressor_.named_estimators_
+    n_cats = len(predictor.cat_cols)
+    probe_df, probes = category_probes(pipeline, X)
+
+    report = {"rows": len(X), "probe_rows": len(probe_df), "members": {}, "category_mismatches": {}}
+    max_abs, max_rel = 0.0, 0.0
+    for frame, labels in ((X, None), (probe_df, probes)):
+        price, encoded, *member_preds = predictor.run(predictor.transform(frame), OUTPUTS)
+        expected_encoded = preprocessor.transform(frame)
+        expected_price = pipeline.predict(frame)
+
+        abs_diff = np.abs(price - expected_price)
+        max_abs = max(max_abs, float(abs_diff.max()))
+        max_rel = max(max_rel, float((abs_diff / np.maximum(np.abs(expected_price), 1.0)).max()))
+        for name, actual in zip(("lasso", "xgb", "catboost"), member_preds):
+            diff = float(np.abs(actual - members[name].predict(expected_encoded)).max())
+            report["members"][name] = max(report["members"].get(name, 0.0), diff)
+
+        # Category codes must match exactly: a wrong code is a different house, not rounding
+        bad_rows, bad_cols = np.nonzero(encoded[:, :n_cats] != expected_encoded[:, :n_cats])
+        for i, j in zip(bad_rows, bad_cols):
+            col = predictor.cat_cols[j]
+            value = labels[i][1] if labels else frame[col].iloc[i]
+            examples = report["category_mismatches"].setdefault(col, [])
+            if len(examples) < max_examples:
+                examples.append({"value": repr(value), "pipeline": float(expected_encoded[i, j]),
+                                 "onnx": float(encoded[i, j])})
+
+        numeric_diff = np.abs(encoded[:, n_cats:] - expected_encoded[:, n_cats:])
+        report["max_numeric_diff"] = max(report.get("max_numeric_diff", 0.0), float(numeric_diff.max()))
+
+    report["max_abs_diff"] = max_abs
+    report["max_rel_diff"] = max_rel
+    report["passed"] = bool(max_rel <= rtol and not report["category_mismatches"]
+                            and report["max_numeric_diff"] == 0.0)
+    return report
+
+
+def print_parity(report):
+    print(f"Parity on {report['rows']:,} rows + {report['probe_rows']:,} category probes: "
+          f"max abs diff ${report['max_abs_diff']:.4f}, max rel diff {report['max_rel_diff']:.2e}")
+    print("   Members (log space): " + ", ".join(f"{name} {diff:.2e}" for name, diff in report["members"].items()))
+    if report["category_mismatches"]:
+        print(f"   ❌ Category handling differs in {len(report['category_mismatches'])} column(s):")
+        for col, examples in report["category_mismatches"].items():
+            for example in examples:
+                print(f"      {col}: {example['value']} -> Pipeline {example['pipeline']:.0f}, ONNX {example['onnx']:.0f}")
+    else:
+        print("   ✅ Category codes identical (including unseen values -> unknown_value)")
+
+
+def single_row_p50_ms(predict, X, n=300):
+    times = []
+    for i in range(n):
+        row = X.iloc[[i % len(X)]]
+        start = time.perf_counter()
+        predict(row)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1000)
+
+
+# ==========================================
+# 4. CLI
+# ==========================================
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export / verify the ONNX version of the production Pipeline.")
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("--output", default=str(ONNX_PATH), help="The .onnx file")
+    parser.add_argument("--data", default=str(DATA_PATH), help="CSV used for the parity check")
+    args = parser.parse_args()
+
+    from utils import cast_to_str  # noqa: F401  (needed to unpickle the Pipeline)
+
+    pipeline = joblib.load(PIPELINE_PATH)
+    columns = joblib.load(MODELS_DIR / 'ames_model_columns.pkl')
+    X = load_training_features(args.data, columns)
+
+    if args.command == "export":
+        import onnx
+        import tempfile
+
+        model = build_graph(pipeline)
+        # Next to the output: os.replace() is then an atomic rename on the same filesystem (a hot
+        # reloader never sees a half-written graph, and no EXDEV when /tmp is a separate mount)
+        output = Path(args.output)
+        with tempfile.NamedTemporaryFile(dir=output.parent, prefix=output.name + ".", suffix=".tmp",
+                                         delete=False) as tmp:
+            onnx.save(model, tmp.name)
+        try:
+            report = check_parity(pipeline, OnnxPredictor(tmp.name), X)
+            print_parity(report)
+            if not report["passed"]:
+                raise SystemExit("❌ ONNX graph does not match model.predict. Not saving.")
+            os.chmod(tmp.name, 0o644)  # NamedTemporaryFile is owner-only; the served file is not
+            os.replace(tmp.name, output)
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+        print(f"✅ ONNX graph saved to: {args.output} ({os.path.getsize(args.output) / 1024:,.0f} KB)")
+
+    else:
+        predictor = OnnxPredictor(args.output)
+        report = check_parity(pipeline, predictor, X)
+        print_parity(report)
+
+        compiled = compile_pipeline(pipeline)
+        print("\nSingle-row p50:")
+        for name, predict in (("Pipeline", pipeline.predict), ("compiled", compiled.predict),
+                              ("onnxruntime", predictor.predict)):
+            print(f"   {name:<12} {single_row_p50_ms(predict, X):6.2f} ms")
+        if not report["passed"]:
+            raise SystemExit("❌ Parity check failed.")
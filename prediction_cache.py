@@ -0,0 +1,112 @@
+# prediction_cache.py
+# Bounded LRU + TTL cache for model predictions.
+#
+# Keys are the canonicalized, defaults-filled feature row (after reindex + fillna),
+# so two requests that the model cannot tell apart share one entry:
+#   - categorical values are keyed by str(value), exactly what cast_to_str feeds the encoder
+#   - numerical values are keyed by float(value), exactly what the median imputer feeds the model
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+def _canonical_number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return value  # Let the model raise its own error for junk input
+    return 'nan' if math.isnan(number) else number
+
+
+def make_row_key(values, categorical_mask):
+    """values: one aligned row (column order); categorical_mask: True where the column is categorical."""
+    return tuple(
+        str(v) if is_cat else _canonical_number(v)
+        for v, is_cat in zip(values, categorical_mask)
+    )
+
+
+class PredictionCache:
+    def __init__(self, max_size=10000, ttl_seconds=None, clock=time.monotonic):
+        """
+        max_size:    Maximum number of cached rows. 0 disables the cache.
+        ttl_seconds: Entries older than this are treated as misses. None = never expire.
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds or None
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._artifact_version = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flushes = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, key):
+        """Return the cached value, or None on a miss."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and self._clock() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        expires_at = self._clock() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.flushes += 1
+
+    def sync_artifact_version(self, version):
+        """Flush everything the first time we see a different model artifact version."""
+        if version == self._artifact_version:
+            return
+        with self._lock:
+            if self._artifact_version is not None:
+                self._entries.clear()
+                self.flushes += 1
+            self._artifact_version = version
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "flushes": self.flushes,
+            }
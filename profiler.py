@@ -0,0 +1,189 @@
+# profiler.py
+# On-demand statistical stack sampler for the live API and dashboard processes.
+#
+# Nothing runs while idle: a sampler thread only exists for the N seconds a profile is
+# requested. While active it snapshots every thread's Python stack (sys._current_frames)
+# every few milliseconds and writes a collapsed-stack file, one line per unique stack:
+#
+#   thread:MainThread;app_4.0.py:predict;sklearn/pipeline.py:predict;xgboost/core.py:inplace_predict 42
+#
+# which flamegraph.pl / speedscope / inferno render directly. Time spent inside native
+# code (XGBoost, CatBoost, NumPy kernels) is charged to the Python frame that called it.
+#
+# Triggers:
+#   - app_4.0.py:    POST /admin/profile?seconds=10   (header X-Admin-Token: $AMES_ADMIN_TOKEN)
+#   - any process:   kill -USR2 <pid>                 (after install_signal_handler())
+import os
+import signal
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_OUTPUT_DIR = Path(__file__).parent / "profiles"
+
+# Each sample walks every thread's stack while holding the GIL: sampling faster than this would
+# slow down every request in the process being profiled
+MIN_INTERVAL_MS = 1.0
+
+# Library -> path fragment used to attribute samples
+LIBRARIES = {
+    "pandas": f"{os.sep}pandas{os.sep}",
+    "sklearn": f"{os.sep}sklearn{os.sep}",
+    "xgboost": f"{os.sep}xgboost{os.sep}",
+    "catboost": f"{os.sep}catboost{os.sep}",
+    "matplotlib": f"{os.sep}matplotlib{os.sep}",
+    "numpy": f"{os.sep}numpy{os.sep}",
+    "pydantic": f"{os.sep}pydantic{os.sep}",
+    "flask": f"{os.sep}flask{os.sep}",
+    "shiny": f"{os.sep}shiny{os.sep}",
+}
+
+# Leaf frames that mean "this thread is parked", not "this thread is slow"
+_STDLIB = sysconfig.get_paths()["stdlib"]
+_IDLE_LEAVES = {"wait", "select", "poll", "accept", "get", "sleep", "_wait_for_tstate_lock", "readinto", "recv_into"}
+
+_active_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    marker = f"{os.sep}site-packages{os.sep}"
+    if marker in filename:
+        filename = filename.split(marker, 1)[1]
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{code.co_name}"
+
+
+def _library_of(stack_codes):
+    # Attribute the sample to the library closest to the leaf
+    for code in reversed(stack_codes):
+        for library, fragment in LIBRARIES.items():
+            if fragment in code.co_filename:
+                return library
+    return "other"
+
+
+def _check_interval(interval_ms):
+    if not interval_ms >= MIN_INTERVAL_MS:  # also rejects NaN
+        raise ValueError(f"interval_ms must be at least {MIN_INTERVAL_MS:g} (got {interval_ms})")
+
+
+def _is_idle(leaf_code):
+    return leaf_code.co_name in _IDLE_LEAVES and leaf_code.co_filename.startswith(_STDLIB)
+
+
+# ==========================================
+# 1. THE SAMPLER
+# ==========================================
+class SamplingProfiler:
+    def __init__(self, interval_ms=5.0, include_idle=False):
+        _check_interval(interval_ms)
+        self.interval = interval_ms / 1000.0
+        self.include_idle = include_idle
+        self.stacks = Counter()
+        self.libraries = Counter()
+        self.samples = 0
+
+    def _sample(self, own_ident, thread_names):
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            if not codes or (not self.include_idle and _is_idle(codes[0])):
+                continue
+            codes.reverse()  # root first, leaf last
+            root = f"thread:{thread_names.get(ident, ident)}"
+            self.stacks[";".join([root] + [_frame_label(code) for code in codes])] += 1
+            self.libraries[_library_of(codes)] += 1
+            self.samples += 1
+
+    def run(self, seconds):
+        """Sample every thread but this one for `seconds`. Blocks the calling thread."""
+        own_ident = threading.get_ident()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self._sample(own_ident, thread_names)
+            time.sleep(self.interval)
+        return self
+
+    def write_collapsed(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def summary(self, top=10):
+        return {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000.0,
+            "libraries_pct": {
+                library: round(100.0 * count / self.samples, 1)
+                for library, count in self.libraries.most_common()
+            } if self.samples else {},
+            "top_stacks": [
+                {"leaf": stack.rsplit(";", 1)[-1], "samples": count}
+                for stack, count in self.stacks.most_common(top)
+            ],
+        }
+
+
+# ==========================================
+# 2. ONE-SHOT PROFILES
+# ==========================================
+def profile_for(seconds, output_dir=DEFAULT_OUTPUT_DIR, interval_ms=5.0, tag="profile"):
+    """Profile this process for `seconds`; write a collapsed-stack file. One profile at a time."""
+    if not _active_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running in this process")
+    try:
+        profiler = SamplingProfiler(interval_ms=interval_ms).run(seconds)
+    finally:
+        _active_lock.release()
+
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = profiler.write_collapsed(Path(output_dir) / f"{tag}-{os.getpid()}-{stamp}.collapsed")
+    return path, profiler.summary()
+
+
+def profile_in_background(seconds, output_dir=DEFAULT_OUTPUT_DIR, interval_ms=5.0, tag="profile"):
+    def target():
+        try:
+            path, summary = profile_for(seconds, output_dir, interval_ms, tag)
+            print(f"🔥 Profile written to {path} ({summary['samples']} samples): {summary['libraries_pct']}")
+        except ProfilerBusy as e:
+            print(f"⚠️ {e}")
+
+    thread = threading.Thread(target=target, name="sampling-profiler", daemon=True)
+    thread.start()
+    return thread
+
+
+def install_signal_handler(signum=getattr(signal, "SIGUSR2", None), seconds=10.0,
+                           output_dir=DEFAULT_OUTPUT_DIR, tag="profile", interval_ms=5.0):
+    """`kill -USR2 <pid>` profiles this process for `seconds` in a background thread."""
+    _check_interval(interval_ms)  # Fail at startup, not silently in the sampler thread
+
+    def handler(*_):
+        profile_in_background(seconds, output_dir, interval_ms, tag=tag)
+
+    if signum is None:
+        return False  # No SIGUSR2 on Windows: endpoint-only
+    try:
+        signal.signal(signum, handler)
+    except ValueError:
+        return False  # Not the main thread (e.g. imported by a worker thread): endpoint-only
+    return True
@@ -0,0 +1,77 @@
+# row_template.py
+# Single-row request assembly without DataFrame construct -> reindex -> fillna.
+#
+# The model always sees the same 79 columns, in the same order, with ames_model_defaults.pkl
+# filling everything the client did not send. So the "filled" row is known in advance:
+#
+#   template  = [defaults[col] for col in expected_columns]     (built once, at startup)
+#   positions = {col: index in expected_columns}                (built once, at startup)
+#
+# and each request only copies the template and patches the fields it actually supplied.
+# Fields the model does not use (extra='allow' lets anything through) are counted and dropped.
+from collections import Counter
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+class RowTemplate:
+    def __init__(self, columns, defaults, max_tracked_fields=100, on_dropped=None):
+        """
+        columns:            ames_model_columns.pkl (model column order).
+        defaults:           ames_model_defaults.pkl; typed values (str for categoricals, float for numerics).
+        max_tracked_fields: Distinct unknown field names to count by name (the rest only in the total).
+        on_dropped:         Called with the number of fields dropped from a row, as they are dropped
+                            (e.g. a process-wide counter that outlives this template's version).
+        """
+        self.columns = list(columns)
+        self.positions = {col: i for i, col in enumerate(self.columns)}
+        # Columns without a default stay NaN, exactly like fillna() leaves them
+        self.template = tuple(defaults.get(col, np.nan) for col in self.columns)
+        self.max_tracked_fields = max_tracked_fields
+        self.on_dropped = on_dropped
+
+        self._lock = threading.Lock()
+        self._rows = 0
+        self._dropped_total = 0
+        self._dropped = Counter()
+
+    def assemble(self, fields):
+        """Dict of request fields -> one aligned, defaults-filled row (list in column order)."""
+        row = list(self.template)
+        positions = self.positions
+        unknown = None
+        for name, value in fields.items():
+            i = positions.get(name)
+            if i is None:
+                if unknown is None:
+                    unknown = []
+                unknown.append(name)
+            elif value is not None and value == value:  # None / NaN -> keep the default (= fillna)
+                row[i] = value
+        self._count(unknown)
+        return row
+
+    def _count(self, unknown):
+        with self._lock:
+            self._rows += 1
+            if unknown:
+                self._dropped_total += len(unknown)
+                for name in unknown:
+                    if name in self._dropped or len(self._dropped) < self.max_tracked_fields:
+                        self._dropped[name] += 1
+        if unknown and self.on_dropped is not None:
+            self.on_dropped(len(unknown))
+
+    def frame(self, rows):
+        """Aligned rows -> the DataFrame the predictor expects (dtype=object, like the batch path)."""
+        return pd.DataFrame(rows, columns=self.columns, dtype=object)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rows": self._rows,
+                "dropped_fields_total": self._dropped_total,
+                "dropped_fields": dict(self._dropped.most_common(20)),
+            }
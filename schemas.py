@@ -0,0 +1,45 @@
+# schemas.py
+# Request schema shared by app_4.0.py (per-record Pydantic checks) and bulk_validation.py
+# (the same guardrails applied column-by-column to whole batch files).
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class HouseData(BaseModel):
+    # --- 1. REQUIRED FIELDS ---
+    GrLivArea: float = Field(..., gt=100, lt=10000, description="Above ground living area in sq ft")
+    YearBuilt: int = Field(..., gt=1800, lt=2030)
+    OverallQual: int = Field(..., ge=1, le=10, description="Rates the overall material and finish (1-10)")
+    Neighborhood: str 
+
+    # --- 2. RENOVATION FIELDS (Optional) ---
+    KitchenQual: Optional[str] = Field(None, description="Ex, Gd, TA, Fa, Po")
+    FullBath: Optional[int] = Field(None, ge=0, le=5)
+    HalfBath: Optional[int] = Field(None, ge=0, le=4)
+    
+    GarageCars: Optional[int] = Field(None, ge=0, le=5)
+    GarageArea: Optional[float] = Field(None, ge=0)
+    GarageType: Optional[str] = None
+
+    TotalBsmtSF: Optional[float] = Field(None, ge=0)
+    BsmtFinSF1: Optional[float] = Field(None, ge=0)
+    BsmtQual: Optional[str] = None
+    
+    WoodDeckSF: Optional[float] = Field(None, ge=0)
+    OpenPorchSF: Optional[float] = Field(None, ge=0)
+    PoolArea: Optional[float] = Field(None, ge=0)
+    Fireplaces: Optional[int] = Field(None, ge=0)
+    CentralAir: Optional[str] = None
+
+    # --- 3. STRUCTURAL FIELDS (Optional) ---
+    LotArea: Optional[float] = Field(None, gt=0)
+    LotFrontage: Optional[float] = Field(None, gt=0)
+    BldgType: Optional[str] = None
+    HouseStyle: Optional[str] = None
+    OverallCond: Optional[int] = Field(None, ge=1, le=10)
+    YearRemodAdd: Optional[int] = Field(None, ge=1900)
+
+    # --- MAGIC SWITCH (UPDATED FOR PYDANTIC V2) ---
+    # This replaces the old "class Config" to fix the warning
+    model_config = ConfigDict(extra='allow')
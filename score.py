@@ -0,0 +1,339 @@
+# score.py
+# Out-of-core bulk scoring for assessor rolls far larger than the Ames CSV.
+#
+# 1. The input (CSV or Parquet) is read in fixed-size chunks, never as a whole.
+# 2. Each chunk gets the same treatment as POST /predict_batch: columnar HouseData validation
+#    (bulk_validation.validate_frame), then reindex to the model columns and fillna(defaults).
+# 3. Chunks fan out to a process pool. The model is loaded ONCE in the parent and shared
+#    copy-on-write with the forked workers (as in serve.py); each worker uses one core.
+# 4. Results are written incrementally, in input order, one output row per input row:
+#      row, [id column], predicted_price, status, error (the validation details as JSON)
+# 5. After every written chunk a checkpoint records how far we got; --resume continues from it.
+#
+# At most --workers x 2 chunks are in flight, so peak memory depends on --chunk-size, not on
+# the input size. CSV cells are read as text, exactly as if each row were posted as JSON
+# strings: MSSubClass 60 stays '60' in every chunk (a chunk-local float column would make it '60.0').
+#
+# Usage:
+#   python score.py rolls.csv priced.csv --chunk-size 50000 --workers 4
+#   python score.py rolls.parquet priced.parquet --resume       (Parquet needs pyarrow)
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import resource
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from bulk_validation import validate_frame
+from compiled_model import MODELS_DIR, PIPELINE_PATH, compile_pipeline
+from member_pool import limit_blas_threads
+from category_codes import use_category_codes
+from sparse_lasso import use_sparse_lasso
+
+DEFAULT_CHUNK_SIZE = 20000
+CHECKPOINT_VERSION = 1
+
+_MODEL = {}  # predictor, columns, defaults: filled in the parent before the workers fork
+
+
+# ==========================================
+# 1. THE MODEL (PARENT) AND THE WORKERS
+# ==========================================
+def load_model(backend="compiled"):
+    from utils import cast_to_str  # noqa: F401  (needed to unpickle the Pipeline)
+
+    pipeline = joblib.load(PIPELINE_PATH)
+    predictor = pipeline
+    if backend == "pipeline":
+        # Same prices; the Lasso member's one-hot matrix stays sparse (~1/3 of the dense bytes per row)
+        # and the category codes skip the astype(str) round trip
+        use_sparse_lasso(pipeline)
+        use_category_codes(pipeline)
+    elif backend == "compiled":
+        # Same prices as the Pipeline (see compiled_model.py), without per-chunk sklearn dispatch
+        predictor = compile_pipeline(pipeline)
+        predictor.set_member_threads(xgb=1, catboost=1)  # Parallelism comes from the processes
+    _MODEL.update(
+        predictor=predictor,
+        columns=joblib.load(MODELS_DIR / 'ames_model_columns.pkl'),
+        defaults=joblib.load(MODELS_DIR / 'ames_model_defaults.pkl'),
+    )
+
+    # Warm-up on the all-defaults house builds lazy XGBoost/CatBoost state before fork
+    warm = pd.DataFrame([_MODEL["defaults"]]).reindex(columns=_MODEL["columns"])
+    predictor.predict(warm)
+
+
+def _init_worker():
+    global _blas_limits
+    _blas_limits = limit_blas_threads(1)  # Held for the life of the worker
+
+
+def _predict(aligned, status, errors, positions):
+    """One predict call per chunk; if the chunk fails, retry row by row so one bad row fails alone."""
+    predictor = _MODEL["predictor"]
+    try:
+        return np.asarray(predictor.predict(aligned), dtype=np.float64)
+    except Exception:
+        prices = np.full(len(aligned), np.nan)
+        for k in range(len(aligned)):
+            try:
+                prices[k] = predictor.predict(aligned.iloc[[k]])[0]
+            except Exception as e:
+                status[positions[k]] = "error"
+                errors[positions[k]] = json.dumps([{"type": "prediction_error", "msg": str(e)}])
+        return prices
+
+
+def score_chunk(start_row, chunk, id_column=None):
+    """One input chunk -> one output frame (same validation + alignment as /predict_batch)."""
+    chunk = chunk.reset_index(drop=True)
+    n = len(chunk)
+    validation = validate_frame(chunk)
+
+    prices = np.full(n, np.nan)
+    status = np.where(validation.valid_mask, "success", "error").astype(object)
+    errors = np.full(n, None, dtype=object)
+    for i, details in validation.errors.items():
+        errors[i] = json.dumps(details, default=str)
+
+    if validation.n_valid:
+        aligned = validation.frame.reindex(columns=_MODEL["columns"]).fillna(_MODEL["defaults"])
+        positions = aligned.index.to_numpy()
+        prices[positions] = _predict(aligned, status, errors, positions)
+
+    result = {"row": np.arange(start_row, start_row + n)}
+    if id_column and id_column in chunk.columns:
+        result[id_column] = chunk[id_column].to_numpy()
+    # Typed as string even when a chunk has no errors, so Parquet parts share one schema
+    result.update(predicted_price=prices, status=status, error=pd.array(errors, dtype="string"))
+    return pd.DataFrame(result)
+
+
+# ==========================================
+# 2. CHUNKED INPUT / INCREMENTAL OUTPUT
+# ==========================================
+def read_chunks(path, chunk_size, skip_rows=0):
+    """Yield (first row number, DataFrame) per chunk, starting at skip_rows (a chunk boundary)."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        start_row = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            if start_row >= skip_rows:
+                # Nullable ints stay Python ints next to None (MSSubClass 60, not 60.0)
+                yield start_row, batch.to_pandas(integer_object_nulls=True)
+            start_row += batch.num_rows
+    else:
+        reader = pd.read_csv(path, chunksize=chunk_size, dtype=str, skiprows=range(1, skip_rows + 1))
+        start_row = skip_rows
+        for chunk in reader:
+            yield start_row, chunk
+            start_row += len(chunk)
+
+
+def count_rows(path):
+    """Total rows if cheap to know (Parquet metadata), else None."""
+    if Path(path).suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).metadata.num_rows
+    return None
+
+
+class CsvOutput:
+    def __init__(self, path, offset=0):
+        """offset: bytes already written by a previous run (anything after it is discarded)."""
+        self.path = Path(path)
+        mode = "r+b" if offset and self.path.exists() else "wb"
+        self._file = open(self.path, mode)
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+    def write(self, frame):
+        header = self._file.tell() == 0
+        self._file.write(frame.to_csv(index=False, header=header).encode())
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def position(self):
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetOutput:
+    """A directory of part files, one per chunk (pd.read_parquet(dir) reads them back in order)."""
+
+    def __init__(self, path, parts_done=0):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        for part in self.path.glob("part-*.parquet"):
+            if int(part.stem.split("-")[1]) >= parts_done:
+                part.unlink()  # Written after the last checkpoint
+        self.parts = parts_done
+
+    def write(self, frame):
+        tmp = self.path / f".part-{self.parts:06d}.tmp"
+        frame.to_parquet(tmp, index=False)
+        os.replace(tmp, self.path / f"part-{self.parts:06d}.parquet")
+        self.parts += 1
+
+    def position(self):
+        return self.parts
+
+    def close(self):
+        pass
+
+
+# ==========================================
+# 3. CHECKPOINTS
+# ==========================================
+def input_fingerprint(path, chunk_size):
+    stat = Path(path).stat()
+    return {"input": str(Path(path).resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "chunk_size": chunk_size, "version": CHECKPOINT_VERSION}
+
+
+def load_checkpoint(checkpoint_path, fingerprint):
+    """The saved progress, or None if there is none or it belongs to another input / chunk size."""
+    try:
+        checkpoint = json.loads(Path(checkpoint_path).read_text())
+    except (OSError, ValueError):
+        return None
+    if checkpoint.get("fingerprint") != fingerprint:
+        print("⚠️  Checkpoint is for a different input or chunk size: starting over.")
+        return None
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path, fingerprint, chunks_done, rows_done, output_position, counts):
+    tmp = Path(f"{checkpoint_path}.tmp")
+    tmp.write_text(json.dumps({
+        "fingerprint": fingerprint,
+        "chunks_done": chunks_done,
+        "rows_done": rows_done,
+        "output_position": output_position,
+        "counts": counts,
+    }))
+    os.replace(tmp, checkpoint_path)  # Atomic: a crash leaves the old or the new checkpoint
+
+
+# ==========================================
+# 4. THE DRIVER
+# ==========================================
+def peak_rss_mb():
+    """(this process, largest finished worker) peak resident memory, in MB (Linux reports KB)."""
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024)
+
+
+def score_file(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, resume=False,
+               id_column="PID", backend="compiled"):
+    workers = os.cpu_count() if workers is None else workers
+    checkpoint_path = f"{output_path}.checkpoint.json"
+    fingerprint = input_fingerprint(input_path, chunk_size)
+    checkpoint = load_checkpoint(checkpoint_path, fingerprint) if resume else None
+
+    chunks_done = checkpoint["chunks_done"] if checkpoint else 0
+    rows_done = checkpoint["rows_done"] if checkpoint else 0
+    counts = checkpoint["counts"] if checkpoint else {"success": 0, "error": 0}
+    position = checkpoint["output_position"] if checkpoint else 0
+    output = ParquetOutput(output_path, position) if Path(output_path).suffix == ".parquet" \
+        else CsvOutput(output_path, position)
+    if checkpoint:
+        print(f"↩️  Resuming after {rows_done:,} rows ({chunks_done} chunks)")
+
+    load_model(backend)
+    gc.freeze()  # Keep the model's pages shared with the forked workers
+    executor = None
+    if workers > 0:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                                       initializer=_init_worker)
+    max_in_flight = max(1, workers) * 2
+    total = count_rows(input_path)
+
+    start = time.perf_counter()
+    rows_this_run = 0
+    pending = deque()
+
+    def write_next():
+        nonlocal chunks_done, rows_done, rows_this_run
+        result = pending.popleft().result()
+        output.write(result)
+        chunks_done += 1
+        rows_done += len(result)
+        rows_this_run += len(result)
+        for status, n in result["status"].value_counts().items():
+            counts[status] = counts.get(status, 0) + int(n)
+        save_checkpoint(checkpoint_path, fingerprint, chunks_done, rows_done, output.position(), counts)
+
+        elapsed = time.perf_counter() - start
+        rate = rows_this_run / elapsed if elapsed else 0.0
+        progress = f"{rows_done:,}" + (f" / {total:,}" if total else "")
+        eta = f" | ETA {(total - rows_done) / rate:,.0f}s" if total and rate else ""
+        print(f"\r   {progress} rows | {rate:,.0f} rows/s | {counts['success']:,} priced, "
+              f"{counts['error']:,} failed{eta}   ", end="", flush=True)
+
+    try:
+        for start_row, chunk in read_chunks(input_path, chunk_size, skip_rows=rows_done):
+            if executor is None:
+                future = Future()
+                future.set_result(score_chunk(start_row, chunk, id_column))
+            else:
+                future = executor.submit(score_chunk, start_row, chunk, id_column)
+            pending.append(future)
+            while len(pending) >= max_in_flight:
+                write_next()
+        while pending:
+            write_next()
+    finally:
+        output.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    print()
+
+    elapsed = time.perf_counter() - start
+    parent_mb, worker_mb = peak_rss_mb()
+    return {
+        "rows": rows_done,
+        "rows_this_run": rows_this_run,
+        "counts": counts,
+        "seconds": elapsed,
+        "rows_per_second": rows_this_run / elapsed if elapsed else 0.0,
+        "peak_rss_mb": {"parent": parent_mb, "worker": worker_mb if executor is not None else None},
+        "checkpoint": checkpoint_path,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file of houses in chunks, with checkpoints.")
+    parser.add_argument("input", help="CSV or .parquet file")
+    parser.add_argument("output", help="CSV file, or .parquet (a directory of part files)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="Scoring processes (default: all cores, 0 = in-process)")
+    parser.add_argument("--resume", action="store_true", help="Continue from the output's checkpoint")
+    parser.add_argument("--id-column", default="PID", help="Input column copied to the output (if present)")
+    parser.add_argument("--backend", choices=["compiled", "pipeline"], default="compiled")
+    args = parser.parse_args()
+
+    print(f"Scoring {args.input} -> {args.output} ({args.chunk_size:,} rows per chunk, "
+          f"{os.cpu_count() if args.workers is None else args.workers} workers)")
+    summary = score_file(args.input, args.output, args.chunk_size, args.workers, args.resume,
+                         args.id_column, args.backend)
+    print(f"✅ {summary['rows']:,} rows ({summary['counts']['success']:,} priced, "
+          f"{summary['counts']['error']:,} failed) in {summary['seconds']:.1f}s "
+          f"= {summary['rows_per_second']:,.0f} rows/s")
+    peak = summary['peak_rss_mb']
+    workers = f", largest worker {peak['worker']:,.0f} MB" if peak['worker'] is not None else ""
+    print(f"   Peak RSS: parent {peak['parent']:,.0f} MB{workers}")
@@ -0,0 +1,290 @@
+# serve.py
+# Production entry point for app_4.0.py: pre-fork workers sharing one copy of the model.
+#
+# 1. The master loads the Pipeline, columns and defaults ONCE (by importing app_4.0.py)
+#    and runs one warm-up prediction so lazy XGBoost/CatBoost state is built before forking.
+# 2. gc.freeze() moves every loaded object into the permanent generation, so the
+#    garbage collector never writes to their headers and the pages stay shared.
+# 3. The master binds the listening socket and forks N workers. Each worker serves
+#    app_4.0's Flask app on the inherited socket; model pages are shared copy-on-write.
+# 4. The master respawns dead workers and prints a per-worker RSS vs USS report.
+# 5. New artifacts in models/ (polled every --watch seconds), `kill -HUP <master>` or
+#    POST /admin/reload trigger a rolling reload: the master loads + validates the new
+#    version (hot_reload.py), re-freezes, forks fresh workers on it, then drains the old
+#    ones (in-flight requests finish, keep-alive connections are closed). A rejected
+#    version changes nothing: the old workers keep serving.
+#
+# Usage:
+#   python serve.py --workers 4 --port 5000
+#   curl http://127.0.0.1:5000/readyz
+#   kill -HUP <master pid>                  # reload models/ now
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent
+APP_PATH = BASE_DIR / "app_4.0.py"
+
+
+# ==========================================
+# 1. LOAD THE APP ONCE (IN THE MASTER)
+# ==========================================
+def load_app_module(path=APP_PATH):
+    # app_4.0.py is not an importable module name, so load it by path
+    sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location("ames_app", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["ames_app"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def warm_up(app_module):
+    # One real prediction builds every lazily-initialized structure before fork
+    client = app_module.app.test_client()
+    response = client.get('/readyz')
+    if response.status_code != 200:
+        raise SystemExit("❌ FATAL ERROR: Model artifacts did not load. Refusing to fork workers.")
+    house = {"Neighborhood": "CollgCr", "GrLivArea": 1500, "YearBuilt": 2005, "OverallQual": 7}
+    client.post('/predict', json=house)
+
+
+# ==========================================
+# 2. MEMORY REPORT (RSS vs USS)
+# ==========================================
+def read_memory_kb(pid):
+    """Rss / Pss / Uss (private pages) for one process, from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    uss = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {"rss_kb": fields.get("Rss", 0), "pss_kb": fields.get("Pss", 0), "uss_kb": uss}
+
+
+def memory_report(master_pid, worker_pids):
+    rows = []
+    for role, pid in [("master", master_pid)] + [("worker", pid) for pid in worker_pids]:
+        try:
+            memory = read_memory_kb(pid)
+        except OSError:
+            continue  # Worker died between listing and reading
+        shared_kb = memory["rss_kb"] - memory["uss_kb"]
+        rows.append({
+            "role": role,
+            "pid": pid,
+            **memory,
+            "shared_kb": shared_kb,
+            "shared_pct": 100.0 * shared_kb / memory["rss_kb"] if memory["rss_kb"] else 0.0,
+        })
+    return rows
+
+
+def print_memory_report(rows):
+    print(f"\n{'role':<8}{'pid':>8}{'RSS MB':>10}{'USS MB':>10}{'PSS MB':>10}{'shared':>9}")
+    for row in rows:
+        print(f"{row['role']:<8}{row['pid']:>8}{row['rss_kb'] / 1024:>10.1f}{row['uss_kb'] / 1024:>10.1f}"
+              f"{row['pss_kb'] / 1024:>10.1f}{row['shared_pct']:>8.0f}%")
+    total_rss = sum(row['rss_kb'] for row in rows) / 1024
+    total_uss = sum(row['uss_kb'] for row in rows) / 1024
+    total_pss = sum(row['pss_kb'] for row in rows) / 1024
+    print(f"Sum of RSS: {total_rss:.1f} MB | Sum of USS: {total_uss:.1f} MB | "
+          f"Real footprint (sum of PSS): {total_pss:.1f} MB\n")
+
+
+# ==========================================
+# 3. WORKERS
+# ==========================================
+GRACEFUL_TIMEOUT = float(os.environ.get("AMES_GRACEFUL_TIMEOUT", 30))  # Seconds a draining worker may take
+
+
+def close_when_draining(app, draining):
+    # Once draining, every response tells the client to reconnect (to a worker on the new version)
+    def wrapped(environ, start_response):
+        def start(status, headers, exc_info=None):
+            if draining.is_set():
+                headers = [(k, v) for k, v in headers if k.lower() != "connection"] + [("Connection", "close")]
+            return start_response(status, headers, exc_info)
+        return app(environ, start)
+    return wrapped
+
+
+def run_worker(app_module, listen_fd, threaded):
+    from werkzeug.serving import make_server
+
+    gc.enable()
+    draining = threading.Event()
+    server = make_server("", 0, close_when_draining(app_module.app, draining), threaded=threaded, fd=listen_fd)
+    server.daemon_threads = False  # server_close() waits for in-flight requests
+
+    def drain(*_):
+        # Stop accepting, let in-flight requests finish, but never hang longer than the grace period
+        draining.set()
+        threading.Thread(target=server.shutdown, daemon=True).start()
+        deadline = threading.Timer(GRACEFUL_TIMEOUT, os._exit, args=(0,))
+        deadline.daemon = True
+        deadline.start()
+
+    signal.signal(signal.SIGTERM, drain)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The master handles Ctrl+C
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)  # ... and reloads
+    server.serve_forever()
+
+
+def spawn_worker(app_module, listen_fd, threaded):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(app_module, listen_fd, threaded)
+        finally:
+            os._exit(0)
+    return pid
+
+
+# ==========================================
+# 4. MASTER
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork production server for app_4.0.py")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--no-threads", action="store_true", help="One request at a time per worker")
+    parser.add_argument("--report-interval", type=float, default=60.0,
+                        help="Seconds between memory reports (0 = only at startup)")
+    parser.add_argument("--memory-report", default=None, help="Also write the latest report to this JSON file")
+    parser.add_argument("--watch", type=float, default=None,
+                        help="Seconds between checks of models/ for new artifacts (0 = off; "
+                             "default AMES_RELOAD_WATCH_SECONDS)")
+    args = parser.parse_args()
+
+    # A. Load everything once, with the collector off so no half-collected garbage gets frozen
+    gc.disable()
+    app_module = load_app_module()
+    warm_up(app_module)
+    gc.freeze()
+    print(f"🧊 Froze {gc.get_freeze_count():,} objects into the permanent GC generation")
+
+    # Reloads happen here, once, then reach the workers by re-forking (workers never load models)
+    reloader = app_module.reloader
+    reloader.stop_watching()
+    watch_seconds = app_module.RELOAD_WATCH_SECONDS if args.watch is None else args.watch
+    master_pid = os.getpid()
+    app_module.reload_broadcast = lambda: os.kill(master_pid, signal.SIGHUP)
+
+    # B. Bind once; every worker accepts on the same socket
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((args.host, args.port))
+    listener.listen(128)
+    listener.set_inheritable(True)
+
+    # C. Fork the workers
+    threaded = not args.no_threads
+    workers = set()
+    for _ in range(args.workers):
+        workers.add(spawn_worker(app_module, listener.fileno(), threaded))
+    print(f"🚀 Serving on http://{args.host}:{args.port} with {len(workers)} workers (master pid {os.getpid()})")
+
+    # D. Supervise: respawn dead workers, report memory, reload, forward shutdown
+    shutting_down = False
+    reload_requested = False
+    retiring = set()  # Old-version workers draining after a reload: not respawned
+
+    def stop_workers(pids):
+        for pid in list(pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def shutdown(*_):
+        nonlocal shutting_down
+        shutting_down = True
+        stop_workers(workers | retiring)
+
+    def request_reload(*_):
+        nonlocal reload_requested
+        reload_requested = True
+
+    def rolling_reload(reason):
+        # Load + validate with the collector on (the old version becomes garbage), then re-freeze
+        gc.unfreeze()
+        result = reloader.reload(reason=reason)
+        gc.collect()
+        gc.freeze()
+        if result["status"] != "swapped":
+            detail = result.get("error", "")
+            print(f"🔁 Reload ({reason}): {result['status']} {detail}".rstrip())
+            return
+        old = set(workers)
+        workers.clear()
+        for _ in range(args.workers):
+            workers.add(spawn_worker(app_module, listener.fileno(), threaded))
+        retiring.update(old)
+        stop_workers(old)
+        print(f"🔁 Reload ({reason}): {result['previous']} -> {result['version']} "
+              f"in {result['seconds']:.1f} s; draining {len(old)} old workers")
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGHUP, request_reload)
+    if watch_seconds > 0:
+        print(f"🔁 Watching models/ for new artifacts every {watch_seconds:g} s")
+
+    def report():
+        rows = memory_report(os.getpid(), sorted(workers))
+        print_memory_report(rows)
+        if args.memory_report:
+            Path(args.memory_report).write_text(json.dumps(rows, indent=2))
+
+    time.sleep(1.0)  # Let the workers finish starting before the first report
+    report()
+    last_report = time.monotonic()
+    last_watch = time.monotonic()
+
+    while workers or retiring:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            if pid in retiring:
+                retiring.discard(pid)
+                continue
+            workers.discard(pid)
+            if not shutting_down:
+                print(f"⚠️ Worker {pid} exited (status {status}); respawning")
+                workers.add(spawn_worker(app_module, listener.fileno(), threaded))
+            continue
+        if shutting_down:
+            time.sleep(0.1)
+            continue
+        if reload_requested:
+            reload_requested = False
+            rolling_reload("signal")
+        elif watch_seconds > 0 and time.monotonic() - last_watch >= watch_seconds:
+            last_watch = time.monotonic()
+            if reloader.changed():
+                rolling_reload("watch")
+        if args.report_interval and time.monotonic() - last_report >= args.report_interval:
+            report()
+            last_report = time.monotonic()
+        time.sleep(0.5)
+
+    listener.close()
+    print("👋 All workers stopped.")
+
+
+if __name__ == '__main__':
+    main()
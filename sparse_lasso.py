@@ -0,0 +1,150 @@
+# sparse_lasso.py
+# The Lasso member of the production ensemble without the wide dense matrix.
+#
+# The notebook's Lasso branch is
+#   ColumnTransformer(OneHotEncoder(sparse_output=False) on the 46 code columns, passthrough)
+#   -> StandardScaler -> Lasso
+# so every fit and every batch predict materializes n_rows x ~330 float64 columns (about
+# 2.6 KB per row, 2.6 GB per million rows), although only 46 of the ~300 one-hot columns
+# in a row are non-zero.
+#
+# The sparse branch keeps the one-hot block in CSR and scales without centering:
+# StandardScaler(with_mean=False) divides every column by the same scale_, and scaling a
+# sparse column never fills it in. Centering only moves the intercept. With fit_intercept=True,
+# Lasso centers internally (sparse input stays sparse), so the fitted coef_ are the dense
+# branch's coef_ (up to the solver's tol) and
+#     intercept_sparse = intercept_dense - sum(coef_ * mean_ / scale_)
+#
+#   make_lasso_branch(n_cats, sparse=True)        # unfitted, same step names as the notebook's
+#   sparsify_lasso_branch(fitted_dense_branch)    # same fitted numbers, sparse transform (no refit)
+#   use_sparse_lasso(pipeline)                    # swap that into a fitted production Pipeline
+#
+# Usage:
+#   python sparse_lasso.py                        # fit both branches, compare coefficients + prices
+#   python benchmarks/bench_sparse_lasso.py       # time + peak memory, dense vs sparse
+import argparse
+import copy
+import time
+
+import joblib
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import Lasso
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from utils import cast_to_str  # noqa: F401  (needed to unpickle the Pipeline)
+
+# The notebook's Lasso settings (final_production_pipeline)
+LASSO_PARAMS = {"alpha": 0.001, "max_iter": 50000, "random_state": 42}
+
+
+# ==========================================
+# 1. BUILD / CONVERT
+# ==========================================
+def make_lasso_branch(n_cats, sparse=True, **lasso_params):
+    """
+    The Lasso member, unfitted. Input: the preprocessor's output ([n_cats code columns, numerics]).
+    sparse=False is exactly the notebook's branch; sparse=True gives the same coef_ without densifying.
+    """
+    ohe = OneHotEncoder(handle_unknown='ignore', sparse_output=sparse)
+    prep = ColumnTransformer(
+        [('ohe', ohe, slice(0, n_cats))],
+        remainder='passthrough',
+        sparse_threshold=1.0 if sparse else 0.3,  # Always CSR, whatever the density
+    )
+    return Pipeline([
+        ('prep', prep),
+        ('scaler', StandardScaler(with_mean=not sparse)),
+        ('model', Lasso(**{**LASSO_PARAMS, **lasso_params})),
+    ])
+
+
+def is_sparse_branch(branch):
+    return not branch.named_steps['scaler'].with_mean
+
+
+def sparsify_lasso_branch(branch):
+    """A fitted dense branch -> an equivalent fitted sparse branch (a copy; nothing is refit)."""
+    if is_sparse_branch(branch):
+        return branch
+    sparse = copy.deepcopy(branch)
+    prep = sparse.named_steps['prep']
+    prep.named_transformers_['ohe'].sparse_output = True
+    prep.sparse_threshold = 1.0
+    prep.sparse_output_ = True  # Decided at fit time from the output density; force CSR
+
+    scaler = sparse.named_steps['scaler']
+    scaler.with_mean = False  # mean_ is kept: it is still the training mean
+
+    lasso = sparse.named_steps['model']
+    lasso.intercept_ = lasso.intercept_ - float(np.dot(lasso.coef_, scaler.mean_ / scaler.scale_))
+    return sparse
+
+
+def centered_lasso_params(branch):
+    """(mean, scale, coef, intercept) of a fitted branch in the dense (centered) form, sparse or not."""
+    scaler, lasso = branch.named_steps['scaler'], branch.named_steps['model']
+    intercept = float(lasso.intercept_)
+    if is_sparse_branch(branch):
+        intercept += float(np.dot(lasso.coef_, scaler.mean_ / scaler.scale_))
+    return scaler.mean_, scaler.scale_, lasso.coef_, intercept
+
+
+def use_sparse_lasso(pipeline):
+    """Swap the sparse branch into a fitted production Pipeline, in place. Returns the pipeline."""
+    voting = pipeline.named_steps['model'].regressor_
+    names = [name for name, _ in voting.estimators]
+    i = names.index('lasso')
+    voting.estimators_[i] = sparsify_lasso_branch(voting.estimators_[i])
+    voting.named_estimators_['lasso'] = voting.estimators_[i]
+    return pipeline
+
+
+# ==========================================
+# 2. EQUIVALENCE CHECK
+# ==========================================
+def check_equivalence(dense, sparse, X):
+    """Coefficients (in the scaled space) and predictions of two fitted branches on X."""
+    _, _, dense_coef, dense_intercept = centered_lasso_params(dense)
+    _, _, sparse_coef, sparse_intercept = centered_lasso_params(sparse)
+    dense_pred, sparse_pred = dense.predict(X), sparse.predict(X)
+    return {
+        "max_coef_diff": float(np.max(np.abs(dense_coef - sparse_coef))),
+        "max_coef": float(np.max(np.abs(dense_coef))),
+        "intercept_diff": abs(dense_intercept - sparse_intercept),
+        "nonzero_coefs": (int(np.count_nonzero(dense_coef)), int(np.count_nonzero(sparse_coef))),
+        "max_pred_diff": float(np.max(np.abs(dense_pred - sparse_pred))),
+    }
+
+
+if __name__ == '__main__':
+    import pandas as pd
+    from compiled_model import DATA_PATH, PIPELINE_PATH
+
+    parser = argparse.ArgumentParser(description="Fit the dense and the sparse Lasso branch and compare them.")
+    parser.add_argument("--data", default=str(DATA_PATH), help="Ames CSV (with SalePrice)")
+    parser.add_argument("--model", default=str(PIPELINE_PATH), help="Fitted pipeline whose preprocessor encodes the rows")
+    args = parser.parse_args()
+
+    pipeline = joblib.load(args.model)
+    preprocessor = pipeline.named_steps['preprocessor']
+    df = pd.read_csv(args.data)
+    X = preprocessor.transform(df.reindex(columns=preprocessor.feature_names_in_))
+    y = np.log1p(df['SalePrice'])  # The TransformedTargetRegressor's func
+    n_cats = len(preprocessor.transformers_[0][2])
+
+    fitted = {}
+    for sparse in (False, True):
+        started = time.perf_counter()
+        fitted[sparse] = make_lasso_branch(n_cats, sparse=sparse).fit(X, y)
+        print(f"{'sparse' if sparse else 'dense':<7} fit: {time.perf_counter() - started:.2f} s")
+
+    report = check_equivalence(fitted[False], fitted[True], X)
+    print(f"Refit:     max |coef diff| {report['max_coef_diff']:.2e} (max |coef| {report['max_coef']:.3f}), "
+          f"max |pred diff| {report['max_pred_diff']:.2e} log-$, non-zero coefs {report['nonzero_coefs']}")
+
+    # The shipped member, converted without refitting: identical numbers, so only rounding differs
+    shipped = pipeline.named_steps['model'].regressor_.named_estimators_['lasso']
+    report = check_equivalence(shipped, sparsify_lasso_branch(shipped), X)
+    print(f"Converted: max |coef diff| {report['max_coef_diff']:.2e}, max |pred diff| {report['max_pred_diff']:.2e} log-$")
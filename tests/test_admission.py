@@ -0,0 +1,47 @@
+import threading
+
+import requests
+
+BASE_URL = 'http://127.0.0.1:5000'
+
+house_data = {
+    "Neighborhood": "CollgCr",
+    "GrLivArea": 1500,
+    "YearBuilt": 2005,
+    "OverallQual": 7
+}
+
+try:
+    # 1. A caller that has already given up is dropped before the model runs
+    stale = requests.post(f"{BASE_URL}/predict", json={**house_data, "GrLivArea": 1501},
+                          headers={"X-Request-Deadline-Ms": "0"})
+    print(f"Expired deadline: HTTP {stale.status_code} ({stale.json().get('error')})")
+
+    # 2. Flood the bulk lane, then ask an interactive question while it is busy
+    batch = [{**house_data, "GrLivArea": 1000 + i} for i in range(1000)]
+    shed = []
+
+    def flood():
+        r = requests.post(f"{BASE_URL}/predict_batch", json=batch)
+        if r.status_code == 503:
+            shed.append(r.headers.get('Retry-After'))
+
+    flooders = [threading.Thread(target=flood) for _ in range(20)]
+    for t in flooders:
+        t.start()
+    interactive = requests.post(f"{BASE_URL}/predict", json=house_data, timeout=30)
+    for t in flooders:
+        t.join()
+
+    stats = requests.get(f"{BASE_URL}/admission/stats").json()
+    print(f"Interactive during the flood: HTTP {interactive.status_code}")
+    print(f"Bulk requests shed: {len(shed)} of {len(flooders)} (Retry-After: {sorted(set(shed))})")
+    print(f"Lanes: { {lane: s['shed'] for lane, s in stats['lanes'].items()} }")
+
+    if stale.status_code == 504 and interactive.status_code == 200 and all(shed):
+        print("\n✅ Admission Check Passed: Stale requests dropped, interactive served through a bulk flood.")
+    else:
+        print("\n⚠️ Admission Check Warning: Is admission control off (AMES_MAX_IN_FLIGHT=0)?")
+
+except Exception as e:
+    print(f"\n❌ Connection Refused. Is app_4.0.py running? \nError: {e}")
@@ -0,0 +1,73 @@
+import requests
+
+url = 'http://127.0.0.1:5000/predict_batch'
+
+# A mixed batch: two valid houses, one guardrail violation, one minimal valid house
+batch = [
+    {"Neighborhood": "CollgCr", "GrLivArea": 1500, "YearBuilt": 2005, "OverallQual": 7, "GarageCars": 2},
+    {"Neighborhood": "NAmes", "GrLivArea": 1200, "YearBuilt": 1960, "OverallQual": 5, "KitchenQual": "Ex"},
+    {"Neighborhood": "NoRidge", "GrLivArea": 200000, "YearBuilt": 2000, "OverallQual": 10},
+    {"Neighborhood": "OldTown", "GrLivArea": 900, "YearBuilt": 1920, "OverallQual": 4}
+]
+
+print(f"Sending batch of {len(batch)} houses...")
+
+try:
+    response = requests.post(url, json=batch)
+    result = response.json()
+
+    if response.status_code == 200 and result.get('status') == 'success':
+        print(f"\n✅ SUCCESS! {result['n_success']} priced, {result['n_failed']} rejected")
+
+        # Results come back in input order, one slot per record
+        for item in result['predictions']:
+            if item['status'] == 'success':
+                print(f"   [{item['index']}] 💰 ${item['predicted_price']:,.2f}")
+            else:
+                print(f"   [{item['index']}] 🛑 {item['details'][0]['msg']} ({item['details'][0]['loc']})")
+
+        if result['predictions'][2]['status'] == 'error':
+            print("\n✅ Guardrail Check Passed: Mega Mansion rejected inside the batch.")
+        else:
+            print("\n⚠️ Guardrail Check Warning: Mega Mansion was priced.")
+    else:
+        print(f"\n❌ SERVER ERROR ({response.status_code}): {result.get('error', 'Unknown Error')}")
+
+except Exception as e:
+    print(f"\n❌ Connection Refused. Is app_4.0.py running? \nError: {e}")
+
+# Arrow vs JSON: same records, same prices. Built from a pandas DataFrame (as most clients do),
+# MSSubClass / MoSold / YrSold have a missing row and become double (60.0); the server must
+# still read them as the categories '60', '6' and '2008'.
+parity_batch = [
+    {"Neighborhood": "CollgCr", "GrLivArea": 1500, "YearBuilt": 2005, "OverallQual": 7, "MSSubClass": 60, "MoSold": 6},
+    {"Neighborhood": "NAmes", "GrLivArea": 1200, "YearBuilt": 1960, "OverallQual": 5, "YrSold": 2008},
+]
+
+print("\nChecking Arrow vs JSON price parity (with missing values)...")
+
+try:
+    import pyarrow as pa
+
+    import pandas as pd
+
+    table = pa.Table.from_pandas(pd.DataFrame(parity_batch), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    json_result = requests.post(url, json=parity_batch).json()
+    arrow_result = requests.post(url, data=sink.getvalue().to_pybytes(),
+                                 headers={"Content-Type": "application/vnd.apache.arrow.stream"}).json()
+    json_prices = [item.get('predicted_price') for item in json_result['predictions']]
+    arrow_prices = [item.get('predicted_price') for item in arrow_result['predictions']]
+
+    if json_prices == arrow_prices:
+        print(f"✅ Parity Check Passed: {arrow_prices}")
+    else:
+        print(f"❌ Parity Check Failed: JSON {json_prices} vs Arrow {arrow_prices}")
+
+except ImportError:
+    print("⚠️ pyarrow not installed: Arrow parity check skipped.")
+except Exception as e:
+    print(f"\n❌ Connection Refused. Is app_4.0.py running? \nError: {e}")
@@ -0,0 +1,127 @@
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+from pydantic import ValidationError
+
+from bulk_validation import validate_frame, validate_records
+from schemas import HouseData
+
+# No server needed: the columnar validator must agree with HouseData record for record
+random.seed(42)
+
+GOOD = {"Neighborhood": "CollgCr", "GrLivArea": 1500, "YearBuilt": 2005, "OverallQual": 7}
+
+# Values that probe every rule: bounds, int/float coercion, strings, nulls, wrong types
+PROBES = [
+    0, 1, 5, 10, 11, -1, 100, 100.5, 101, 1800, 1801, 1899, 1900, 2029, 2030, 9999.9, 10000,
+    3.0, 2.5, True, False, float("inf"), float("nan"), None,
+    "7", " 2005 ", "1_500", "1500.0", "1500.", "2.5", "1e3", "abc", "", "inf", "NaN", "CollgCr", "Gd",
+    [1], {"a": 1},
+    # int64 overflow and exactness: big Python ints / strings are kept exactly, big floats are rejected
+    2**53 + 1, str(2**53 + 1), 2**63, 2**64, -2**63 - 1, 10**400, "1" + "0" * 30, 9.2e18, 1e19, -1e19, 1e300,
+    # raw bytes (msgpack bin): decoded for strings, unparseable ones rejected
+    b"12", b"CollgCr", b"\xff", bytearray(b"\xff"),
+]
+
+
+def random_record():
+    record = dict(GOOD)
+    for name in random.sample(list(HouseData.model_fields), k=random.randint(0, 6)):
+        if random.random() < 0.15:
+            record.pop(name, None)
+        else:
+            record[name] = random.choice(PROBES)
+    if random.random() < 0.3:
+        record["MSSubClass"] = random.choice([20, 60, "60"])   # extras are allowed through
+    return record
+
+
+def pydantic_errors(record):
+    try:
+        HouseData.model_validate(record)
+        return []
+    except ValidationError as e:
+        return e.errors()
+
+
+def same(a, b):
+    return a == b or (a != a and b != b)  # NaN == NaN for our purposes
+
+
+def compare(expected, actual):
+    if len(expected) != len(actual):
+        return False
+    for e, a in zip(expected, actual):
+        if {k: v for k, v in e.items() if k != "input"} != {k: v for k, v in a.items() if k != "input"}:
+            return False
+        if not same(e["input"], a["input"]):
+            return False
+    return True
+
+
+# 1. JSON records (what /predict_batch receives)
+records = [random_record() for _ in range(5000)] + ["not a record", None, [1, 2]]
+result = validate_records(records)
+mismatches = [
+    i for i, record in enumerate(records)
+    if not compare(pydantic_errors(record), result.errors.get(i, []))
+]
+print(f"Records: {result.n_valid} valid, {result.n_invalid} invalid, {len(mismatches)} mismatches")
+for i in mismatches[:5]:
+    print(f"  #{i} {records[i]}\n    pydantic: {pydantic_errors(records[i])}\n    columnar: {result.errors.get(i)}")
+
+# 2. Valid rows come out exactly as model_dump() would produce them
+dump_mismatches = 0
+for i, row in result.frame.iterrows():
+    dumped = HouseData.model_validate(records[i]).model_dump()
+    if any(not same(dumped[k], row[k]) or type(dumped[k]) is not type(row[k]) for k in dumped):
+        dump_mismatches += 1
+print(f"model_dump() mismatches: {dump_mismatches}")
+
+# 3. A numeric frame (what a CSV reader produces), NaN = not provided
+frame = pd.DataFrame({
+    "GrLivArea": [1500.0, 50.0, float("nan"), 1500.0],
+    "YearBuilt": [2005, 2005, 2005, 2050],
+    "OverallQual": [7.0, 7.5, 7.0, 7.0],
+    "Neighborhood": ["CollgCr", "CollgCr", "CollgCr", "CollgCr"],
+})
+frame_errors = validate_frame(frame).errors
+expected = {
+    1: [("GrLivArea", "greater_than"), ("OverallQual", "int_from_float")],
+    2: [("GrLivArea", "missing")],
+    3: [("YearBuilt", "less_than")],
+}
+got = {i: [(e["loc"][0], e["type"]) for e in errs] for i, errs in frame_errors.items()}
+print(f"Frame errors: {got}")
+
+# 4. Speed: 200k CSV-style rows, 1% of them out of range
+n = 200_000
+big = pd.DataFrame({
+    "GrLivArea": [random.uniform(300, 5000) for _ in range(n)],
+    "YearBuilt": [random.randint(1850, 2025) for _ in range(n)],
+    "OverallQual": [random.randint(1, 10) for _ in range(n)],
+    "Neighborhood": [random.choice(["CollgCr", "NAmes", "OldTown"]) for _ in range(n)],
+    "GarageCars": [float(random.randint(0, 3)) for _ in range(n)],
+})
+big.loc[big.sample(frac=0.01, random_state=0).index, "GrLivArea"] = 50.0
+start = time.perf_counter()
+validate_frame(big)
+columnar_s = time.perf_counter() - start
+sample = big.head(5000).to_dict("records")
+start = time.perf_counter()
+for record in sample:
+    pydantic_errors(record)
+per_record_s = (time.perf_counter() - start) / len(sample) * n
+print(f"{n:,} rows: columnar {columnar_s:.2f}s vs per-record ~{per_record_s:.2f}s "
+      f"({per_record_s / columnar_s:.0f}x faster)")
+
+if not mismatches and not dump_mismatches and got == expected:
+    print("\n✅ Bulk Validation Check Passed: Same errors and values as HouseData.")
+else:
+    print("\n❌ Bulk Validation Check Failed.")
+    sys.exit(1)
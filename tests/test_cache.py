@@ -0,0 +1,34 @@
+import requests
+
+BASE_URL = 'http://127.0.0.1:5000'
+
+# The same partial house the dashboard and investor tools keep sending
+house_data = {
+    "Neighborhood": "CollgCr",
+    "GrLivArea": 1500,
+    "YearBuilt": 2005,
+    "OverallQual": 7
+}
+
+try:
+    before = requests.get(f"{BASE_URL}/cache/stats").json()
+
+    # 1. Same house three times; 1500 vs 1500.0 is the same row to the model
+    prices = [
+        requests.post(f"{BASE_URL}/predict", json=house_data).json()['predicted_price'],
+        requests.post(f"{BASE_URL}/predict", json=house_data).json()['predicted_price'],
+        requests.post(f"{BASE_URL}/predict", json={**house_data, "GrLivArea": 1500.0}).json()['predicted_price'],
+    ]
+    after = requests.get(f"{BASE_URL}/cache/stats").json()
+
+    print(f"Prices: {[f'${p:,.2f}' for p in prices]}")
+    print(f"Cache:  +{after['hits'] - before['hits']} hits, +{after['misses'] - before['misses']} misses "
+          f"(size {after['size']}/{after['max_size']}, hit rate {after['hit_rate']:.0%})")
+
+    if len(set(prices)) == 1 and after['hits'] - before['hits'] >= 2:
+        print("\n✅ Cache Check Passed: Repeats were served from the cache with identical prices.")
+    else:
+        print("\n⚠️ Cache Check Warning: Repeats were not served from the cache (is AMES_CACHE_SIZE=0?).")
+
+except Exception as e:
+    print(f"\n❌ Connection Refused. Is app_4.0.py running? \nError: {e}")
@@ -0,0 +1,39 @@
+import requests
+
+BASE_URL = 'http://127.0.0.1:5000'
+
+house_data = {
+    "Neighborhood": "CollgCr",
+    "GrLivArea": 1500,
+    "YearBuilt": 2005,
+    "OverallQual": 7,
+    "KitchenQual": "Ex"
+}
+
+try:
+    # 1. One house: every field gets a dollar contribution, and they add up to the /predict price
+    explanation = requests.post(f"{BASE_URL}/explain", json=house_data).json()
+    price = requests.post(f"{BASE_URL}/predict", json=house_data).json()['predicted_price']
+    total = explanation['base_price'] + sum(item['contribution'] for item in explanation['contributions'])
+
+    print(f"Base price: ${explanation['base_price']:,.2f} | Predicted: ${explanation['predicted_price']:,.2f}")
+    for item in explanation['contributions'][:5]:
+        print(f"   {item['feature']:<14} = {str(item['value']):<8} {item['contribution']:+,.2f}")
+
+    # 2. Many houses in one call, top-3 fields each, with a guardrail violation in the middle
+    batch = requests.post(f"{BASE_URL}/explain?top=3", json=[
+        house_data,
+        {"Neighborhood": "NoRidge", "GrLivArea": 200000, "YearBuilt": 2000, "OverallQual": 10},
+        {**house_data, "GrLivArea": 2500},
+    ]).json()
+    statuses = [item['status'] for item in batch['explanations']]
+    print(f"\nBatch: {statuses} ({[len(item.get('contributions', [])) for item in batch['explanations']]} fields)")
+
+    if abs(total - price) < 0.01 and explanation['predicted_price'] == price \
+            and statuses == ['success', 'error', 'success']:
+        print("\n✅ Explain Check Passed: Contributions add up to the served price; bad records fail alone.")
+    else:
+        print(f"\n⚠️ Explain Check Warning: contributions add up to ${total:,.2f}, /predict says ${price:,.2f}.")
+
+except Exception as e:
+    print(f"\n❌ Connection Refused. Is app_4.0.py running? \nError: {e}")
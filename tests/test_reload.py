@@ -0,0 +1,36 @@
+import os
+
+import requests
+
+BASE_URL = 'http://127.0.0.1:5000'
+ADMIN_TOKEN = os.environ.get('AMES_ADMIN_TOKEN', '')
+
+house_data = {
+    "Neighborhood": "CollgCr",
+    "GrLivArea": 1500,
+    "YearBuilt": 2005,
+    "OverallQual": 7
+}
+
+try:
+    # 1. Every response names the artifact version that produced it
+    ready = requests.get(f"{BASE_URL}/readyz").json()
+    predicted = requests.post(f"{BASE_URL}/predict", json=house_data).json()
+    print(f"Serving version: {ready.get('version')} (/predict says {predicted.get('version')})")
+
+    # 2. Reloading the same artifacts is a no-op: nothing swapped, same version, same price
+    reload = requests.post(f"{BASE_URL}/admin/reload", headers={"X-Admin-Token": ADMIN_TOKEN})
+    print(f"Admin reload: HTTP {reload.status_code} ({reload.json().get('status')})")
+    again = requests.post(f"{BASE_URL}/predict", json=house_data).json()
+
+    if (ready.get('version') == predicted.get('version') == again.get('version')
+            and reload.status_code in (200, 202)
+            and again.get('predicted_price') == predicted.get('predicted_price')):
+        print("\n✅ Reload Check Passed: Versioned responses, reload without changes kept serving the same model.")
+    elif reload.status_code == 403:
+        print("\n⚠️ Reload Check Warning: Start the server with AMES_ADMIN_TOKEN and export the same token here.")
+    else:
+        print(f"\n⚠️ Reload Check Warning: {reload.json()}")
+
+except Exception as e:
+    print(f"\n❌ Connection Refused. Is app_4.0.py running? \nError: {e}")
@@ -0,0 +1,346 @@
+# train.py
+# Scripted retraining of final_production_pipeline, with the three members fitted side by side.
+#
+# The production notebook fits everything serially (VotingRegressor n_jobs=1, XGBoost n_jobs=1,
+# CatBoost at its default threading, a 50,000-iteration Lasso) and blocks a kernel while it does.
+# This script rebuilds the same Pipeline from TRAINING_CONFIG (the notebook's values) and:
+#   1. fits the preprocessor and the log1p target transform in the parent, exactly as
+#      Pipeline.fit / TransformedTargetRegressor.fit would
+#   2. fits Lasso, XGBoost and CatBoost in three forked processes, each with its own thread budget
+#      (AMES_MEMBER_THREADS syntax, see member_pool.py), timing each fit and recording its peak RSS
+#   3. assembles the fitted members into the VotingRegressor, so the artifact is the notebook's
+#      Pipeline object and predicts the same prices for the same seed
+#   4. writes the model, columns, defaults and options (as in the shipped models/: categorical
+#      defaults are the mode of astype(str), so 'nan' can win) plus a JSON training report
+#
+# Every member gets the same clone, data and random_state as under VotingRegressor.fit, so the
+# numbers do not depend on the process layout. Thread budgets are not saved into the artifact:
+# XGBoost gets its n_jobs back, and CatBoost's thread_count is dropped as the notebook never set it.
+#
+# Usage:
+#   python train.py --data data/Ames_Housing_Price_Data.csv                  # writes models/ + report
+#   python train.py --output-dir /tmp/candidate --threads "lasso=1,xgb=4,catboost=4"
+#   python train.py --config my_config.json --check-serial                   # also fit the notebook way, compare
+import argparse
+import copy
+import json
+import multiprocessing
+import os
+import resource
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from catboost import CatBoostRegressor
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer, TransformedTargetRegressor
+from sklearn.dummy import DummyRegressor
+from sklearn.ensemble import VotingRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, OrdinalEncoder
+from sklearn.utils import Bunch
+from xgboost import XGBRegressor
+
+from compiled_model import DATA_PATH, MODELS_DIR
+from member_pool import MEMBERS, limit_blas_threads, parse_threads
+from sparse_lasso import make_lasso_branch
+from utils import cast_to_str
+
+REPORT_NAME = "ames_training_report.json"
+
+# ==========================================
+# 1. CONFIGURATION (the production notebook's values)
+# ==========================================
+TRAINING_CONFIG = {
+    "categorical_cols": [
+        'MSSubClass', 'MSZoning', 'Street', 'Alley', 'LotShape', 'LandContour',
+        'Utilities', 'LotConfig', 'LandSlope', 'Neighborhood', 'Condition1',
+        'Condition2', 'BldgType', 'HouseStyle', 'RoofStyle', 'RoofMatl',
+        'Exterior1st', 'Exterior2nd', 'MasVnrType', 'ExterQual', 'ExterCond',
+        'Foundation', 'BsmtQual', 'BsmtCond', 'BsmtExposure', 'BsmtFinType1',
+        'BsmtFinType2', 'Heating', 'HeatingQC', 'CentralAir', 'Electrical',
+        'KitchenQual', 'Functional', 'FireplaceQu', 'GarageType', 'GarageFinish',
+        'GarageQual', 'GarageCond', 'PavedDrive', 'PoolQC', 'Fence', 'MiscFeature',
+        'MoSold', 'YrSold', 'SaleType', 'SaleCondition',
+    ],
+    "numerical_cols": [
+        'LotFrontage', 'LotArea', 'OverallQual', 'OverallCond', 'YearBuilt',
+        'YearRemodAdd', 'MasVnrArea', 'BsmtFinSF1', 'BsmtFinSF2', 'BsmtUnfSF',
+        'TotalBsmtSF', '1stFlrSF', '2ndFlrSF', 'LowQualFinSF', 'GrLivArea',
+        'BsmtFullBath', 'BsmtHalfBath', 'FullBath', 'HalfBath', 'BedroomAbvGr',
+        'KitchenAbvGr', 'TotRmsAbvGrd', 'Fireplaces', 'GarageYrBlt', 'GarageCars',
+        'GarageArea', 'WoodDeckSF', 'OpenPorchSF', 'EnclosedPorch', '3SsnPorch',
+        'ScreenPorch', 'PoolArea', 'MiscVal',
+    ],
+    "target": "SalePrice",
+    "drop_cols": ["PID", "Unnamed: 0"],
+    "test_size": 0.2,
+    "seed": 42,  # train_test_split, Lasso, XGBoost and CatBoost
+    "lasso": {"alpha": 0.001, "max_iter": 50000},
+    "xgb": {"n_estimators": 500, "learning_rate": 0.1, "max_depth": 3, "subsample": 0.8, "n_jobs": 1},
+    "catboost": {"iterations": 1000, "learning_rate": 0.05, "depth": 4, "l2_leaf_reg": 3,
+                 "loss_function": "RMSE", "verbose": 0, "allow_writing_files": False},
+    "weights": [1, 2, 2],
+}
+
+
+def load_config(path=None, seed=None):
+    """TRAINING_CONFIG, with the top-level keys of a JSON file (and --seed) laid over it."""
+    config = copy.deepcopy(TRAINING_CONFIG)
+    if path:
+        overrides = json.loads(Path(path).read_text())
+        unknown = set(overrides) - set(config)
+        if unknown:
+            raise ValueError(f"Unknown config keys: {sorted(unknown)}")
+        for key, value in overrides.items():
+            config[key] = {**config[key], **value} if isinstance(config[key], dict) else value
+    if seed is not None:
+        config["seed"] = seed
+    return config
+
+
+# ==========================================
+# 2. BUILD (final_production_pipeline, unfitted)
+# ==========================================
+def build_pipeline(config):
+    cat_preprocessing = Pipeline([
+        ('caster', FunctionTransformer(cast_to_str, validate=False)),
+        ('imputer', SimpleImputer(strategy='constant', fill_value='None')),
+        ('ordinal', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1)),
+    ])
+    num_preprocessing = Pipeline([('imputer', SimpleImputer(strategy='median'))])
+    preprocessor = ColumnTransformer([
+        ('cat', cat_preprocessing, config["categorical_cols"]),
+        ('num', num_preprocessing, config["numerical_cols"]),
+    ], verbose_feature_names_out=False)
+
+    seed = config["seed"]
+    voting_model = VotingRegressor(
+        estimators=[
+            ('lasso', make_lasso_branch(len(config["categorical_cols"]), sparse=False,
+                                        **config["lasso"], random_state=seed)),
+            ('xgb', XGBRegressor(**config["xgb"], random_state=seed)),
+            ('catboost', CatBoostRegressor(**config["catboost"], random_seed=seed)),
+        ],
+        weights=config["weights"],
+        n_jobs=1,
+    )
+    return Pipeline([
+        ('preprocessor', preprocessor),
+        ('model', TransformedTargetRegressor(regressor=voting_model, func=np.log1p, inverse_func=np.expm1)),
+    ])
+
+
+def load_training_data(data_path, config):
+    """The notebook's cleanup and split -> X_train, X_test, y_train, y_test."""
+    df = pd.read_csv(data_path)
+    df = df.drop(columns=config["drop_cols"], errors='ignore')
+    X = df.drop(columns=[config["target"]])
+    y = df[config["target"]]
+    return train_test_split(X, y, test_size=config["test_size"], random_state=config["seed"])
+
+
+# ==========================================
+# 3. PARALLEL FIT
+# ==========================================
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+
+def _with_threads(name, estimator, threads):
+    if name == "xgb":
+        estimator.set_params(n_jobs=threads)
+    elif name == "catboost":
+        estimator.set_params(thread_count=threads)
+    return estimator
+
+
+def _restore_threads(name, estimator, original):
+    if name == "xgb":
+        estimator.set_params(n_jobs=original.get_params()["n_jobs"])
+    elif name == "catboost":
+        # A fitted CatBoost model refuses set_params; thread_count=-1 is stored as "absent" anyway
+        estimator._init_params.pop('thread_count', None)
+        if original.get_params().get('thread_count') is not None:
+            estimator._init_params['thread_count'] = original.get_params()['thread_count']
+    return estimator
+
+
+def fit_member(name, estimator, X, y, threads):
+    """Runs in a fresh process: fit one member under its thread budget -> (fitted, stats)."""
+    limit_blas_threads(threads)  # Process-wide, and this process only fits this member
+    fitted = _with_threads(name, clone(estimator), threads)
+    rss_before = _peak_rss_mb()
+    started = time.perf_counter()
+    fitted.fit(X, y)
+    seconds = time.perf_counter() - started
+    stats = {"threads": threads, "fit_seconds": seconds, "peak_rss_mb": _peak_rss_mb(),
+             "rss_before_fit_mb": rss_before, "pid": os.getpid()}
+    return _restore_threads(name, fitted, estimator), stats
+
+
+def fit_parallel(pipeline, X_train, y_train, threads):
+    """
+    Fit an unfitted build_pipeline() in place -> (pipeline, stats).
+    Same result as pipeline.fit(X_train, y_train); the members run in parallel processes.
+    """
+    stats = {}
+    started = time.perf_counter()
+    preprocessor = pipeline.named_steps['preprocessor']
+    Xt = preprocessor.fit_transform(X_train, y_train)  # What Pipeline.fit does for a non-final step
+    stats["preprocessor"] = {"fit_seconds": time.perf_counter() - started, "peak_rss_mb": _peak_rss_mb()}
+
+    # TransformedTargetRegressor.fit with a stand-in regressor: fits transformer_ (log1p) and its
+    # inverse check exactly as the real call would, then the real VotingRegressor goes in
+    target = pipeline.named_steps['model']
+    voting = target.regressor
+    target.set_params(regressor=DummyRegressor()).fit(Xt, y_train)
+    y_trans = target.transformer_.transform(np.asarray(y_train, dtype=np.float64).reshape(-1, 1)).squeeze(axis=1)
+
+    names = [name for name, _ in voting.estimators]
+    started = time.perf_counter()
+    # fork: the children inherit the imports (the parent has not started any OpenMP pool yet);
+    # one task per child, so each peak RSS belongs to one member
+    context = multiprocessing.get_context("fork")
+    with context.Pool(processes=len(names), maxtasksperchild=1) as pool:
+        pending = {name: pool.apply_async(fit_member, (name, estimator, Xt, y_trans, threads[name]))
+                   for name, estimator in voting.estimators}
+        results = {name: result.get() for name, result in pending.items()}
+    stats["members_wall_seconds"] = time.perf_counter() - started
+
+    # What VotingRegressor.fit leaves behind: the fitted clones in estimators_ / named_estimators_
+    fitted_voting = clone(voting)
+    fitted_voting.estimators_ = [results[name][0] for name in names]
+    fitted_voting.named_estimators_ = Bunch(**{name: results[name][0] for name in names})
+    target.set_params(regressor=voting)
+    target.regressor_ = fitted_voting
+    for name in names:
+        stats[name] = results[name][1]
+    return pipeline, stats
+
+
+# ==========================================
+# 4. ARTIFACTS
+# ==========================================
+def training_defaults(X_train, cat_cols):
+    """
+    Mode per categorical column, median per numeric one, as in the shipped ames_model_defaults.pkl.
+    The mode is taken over astype(str), as the model sees the column: a mostly-empty column's
+    default is 'nan' (not its rarest real category), and every categorical default is a str.
+    """
+    defaults = {}
+    for col in X_train.columns:
+        if col in cat_cols:
+            modes = X_train[col].astype(str).mode()
+            defaults[col] = modes[0] if not modes.empty else "None"
+        else:
+            defaults[col] = X_train[col].median()
+    return defaults
+
+
+def training_options(X_train, cat_cols):
+    """Sorted distinct values per categorical column, NaN as 'nan' (the notebook's unique_options)."""
+    return {col: sorted(X_train[col].astype(str).unique().tolist()) for col in X_train.columns if col in cat_cols}
+
+
+def defaults_differences(defaults, reference):
+    """{column: (reference, new)} wherever the value or its type differs (e.g. vs the shipped pkl)."""
+    return {col: (reference.get(col), value) for col, value in defaults.items()
+            if type(value) is not type(reference.get(col)) or
+            not (value == reference.get(col) or (pd.isna(value) and pd.isna(reference.get(col))))}
+
+
+def _dump_atomic(obj, path):
+    # The hot reloader (hot_reload.py) may be watching: never expose a half-written file
+    tmp = path.with_name(path.name + ".tmp")
+    joblib.dump(obj, tmp)
+    os.replace(tmp, path)
+
+
+def write_artifacts(output_dir, pipeline, X_train, config):
+    """The four files the apps load. The model goes last, so a watcher sees it after the rest."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = {
+        "columns": output_dir / 'ames_model_columns.pkl',
+        "defaults": output_dir / 'ames_model_defaults.pkl',
+        "options": output_dir / 'ames_model_options.pkl',
+        "model": output_dir / 'ames_housing_super_model_production.pkl',
+    }
+    _dump_atomic(X_train.columns.tolist(), paths["columns"])
+    _dump_atomic(training_defaults(X_train, config["categorical_cols"]), paths["defaults"])
+    _dump_atomic(training_options(X_train, config["categorical_cols"]), paths["options"])
+    _dump_atomic(pipeline, paths["model"])
+    return {name: str(path) for name, path in paths.items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Retrain the production ensemble with the members in parallel.")
+    parser.add_argument("--data", default=str(DATA_PATH), help="Ames CSV (with SalePrice)")
+    parser.add_argument("--config", default=None, help="JSON file overriding TRAINING_CONFIG keys")
+    parser.add_argument("--seed", type=int, default=None, help="Overrides the config's seed")
+    parser.add_argument("--threads", default=os.environ.get("AMES_MEMBER_THREADS"),
+                        help="Per-member thread budget, e.g. 'lasso=1,xgb=2,catboost=2' (default: split the cores)")
+    parser.add_argument("--output-dir", default=str(MODELS_DIR))
+    parser.add_argument("--report", default=None, help=f"Default: <output-dir>/{REPORT_NAME}")
+    parser.add_argument("--check-serial", action="store_true",
+                        help="Also fit the notebook's way (serial Pipeline.fit) and compare predictions")
+    args = parser.parse_args()
+
+    config = load_config(args.config, args.seed)
+    threads = parse_threads(args.threads)
+    X_train, X_test, y_train, y_test = load_training_data(args.data, config)
+    print(f"Training on {len(X_train):,} rows (seed {config['seed']}), "
+          f"threads {', '.join(f'{name}={threads[name]}' for name in MEMBERS)} ...")
+
+    started = time.perf_counter()
+    pipeline, stats = fit_parallel(build_pipeline(config), X_train, y_train, threads)
+    total = time.perf_counter() - started
+    r2 = pipeline.score(X_test, y_test)
+
+    print(f"\n{'stage':<14}{'threads':>8}{'fit s':>9}{'peak RSS MB':>13}")
+    print(f"{'preprocessor':<14}{'':>8}{stats['preprocessor']['fit_seconds']:>9.2f}"
+          f"{stats['preprocessor']['peak_rss_mb']:>13.0f}")
+    for name in MEMBERS:
+        print(f"{name:<14}{stats[name]['threads']:>8}{stats[name]['fit_seconds']:>9.2f}{stats[name]['peak_rss_mb']:>13.0f}")
+    serial = sum(stats[name]['fit_seconds'] for name in MEMBERS)
+    print(f"Members: {stats['members_wall_seconds']:.2f} s wall (one after another: {serial:.2f} s); "
+          f"total {total:.2f} s")
+    print(f"✅ Test R^2: {r2:.5f}")
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "data": args.data, "rows_train": len(X_train), "rows_test": len(X_test),
+        "config": config, "threads": threads, "cpu_count": os.cpu_count(),
+        "stats": stats, "total_seconds": total, "test_r2": r2,
+    }
+
+    if args.check_serial:
+        print("\nFitting the notebook's way (serial Pipeline.fit) for comparison ...")
+        reference = build_pipeline(config)
+        started = time.perf_counter()
+        reference.fit(X_train, y_train)
+        serial_seconds = time.perf_counter() - started
+        diff = np.abs(pipeline.predict(X_test) - reference.predict(X_test))
+        report["serial_check"] = {"fit_seconds": serial_seconds, "max_abs_diff": float(diff.max()),
+                                  "identical": bool(diff.max() == 0.0)}
+        print(f"   Serial fit {serial_seconds:.2f} s; max |price diff| on the test split ${diff.max():.6f}")
+
+    # The apps fillna with the defaults, so a changed default changes prices: flag it
+    shipped_defaults = MODELS_DIR / 'ames_model_defaults.pkl'
+    if shipped_defaults.exists():
+        changed = defaults_differences(training_defaults(X_train, config["categorical_cols"]),
+                                       joblib.load(shipped_defaults))
+        report["defaults_vs_shipped"] = {col: [repr(old), repr(new)] for col, (old, new) in changed.items()}
+        print(f"Defaults vs {shipped_defaults.name}: " +
+              ("identical" if not changed else f"{len(changed)} differ ({', '.join(list(changed)[:8])}"
+                                               f"{', ...' if len(changed) > 8 else ''})"))
+
+    report["artifacts"] = write_artifacts(args.output_dir, pipeline, X_train, config)
+    report_path = Path(args.report) if args.report else Path(args.output_dir) / REPORT_NAME
+    report_path.write_text(json.dumps(report, indent=2, default=float))
+    print(f"\n✅ Artifacts written to {args.output_dir} (report: {report_path})")
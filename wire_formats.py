@@ -0,0 +1,161 @@
+# wire_formats.py
+# Binary request/response bodies for POST /predict_batch, chosen by content negotiation.
+#
+#   Content-Type (request) / Accept (response)      Body
+#   application/json                 (default)      [{...house...}, ...]      (unchanged)
+#   application/vnd.apache.arrow.stream             Arrow IPC stream, one column per field
+#   application/vnd.apache.parquet                  Parquet file, one column per field
+#   application/msgpack                             array of maps (like JSON) or a map of columns
+#
+# Columnar inputs (Arrow, Parquet, a msgpack map of columns) become one DataFrame and go
+# straight into bulk_validation.validate_frame: no per-row dict round trip. null/NaN = not provided.
+# Non-JSON responses are columnar too: index, status, predicted_price, error (details as JSON)
+# plus the batch counters (Arrow/Parquet: schema metadata; msgpack: top-level keys, with the
+# columns under "predictions").
+#
+# pyarrow and msgpack are only imported when a client actually uses those formats.
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+JSON = "application/json"
+ARROW = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+MSGPACK = "application/msgpack"
+FORMATS = (JSON, ARROW, PARQUET, MSGPACK)
+
+ALIASES = {
+    "application/x-parquet": PARQUET,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+}
+
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+def canonical(mimetype):
+    """Content-Type -> one of FORMATS (a missing Content-Type means JSON)."""
+    mimetype = ALIASES.get(mimetype or JSON, mimetype or JSON)
+    if mimetype not in FORMATS:
+        raise UnsupportedFormat(f"Unsupported Content-Type '{mimetype}' (expected one of {list(FORMATS)})")
+    return mimetype
+
+
+def negotiate(accept_mimetypes):
+    """werkzeug's request.accept_mimetypes -> the response format (JSON unless asked otherwise)."""
+    offered = list(FORMATS) + list(ALIASES)
+    return canonical(accept_mimetypes.best_match(offered, default=JSON))
+
+
+def _jsonable(value):
+    # Validation inputs can be NumPy scalars when they come from a columnar body
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+# ==========================================
+# 1. DECODING
+# ==========================================
+def restore_integers(frame, categorical_columns):
+    """
+    Whole-number doubles in categorical columns -> Python ints (missing -> None), in place.
+    Writers type an int column with a null as double, and cast_to_str would then see 60.0 ('60.0',
+    an unknown category) where the JSON path sees 60 ('60').
+    """
+    for col in categorical_columns:
+        if col not in frame.columns or frame[col].dtype.kind != "f":
+            continue
+        values = frame[col].to_numpy()
+        present = ~np.isnan(values)
+        if not np.all(np.isfinite(values[present]) & (values[present] == np.round(values[present]))):
+            continue  # Genuinely fractional: leave it for validation / the encoder as sent
+        frame[col] = pd.Series([int(v) if p else None for v, p in zip(values.tolist(), present)],
+                               index=frame.index, dtype=object)
+    return frame
+
+
+def decode(body, mimetype, categorical_columns=()):
+    """
+    Request body -> ("records", list) for row-shaped bodies, ("frame", DataFrame) for columnar ones.
+    categorical_columns: the model's categorical fields, whose whole-number doubles are read back as ints.
+    """
+    if mimetype == ARROW:
+        import pyarrow as pa
+
+        table = pa.ipc.open_stream(body).read_all()
+        return "frame", restore_integers(table.to_pandas(integer_object_nulls=True), categorical_columns)
+    if mimetype == PARQUET:
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(io.BytesIO(body))
+        return "frame", restore_integers(table.to_pandas(integer_object_nulls=True), categorical_columns)
+    if mimetype == MSGPACK:
+        import msgpack
+
+        payload = msgpack.unpackb(body, raw=False)
+        if isinstance(payload, dict):
+            # Columnar: {field: [values]}, all columns the same length
+            lengths = {len(values) for values in payload.values() if isinstance(values, list)}
+            if len(lengths) != 1 or not all(isinstance(values, list) for values in payload.values()):
+                raise ValueError("A msgpack map body must map every field to a list of equal length")
+            return "frame", pd.DataFrame(payload, dtype=object)
+        return "records", payload
+    raise UnsupportedFormat(f"Cannot decode '{mimetype}'")
+
+
+# ==========================================
+# 2. ENCODING (columnar responses)
+# ==========================================
+def batch_columns(n_records, prices, errors):
+    """prices: {input position: price}, errors: {input position: details} -> response columns."""
+    price_column = np.full(n_records, np.nan)
+    for i, price in prices.items():
+        price_column[i] = price
+    error_column = [None] * n_records
+    for i, details in errors.items():
+        error_column[i] = json.dumps(details, default=_jsonable)
+    status = ["error" if i in errors else "success" for i in range(n_records)]
+    return {
+        "index": np.arange(n_records, dtype=np.int64),
+        "status": status,
+        "predicted_price": price_column,
+        "error": error_column,
+    }
+
+
+def encode(mimetype, columns, meta):
+    """Columns (equal-length) + batch-level metadata -> response body bytes."""
+    if mimetype in (ARROW, PARQUET):
+        import pyarrow as pa
+
+        arrays = {
+            "index": pa.array(columns["index"], type=pa.int64()),
+            "status": pa.array(columns["status"], type=pa.string()),
+            # Failed rows are null, not NaN
+            "predicted_price": pa.array(columns["predicted_price"], type=pa.float64(),
+                                        mask=np.isnan(columns["predicted_price"])),
+            "error": pa.array(columns["error"], type=pa.string()),
+        }
+        table = pa.table(arrays).replace_schema_metadata({k: json.dumps(v) for k, v in meta.items()})
+        sink = io.BytesIO()
+        if mimetype == ARROW:
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, sink)
+        return sink.getvalue()
+
+    if mimetype == MSGPACK:
+        import msgpack
+
+        prices = [None if np.isnan(p) else float(p) for p in columns["predicted_price"]]
+        body = {**meta, "predictions": {"index": columns["index"].tolist(), "status": columns["status"],
+                                        "predicted_price": prices, "error": columns["error"]}}
+        return msgpack.packb(body, use_bin_type=True)
+
+    raise UnsupportedFormat(f"Cannot encode '{mimetype}'")